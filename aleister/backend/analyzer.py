@@ -2,27 +2,66 @@
 
 Identifie tous les flux qui référencent une table donnée,
 en distinguant les dépendances directes (même domaine) et
-transverses (autre domaine).
+transverses (autre domaine), et le rôle de chaque flux vis-à-vis
+de la table (lecture, écriture, création, suppression).
+
+`analyze_column_impact` restreint l'analyse aux flux qui utilisent une
+colonne (`column_index`) ; `analyze_downstream` suit en plus l'impact en
+aval, de table écrite en table écrite, sur le graphe de dépendances
+(`dependency_graph`) ; `analyze_impact_batch` traite en une passe la liste
+des tables d'une migration.
 """
 
 from __future__ import annotations
 
-from typing import Any
+import re
+from typing import Any, Iterable
 
+from aleister.backend.column_index import get_column_index
+from aleister.backend.compact import CompactIndex
+from aleister.backend.dependency_graph import get_dependency_graph
+from aleister.backend.index_store import IndexStore
 from aleister.backend.knowledge_base import build_index
+from aleister.backend.sql_scanner import ROLES, roles_of
+from aleister.backend.table_lookup import get_table_lookup
+
+
+def _scan_index(
+    idx: dict,
+    search_key: str,
+    roles: list[str] | None = None,
+) -> list[tuple[dict, str, str, list[str]]]:
+    """Cherche dans l'index en mémoire : [(flux, clé correspondante, domaine_owner, rôles), ...]."""
+    if isinstance(idx, CompactIndex):
+        return idx.flux_referencing(search_key, roles)
+    lookup = get_table_lookup(idx)
+    flux_list = idx["flux"]
+    return [
+        (flux_list[pos], lookup.keys[table_id], owner, roles_of(mask))
+        for pos, table_id, owner, mask in lookup.references(lookup.find(search_key), roles)
+    ]
 
 
 def analyze_impact(
     table_name: str,
     dataset: str | None = None,
     index: dict | None = None,
+    store: IndexStore | None = None,
+    roles: list[str] | None = None,
 ) -> dict[str, Any]:
     """Retourne tous les flux impactés par l'évolution d'une table.
 
     Args:
         table_name: nom de la table (ex. "clients", "cdr_voix").
         dataset:    dataset de la table (ex. "BQ_SOCLE"). Si None, cherche dans tous.
+                    Une clé « dataset.table » existante désigne cette seule table ;
+                    sinon, toutes les tables dont la clé contient la recherche.
         index:      index pré-construit (évite un recalcul). Si None, reconstruit.
+        store:      store SQLite (prioritaire sur `index`) : lookups indexés sans
+                    charger l'index en mémoire.
+        roles:      ne retient que les flux dont la référence a l'un de ces rôles
+                    (ex. ["write", "create"] pour les producteurs, ["read"] pour
+                    les consommateurs). None = tous les rôles.
 
     Returns:
         {
@@ -31,35 +70,28 @@ def analyze_impact(
           "flux_transverses": [...],  # flux d'autres domaines
           "total": int,
         }
+        Chaque élément : {"flux", "via", "roles", "is_transverse"}.
     """
-    idx = index or build_index()
+    if roles:
+        unknown = set(roles) - set(ROLES)
+        if unknown:
+            raise ValueError(f"Rôle(s) inconnu(s) : {', '.join(sorted(unknown))}")
 
     # Normalise la clé de recherche
     search_key = f"{dataset}.{table_name}" if dataset else table_name
 
-    matching_flux: list[dict] = []
-
-    for flux in idx["flux"]:
-        for ref in flux["tables_referenced"]:
-            key = f"{ref['dataset']}.{ref['table']}"
-            if search_key.lower() in key.lower():
-                matching_flux.append({
-                    "flux": flux,
-                    "via": key,
-                    "is_transverse": ref.get("domaine_owner", flux["domaine"]) != flux["domaine"],
-                })
-                break  # une correspondance suffit par flux
-
-    # Détermine le domaine propriétaire de la table
-    owner_domain: str | None = None
-    for flux in idx["flux"]:
-        for ref in flux["tables_referenced"]:
-            key = f"{ref['dataset']}.{ref['table']}"
-            if search_key.lower() in key.lower() and ref.get("domaine_owner"):
-                owner_domain = ref["domaine_owner"]
-                break
-        if owner_domain:
-            break
+    if store is not None:
+        hits = store.flux_referencing(search_key, roles)
+    else:
+        hits = _scan_index(index or build_index(), search_key, roles)
+
+    matching_flux: list[dict] = [
+        {"flux": flux, "via": key, "roles": ref_roles, "is_transverse": owner != flux["domaine"]}
+        for flux, key, owner, ref_roles in hits
+    ]
+
+    # Domaine propriétaire : celui de la première référence correspondante
+    owner_domain: str | None = hits[0][2] if hits else None
 
     flux_directs = [
         item for item in matching_flux
@@ -79,7 +111,278 @@ def analyze_impact(
     }
 
 
-def list_tables(index: dict | None = None) -> list[str]:
+def analyze_column_impact(
+    table_name: str,
+    column: str,
+    dataset: str | None = None,
+    index: dict | None = None,
+    store: IndexStore | None = None,
+    roles: list[str] | None = None,
+) -> dict[str, Any]:
+    """`analyze_impact` restreint aux flux qui utilisent `column`.
+
+    Mêmes arguments et même résultat que `analyze_impact`, plus "column" ;
+    chaque élément porte en plus :
+      - "column_roles" : rôles du flux vis-à-vis de la colonne ;
+      - "whole_table"  : True si le flux utilise la table entière
+                         (`SELECT *`, transfert, chargement de fichier).
+    """
+    if store is not None:
+        columns = store.column_index()
+    else:
+        index = index or build_index()
+        columns = get_column_index(index)
+    result = analyze_impact(table_name, dataset=dataset, index=index, store=store, roles=roles)
+
+    def keep(items: list[dict]) -> list[dict]:
+        kept = []
+        for item in items:
+            usage = columns.usage(item["via"], column, item["flux"]["yaml_path"])
+            if usage is None:
+                continue
+            mask, whole = usage
+            kept.append({
+                **item,
+                "column_roles": roles_of(mask) if mask else item["roles"],
+                "whole_table":  whole,
+            })
+        return kept
+
+    flux_directs = keep(result["flux_directs"])
+    flux_transverses = keep(result["flux_transverses"])
+    return {
+        **result,
+        "column":           column.lower(),
+        "flux_directs":     flux_directs,
+        "flux_transverses": flux_transverses,
+        "total":            len(flux_directs) + len(flux_transverses),
+    }
+
+
+def analyze_downstream(
+    table_name: str,
+    dataset: str | None = None,
+    max_depth: int | None = None,
+    index: dict | None = None,
+    store: IndexStore | None = None,
+) -> dict[str, Any]:
+    """Impact transitif de l'évolution d'une table, en aval.
+
+    Profondeur 1 : flux qui référencent la table (ceux d'`analyze_impact`) ;
+    profondeur n + 1 : flux qui lisent une table écrite par un flux de
+    profondeur n qui lit la table impactée.
+
+    Args:
+        table_name, dataset, index, store: comme `analyze_impact`.
+        max_depth: nombre de sauts maximal (None = jusqu'au bout de la chaîne).
+
+    Returns:
+        {
+          "table": "BQ_SOCLE.clients",
+          "domaine_owner": "Clients",
+          "flux":   [...],  # par profondeur puis ordre de l'index
+          "tables": [...],  # tables impactées, de départ comprises (profondeur 0)
+          "max_depth": int, # profondeur atteinte
+          "total": int,
+        }
+        Chaque flux : {"flux", "depth", "via", "roles", "is_transverse",
+        "source"} — `via` : table par laquelle l'impact arrive, `roles` : rôles
+        du flux vis-à-vis d'elle, `source` : id_script du flux qui l'écrit
+        (None en profondeur 1).
+        Chaque table : {"table", "depth", "domaine_owner", "written_by"}.
+    """
+    if max_depth is not None and max_depth < 1:
+        raise ValueError(f"Profondeur invalide : {max_depth}")
+    search_key = f"{dataset}.{table_name}" if dataset else table_name
+
+    if store is not None:
+        graph = store.dependency_graph()
+    else:
+        index = index or build_index()
+        graph = get_dependency_graph(index)
+    flux_hits, table_hits = graph.downstream(graph.match(search_key), max_depth)
+
+    ordered = sorted(flux_hits, key=lambda pos: (flux_hits[pos][0], pos))
+    if store is not None:
+        by_id = dict(store.flux_by_ids([graph.flux_ids[pos] for pos in ordered]))
+        flux_at = {pos: by_id[graph.flux_ids[pos]] for pos in ordered}
+    else:
+        flux_at = {pos: index["flux"][pos] for pos in ordered}
+
+    def owner(table_id: int) -> str:
+        return graph.domains[graph.table_owner[table_id]]
+
+    items = []
+    for pos in ordered:
+        depth, table_id, mask = flux_hits[pos]
+        source = table_hits[table_id][1]
+        items.append({
+            "flux":          flux_at[pos],
+            "depth":         depth,
+            "via":           graph.table_keys[table_id],
+            "roles":         roles_of(mask),
+            "is_transverse": graph.flux_domain[pos] != graph.table_owner[table_id],
+            "source":        flux_at[source]["id_script"] if source >= 0 else None,
+        })
+    tables = [
+        {
+            "table":         graph.table_keys[table_id],
+            "depth":         depth,
+            "domaine_owner": owner(table_id),
+            "written_by":    flux_at[writer]["id_script"] if writer >= 0 else None,
+        }
+        for table_id, (depth, writer) in sorted(table_hits.items(), key=lambda kv: (kv[1][0], kv[0]))
+    ]
+    seeds = [t for t in table_hits if table_hits[t][0] == 0]
+    return {
+        "table":         search_key,
+        "domaine_owner": owner(seeds[0]) if seeds else None,
+        "flux":          items,
+        "tables":        tables,
+        "max_depth":     max((item["depth"] for item in items), default=0),
+        "total":         len(items),
+    }
+
+
+_TABLE_LIST_SPLIT_RE = re.compile(r"[\s,;|]+")
+
+
+def parse_table_list(text: str) -> list[str]:
+    """Tables d'une liste collée ou d'un fichier (une par ligne, ou séparées
+    par virgules, points-virgules, espaces) : « £BQ_SOCLE.clients »,
+    « BQ_SOCLE.clients » ou « clients ». Commentaires (# …, -- …) ignorés,
+    doublons retirés, ordre conservé."""
+    tables: list[str] = []
+    seen: set[str] = set()
+    for line in text.splitlines():
+        line = re.split(r"#|--", line, maxsplit=1)[0]
+        for word in _TABLE_LIST_SPLIT_RE.split(line):
+            name = word.strip().strip("\"'`").lstrip("£")
+            if name and name.lower() not in seen:
+                seen.add(name.lower())
+                tables.append(name)
+    return tables
+
+
+def analyze_impact_batch(
+    tables: Iterable[str],
+    index: dict | None = None,
+    store: IndexStore | None = None,
+    roles: list[str] | None = None,
+) -> dict[str, Any]:
+    """Impact d'une liste de tables (migration de schéma), en une passe sur
+    l'index inverse des références.
+
+    Chaque table est cherchée comme dans `analyze_impact` ; les flux qui
+    en référencent plusieurs ne sont comptés qu'une fois dans l'union.
+
+    Returns:
+        {
+          "tables":    [...],  # par table demandée, format d'`analyze_impact`
+                               # plus "matched" (clés trouvées)
+          "unknown":   [...],  # tables demandées sans correspondance
+          "flux":      [...],  # union dédoublonnée, dans l'ordre de l'index
+          "by_domain": {domaine: {"directs": [...], "transverses": [...]}},
+          "total": int,
+        }
+        Chaque flux de l'union : {"flux", "tables" (tables demandées qui
+        l'impactent), "via" (clés référencées), "roles", "is_transverse"
+        (au moins une de ces tables appartient à un autre domaine)}.
+    """
+    if roles:
+        unknown_roles = set(roles) - set(ROLES)
+        if unknown_roles:
+            raise ValueError(f"Rôle(s) inconnu(s) : {', '.join(sorted(unknown_roles))}")
+    requested = list(dict.fromkeys(t.strip() for t in tables if t.strip()))
+
+    if store is not None:
+        lookup = store.table_lookup()
+    else:
+        index = index or build_index()
+        lookup = get_table_lookup(index)
+    matched = {name: lookup.find(name) for name in requested}
+    requests_of: dict[int, list[str]] = {}
+    for name, table_ids in matched.items():
+        for table_id in table_ids:
+            requests_of.setdefault(table_id, []).append(name)
+
+    # Une passe : toutes les références des tables trouvées, par flux puis rang.
+    # Avec un store, un flux est désigné par son identifiant (même ordre).
+    if store is not None:
+        postings = store.table_references(list(requests_of), roles)
+        flux_at = dict(store.flux_by_ids([flux_id for flux_id, *_ in postings]))
+    else:
+        postings = sorted(lookup.postings(requests_of, roles))
+        flux_at = {pos: index["flux"][pos] for pos, *_ in postings}
+
+    # Union dédoublonnée : [masque, transverse, clés via] par flux
+    by_table: dict[int, list[tuple[int, int, str, int]]] = {}
+    union: dict[int, list] = {}
+    domaine_of: dict[int, str] = {}
+    for pos, rank, table_id, owner, mask in postings:
+        by_table.setdefault(table_id, []).append((pos, rank, owner, mask))
+        entry = union.get(pos)
+        if entry is None:
+            domaine_of[pos] = flux_at[pos]["domaine"]
+            entry = union[pos] = [0, False, [], []]
+        entry[0] |= mask
+        entry[1] = entry[1] or owner != domaine_of[pos]
+        entry[2].append(lookup.keys[table_id])
+
+    tables_result = []
+    for name in requested:
+        table_ids = [t for t in matched[name] if t in by_table]
+        if len(table_ids) == 1:
+            hits = [(pos, table_ids[0], owner, mask) for pos, _, owner, mask in by_table[table_ids[0]]]
+        else:  # première référence de chaque flux parmi les tables trouvées
+            first: dict[int, tuple[int, int, str, int]] = {}
+            for table_id in table_ids:
+                for pos, rank, owner, mask in by_table[table_id]:
+                    if pos not in first or rank < first[pos][0]:
+                        first[pos] = (rank, table_id, owner, mask)
+            hits = [(pos, t, owner, mask) for pos, (_, t, owner, mask) in sorted(first.items())]
+        owner_domain = hits[0][2] if hits else None
+        directs, transverses = [], []
+        for pos, table_id, owner, mask in hits:
+            union[pos][3].append(name)
+            domaine = domaine_of[pos]
+            (directs if domaine == owner_domain else transverses).append({
+                "flux": flux_at[pos], "via": lookup.keys[table_id], "roles": roles_of(mask),
+                "is_transverse": owner != domaine,
+            })
+        tables_result.append({
+            "table":            name,
+            "matched":          [lookup.keys[t] for t in matched[name]],
+            "domaine_owner":    owner_domain,
+            "flux_directs":     directs,
+            "flux_transverses": transverses,
+            "total":            len(hits),
+        })
+
+    flux_union = []
+    by_domain: dict[str, dict[str, list[dict]]] = {}
+    for pos in sorted(union):
+        mask, transverse, via, names = union[pos]
+        entry = {
+            "flux": flux_at[pos], "tables": names, "via": via,
+            "roles": roles_of(mask), "is_transverse": transverse,
+        }
+        flux_union.append(entry)
+        group = by_domain.setdefault(domaine_of[pos], {"directs": [], "transverses": []})
+        group["transverses" if transverse else "directs"].append(entry)
+
+    return {
+        "tables":    tables_result,
+        "unknown":   [name for name in requested if not matched[name]],
+        "flux":      flux_union,
+        "by_domain": dict(sorted(by_domain.items())),
+        "total":     len(flux_union),
+    }
+
+
+def list_tables(index: dict | None = None, store: IndexStore | None = None) -> list[str]:
     """Retourne la liste triée de toutes les tables référencées dans le workspace."""
+    if store is not None:
+        return store.list_tables()
     idx = index or build_index()
     return sorted(idx["tables"].keys())
@@ -0,0 +1,462 @@
+"""Aleister — Index des colonnes utilisées par les SQL.
+
+`analyze_impact` raisonne à la table : supprimer une colonne de `clients`
+signale tous les flux qui touchent `clients`. Ce module relève les
+colonnes réellement utilisées par chaque SQL indexé :
+
+  - listes SELECT (`t.nom`, `nom`, `t.*`, `*`) ;
+  - listes de colonnes d'un INSERT et du `INSERT (…)` d'un MERGE (écriture) ;
+  - `UPDATE SET col = …` (écriture à gauche, lecture à droite) ;
+  - conditions ON / WHERE / GROUP BY… (`ON t.id_client = ext_clients.id_client`).
+
+Une colonne qualifiée (`ext_clients.id_client`) est rattachée à la table
+de son alias. Une colonne nue est rattachée aux tables lues par
+l'instruction dont le schéma (`schema_catalog`) la déclare, ou, à
+défaut de schéma connu, à ces tables. Les £variables de table sont
+développées avec les `parametres_env` du YAML (voir `variables`).
+
+Le scan d'un SQL est mis en cache par contenu (cache de parsing) ;
+`ColumnIndex` en dérive l'index inverse (table, colonne) → flux. Un flux
+qui référence une table sans qu'aucune colonne ne soit relevée (transfert
+par paramètres de job, LOAD DATA, `SELECT *`) l'utilise en entier : il
+reste impacté par chacune de ses colonnes.
+
+Avec un store, l'index est construit à chaque écriture et persisté à côté
+de la base (`IndexStore.column_index`) ; un delta du watcher ne re-scanne
+que les SQL des flux touchés. L'analyse d'impact par colonne est
+`analyzer.analyze_column_impact` :
+
+    impact = analyze_column_impact("clients", "email", dataset="BQ_SOCLE", store=store)
+"""
+
+from __future__ import annotations
+
+import pickle
+import re
+from pathlib import Path
+from typing import Any, Iterable, Mapping
+
+from aleister.config import WORKSPACE_ROOT
+from aleister.backend.compact import CompactIndex
+from aleister.backend.index_memo import IndexMemo
+from aleister.backend.knowledge_base import _decode_text, _parse_cached, _parse_yaml_meta, build_index
+from aleister.backend.schema_catalog import SchemaCatalog, get_schema_catalog
+from aleister.backend.sql_scanner import CARRY_KEYWORDS, ROLE_BITS, VERBS
+from aleister.backend.variables import sql_table_refs
+
+# Colonne « toutes les colonnes » (`SELECT *`, `t.*`, table utilisée en entier)
+ALL_COLUMNS = "*"
+
+_COLUMNS_VERSION = 1
+
+_READ, _WRITE = ROLE_BITS["read"], ROLE_BITS["write"]
+
+_TOKEN_RE = re.compile(
+    r"--[^\n]*|/\*.*?(?:\*/|\Z)"                                  # commentaires
+    r"|(?P<lit>'(?:[^'\\]|\\.)*(?:'|\Z)|\"(?:[^\"\\]|\\.)*(?:\"|\Z)|\d[\w.]*)"
+    r"|£(?P<runtime>\w+(?:\.\w+)?)(?=£)"                          # nom complété à l'exécution
+    r"|£(?P<ref>\w+(?:\.\w+)?)"                                   # table ou £variable
+    r"|(?P<name>[A-Za-z_]\w*)(?:\.(?P<col>[A-Za-z_]\w*|\*))?"     # colonne, alias.colonne
+    r"|`(?P<quoted>[^`]*)`"
+    r"|(?P<punct>[(),;=*])",
+    re.DOTALL,
+)
+
+_TABLE_REF_RE = re.compile(r"(BQ|TD)_(SOCLE|HISTO|TMP|VUES|SOURCE)\.(\w+)")
+
+# Verbes dont la table cible n'est pas lue par l'instruction
+_TARGET_VERBS = frozenset({"INSERT", "INS", "MERGE", "CREATE", "REPLACE"})
+_ALL_VERBS = frozenset(verb for verbs in VERBS.values() for verb in verbs)
+
+# Mots-clés et fonctions sans parenthèses : jamais des colonnes
+_KEYWORDS = frozenset("""
+    ALL AND ANY AS ASC BETWEEN BY CASE CAST CROSS CURRENT CURRENT_DATE CURRENT_TIME
+    CURRENT_TIMESTAMP CURRENT_USER DATE DATETIME DAY DEFAULT DESC DISTINCT ELSE END
+    ESCAPE EXCEPT EXISTS EXTRACT FALSE FETCH FIRST FOLLOWING FOR FROM FULL GROUP HAVING
+    HOUR IGNORE IN INNER INTERSECT INTERVAL IS JOIN LAST LEFT LIKE LIMIT MATCHED MINUTE
+    MONTH NATURAL NOT NULL NULLS OFFSET ON OR ORDER OUTER OVER PARTITION PRECEDING
+    QUALIFY QUARTER RANGE RECURSIVE RESPECT RIGHT ROW ROWS SECOND SELECT SEL SET SOME
+    TABLESAMPLE THEN TIME TIMESTAMP TO TRUE UNBOUNDED UNION UNNEST USING VALUES WEEK
+    WHEN WHERE WINDOW WITH YEAR ZONE SOURCE TARGET TOP SAMPLE LOCKING ACCESS MODE
+    COLLECT STATISTICS COLUMN INDEX PRIMARY UNIQUE DATA LOAD OVERWRITE FILES FORMAT
+    OPTIONS BEGIN TRANSACTION COMMIT ROLLBACK DECLARE EXECUTE IMMEDIATE RETURN IF
+    STRING INT64 NUMERIC FLOAT64 BOOL BYTES VARCHAR CHAR INTEGER BIGINT DECIMAL FLOAT
+    BYTEINT SMALLINT
+""".split()) | _ALL_VERBS | frozenset(CARRY_KEYWORDS)
+
+# Clauses après lesquelles un identifiant désigne une table, pas une colonne
+_TABLE_CLAUSES = frozenset({"FROM", "JOIN", "INTO", "UPDATE", "UPD", "TABLE", "USING", "MERGE"})
+
+
+# ── Scan d'un SQL ─────────────────────────────────────────────────────────────
+def _tokens(text: str) -> list[tuple[str, str, str | None]]:
+    """[(genre, valeur, colonne), ...] : genre ∈ lit, ref, name, punct."""
+    tokens: list[tuple[str, str, str | None]] = []
+    for m in _TOKEN_RE.finditer(text):
+        kind = m.lastgroup
+        if kind is None:
+            continue  # commentaire
+        if kind == "col":
+            tokens.append(("name", m.group("name"), m.group("col")))
+        elif kind == "quoted":
+            tokens.append(("name", m.group("quoted"), None))
+        elif kind == "ref":
+            ref = m.group("ref")
+            tokens.append(("ref", ref if _TABLE_REF_RE.fullmatch(ref) else f"£{ref}", None))
+        elif kind == "runtime":
+            # table sans nom connu (£BQ_TMP.x_£DATE) : ni `resolve` ni le catalogue ne la trouvent
+            tokens.append(("ref", f"£{m.group('runtime')}£", None))
+        else:
+            tokens.append((kind, m.group(kind), None))
+    return tokens
+
+
+def _statements(tokens: list) -> Iterable[list]:
+    start = 0
+    for i, (kind, value, _) in enumerate(tokens):
+        if kind == "punct" and value == ";":
+            if i > start:
+                yield tokens[start:i]
+            start = i + 1
+    if start < len(tokens):
+        yield tokens[start:]
+
+
+def _is_word(token: tuple, *words: str) -> bool:
+    return token[0] == "name" and token[2] is None and token[1].upper() in words
+
+
+def _is_operand(token: tuple) -> bool:
+    """Littéral, table ou colonne (un identifiant qui le suit est un alias)."""
+    if token[0] in ("lit", "ref"):
+        return True
+    return token[0] == "name" and (token[2] is not None or token[1].upper() not in _KEYWORDS)
+
+
+def _verb_before(tokens: list, i: int) -> str | None:
+    """Verbe qui précède la table en position `i` (INSERT INTO £x → INSERT)."""
+    j = i - 1
+    while j >= 0 and _is_word(tokens[j], *CARRY_KEYWORDS):
+        j -= 1
+    if j >= 0 and tokens[j][0] == "name" and tokens[j][2] is None:
+        word = tokens[j][1].upper()
+        if word in _ALL_VERBS:
+            return word
+    return None
+
+
+def _scan_statement(
+    tokens: list,
+    qualified: dict[tuple[str, str], int],
+    bare: dict[tuple[tuple[str, ...], str], int],
+) -> None:
+    # ── Tables, alias et cibles ───────────────────────────────────────────────
+    aliases: dict[str, str] = {}
+    targets: dict[str, str] = {}     # verbe → table cible
+    scope: list[str] = []            # tables lues par l'instruction
+    for i, (kind, value, _) in enumerate(tokens):
+        if kind != "ref":
+            continue
+        table = value.rsplit(".", 1)[-1]
+        aliases.setdefault(table.lower(), value)
+        nxt = i + 1
+        if nxt < len(tokens) and _is_word(tokens[nxt], "AS"):
+            nxt += 1
+        if nxt < len(tokens) and tokens[nxt][0] == "name" and tokens[nxt][2] is None \
+                and tokens[nxt][1].upper() not in _KEYWORDS:
+            aliases[tokens[nxt][1].lower()] = value
+        verb = _verb_before(tokens, i)
+        if verb is not None:
+            targets.setdefault(verb, value)
+        if verb not in _TARGET_VERBS and value not in scope:
+            scope.append(value)
+    if not aliases:
+        return
+    merge_target = targets.get("MERGE")
+    set_target = targets.get("UPDATE") or targets.get("UPD") or merge_target
+    scope_key = tuple(scope)
+
+    def add(table: str | None, column: str, role: int) -> None:
+        if table is not None:
+            key = (table, column.lower())
+            qualified[key] = qualified.get(key, 0) | role
+
+    def add_bare(column: str, role: int) -> None:
+        if scope_key:
+            key = (scope_key, column.lower())
+            bare[key] = bare.get(key, 0) | role
+
+    # ── Colonnes ──────────────────────────────────────────────────────────────
+    depth = 0
+    set_depth: int | None = None     # profondeur d'une clause SET en cours
+    column_list: tuple[str, int] | None = None   # (table, profondeur) d'une liste INSERT (…)
+    listed: set[str] = set()         # cibles dont les colonnes sont énumérées
+    prev: tuple = ("punct", ";", None)
+    for i, token in enumerate(tokens):
+        kind, value, col = token
+        nxt = tokens[i + 1] if i + 1 < len(tokens) else ("punct", ";", None)
+        if kind == "punct":
+            if value == "(":
+                depth += 1
+                if prev[0] == "ref" and _verb_before(tokens, i - 1) in _TARGET_VERBS:
+                    column_list = (prev[1], depth)
+                    listed.add(prev[1])
+                elif _is_word(prev, "INSERT") and merge_target:
+                    column_list = (merge_target, depth)
+                    listed.add(merge_target)
+            elif value == ")":
+                if column_list and column_list[1] == depth:
+                    column_list = None
+                depth -= 1
+            elif value == "*" and (
+                _is_word(prev, "SELECT", "SEL", "DISTINCT") or prev[0] == "punct" and prev[1] == ","
+            ):
+                add_bare(ALL_COLUMNS, _READ)
+            prev = token
+            continue
+        if kind != "name":
+            prev = token
+            continue
+
+        word = value.upper()
+        if col is None and word in _KEYWORDS:
+            if word == "SET" and not _is_word(prev, "CHARACTER"):
+                set_depth = depth
+            elif word in ("WHERE", "FROM", "WHEN", "SELECT", "SEL") and set_depth == depth:
+                set_depth = None
+            prev = token
+            continue
+
+        in_set_target = (
+            set_depth == depth and nxt[0] == "punct" and nxt[1] == "="
+            and (_is_word(prev, "SET") or prev[0] == "punct" and prev[1] == ",")
+        )
+        if col is not None:
+            table = aliases.get(value.lower())
+            if col == ALL_COLUMNS:
+                add(table, ALL_COLUMNS, _READ)
+            else:
+                add(table, col, _WRITE if in_set_target else _READ)
+        elif column_list is not None and depth == column_list[1]:
+            add(column_list[0], value, _WRITE)
+        elif in_set_target:
+            add(set_target, value, _WRITE)
+        elif nxt[0] == "punct" and nxt[1] == "(":
+            pass  # fonction
+        elif _is_word(prev, "AS") or _is_operand(prev) or prev[0] == "punct" and prev[1] == ")":
+            pass  # alias de colonne, de table ou de sous-requête
+        elif _is_word(prev, *_TABLE_CLAUSES):
+            pass  # table non préfixée (CTE, sous-requête)
+        elif value.lower() not in aliases:
+            add_bare(value, _READ)
+        prev = token
+
+    # INSERT … SELECT sans liste de colonnes, CREATE TABLE … AS : toutes les
+    # colonnes de la cible sont écrites
+    for verb, table in targets.items():
+        if verb in ("INSERT", "INS", "CREATE", "REPLACE") and table not in listed:
+            add(table, ALL_COLUMNS, _WRITE)
+
+
+def scan_sql_columns(data: Any) -> tuple[list[tuple[str, str, int]], list[tuple[tuple[str, ...], str, int]]]:
+    """Colonnes utilisées par un SQL, en une passe.
+
+    qualified : [(table, colonne, masque de rôles), ...] — colonnes dont la
+                table est connue (alias, liste INSERT, cible du SET) ;
+    bare :      [((tables lues…), colonne, masque), ...] — colonnes nues, à
+                rattacher à l'une des tables lues par l'instruction.
+
+    Une table est « BQ_SOCLE.clients », ou « £NOM » / « £NOM.table » pour
+    une £variable (développée par `ColumnIndex`). Colonnes en minuscules.
+    """
+    qualified: dict[tuple[str, str], int] = {}
+    bare: dict[tuple[tuple[str, ...], str], int] = {}
+    for statement in _statements(_tokens(_decode_text(data))):
+        _scan_statement(statement, qualified, bare)
+    return (
+        [(table, column, mask) for (table, column), mask in qualified.items()],
+        [(scope, column, mask) for (scope, column), mask in bare.items()],
+    )
+
+
+def _scan_columns(path: Path) -> tuple[list, list]:
+    try:
+        return _parse_cached(path, "cols", scan_sql_columns)
+    except OSError:
+        return [], []
+
+
+# ── Index inverse ─────────────────────────────────────────────────────────────
+class ColumnIndex:
+    """Index inverse (table, colonne) → {yaml_path du flux : masque de rôles}.
+
+    `covered[table]` : flux dont au moins une colonne de `table` a été
+    relevée ; un flux qui référence la table sans y figurer l'utilise en
+    entier. Un index n'est jamais modifié une fois publié : `updated()`
+    en dérive un nouveau pour un delta du store.
+    """
+
+    _STATE = ("postings", "covered", "_columns", "_by_flux")
+
+    def __init__(self, flux_list: Iterable[Mapping], catalog: SchemaCatalog):
+        self.postings: dict[tuple[str, str], dict[str, int]] = {}
+        self.covered: dict[str, set[str]] = {}
+        self._columns: dict[str, set[str]] = {}         # table → colonnes relevées
+        self._by_flux: dict[str, list[tuple[str, str]]] = {}  # yaml_path → clés de postings
+        self._schemas: dict[str, frozenset[str]] = {}
+        self._catalog = catalog
+        for flux in flux_list:
+            sql_files = flux["sql_files"]
+            if sql_files:
+                self._add(flux["yaml_path"], self._usage(flux["yaml_path"], sql_files))
+
+    def updated(self, removed: Iterable[str], flux_list: Iterable[Mapping]) -> "ColumnIndex":
+        """Copie où les flux `removed` (yaml_path) sont retirés et ceux de
+        `flux_list` (ré)indexés ; seules les entrées touchées sont copiées,
+        les autres sont partagées avec cet index."""
+        usages = {
+            flux["yaml_path"]: self._usage(flux["yaml_path"], flux["sql_files"])
+            for flux in flux_list if flux["sql_files"]
+        }
+        gone = set(removed) | usages.keys()
+        keys = {key for path in gone for key in self._by_flux.get(path, ())}
+        keys.update(key for usage in usages.values() for key in usage)
+        tables = {table for table, _ in keys}
+
+        new = ColumnIndex((), self._catalog)
+        new._schemas = self._schemas
+        new.postings = {**self.postings, **{k: dict(self.postings[k]) for k in keys if k in self.postings}}
+        new.covered = {**self.covered, **{t: set(self.covered[t]) for t in tables if t in self.covered}}
+        new._columns = {**self._columns, **{t: set(self._columns[t]) for t in tables if t in self._columns}}
+        new._by_flux = dict(self._by_flux)
+        for path in gone:
+            new._remove(path)
+        for path, usage in usages.items():
+            new._add(path, usage)
+        return new
+
+    # ── Persistance ───────────────────────────────────────────────────────────
+    def save(self, path: Path, version: str) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        state = {name: getattr(self, name) for name in self._STATE}
+        with open(tmp, "wb") as fh:
+            pickle.dump(
+                {"format": _COLUMNS_VERSION, "version": version, "state": state},
+                fh, protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path, version: str, catalog: SchemaCatalog) -> "ColumnIndex | None":
+        """Index persisté pour `version` du store (None s'il est absent,
+        illisible ou obsolète)."""
+        try:
+            with open(path, "rb") as fh:
+                saved = pickle.load(fh)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            return None
+        if not isinstance(saved, dict) or saved.get("format") != _COLUMNS_VERSION \
+                or saved.get("version") != version:
+            return None
+        column_index = cls((), catalog)
+        for name in cls._STATE:
+            setattr(column_index, name, saved["state"][name])
+        return column_index
+
+    # ── Construction ──────────────────────────────────────────────────────────
+    def _columns_of(self, table: str) -> frozenset[str] | None:
+        if table not in self._schemas:
+            schema = self._catalog.get(table)
+            self._schemas[table] = frozenset(
+                col["nom"].lower() for col in schema["columns"]
+            ) if schema else frozenset()
+        return self._schemas[table] or None
+
+    def _usage(self, yaml_path: str, sql_files: list[str]) -> dict[tuple[str, str], int]:
+        """{(table, colonne) : masque} des SQL d'un flux."""
+        variables: dict[str, str] | None = None
+
+        def resolve(table: str) -> str | None:
+            nonlocal variables
+            if not table.startswith("£"):
+                return table if _TABLE_REF_RE.fullmatch(table) else None
+            if variables is None:
+                variables = _parse_yaml_meta(Path(yaml_path))["variables"]
+            found = sql_table_refs(variables, [(table[1:], 0)])
+            return f"{found[0][1]}.{found[0][2]}" if found else None
+
+        usage: dict[tuple[str, str], int] = {}
+        for sql_path in sql_files:
+            qualified, bare = _scan_columns(Path(sql_path))
+            for table, column, mask in qualified:
+                key = resolve(table)
+                if key is not None:
+                    usage[key, column] = usage.get((key, column), 0) | mask
+            for scope, column, mask in bare:
+                tables = [key for key in map(resolve, scope) if key is not None]
+                for key in self._attribute(tables, column):
+                    usage[key, column] = usage.get((key, column), 0) | mask
+        return usage
+
+    def _add(self, yaml_path: str, usage: dict[tuple[str, str], int]) -> None:
+        for (table, column), mask in usage.items():
+            self.postings.setdefault((table, column), {})[yaml_path] = mask
+            self.covered.setdefault(table, set()).add(yaml_path)
+            if column != ALL_COLUMNS:
+                self._columns.setdefault(table, set()).add(column)
+        self._by_flux[yaml_path] = list(usage)
+
+    def _remove(self, yaml_path: str) -> None:
+        for table, column in self._by_flux.pop(yaml_path, ()):
+            posting = self.postings[table, column]
+            del posting[yaml_path]
+            if not posting:
+                del self.postings[table, column]
+                if column != ALL_COLUMNS:
+                    self._columns[table].discard(column)
+                    if not self._columns[table]:
+                        del self._columns[table]
+            covered = self.covered.get(table)
+            if covered is not None:
+                covered.discard(yaml_path)
+                if not covered:
+                    del self.covered[table]
+
+    def _attribute(self, tables: list[str], column: str) -> list[str]:
+        """Tables auxquelles rattacher une colonne nue : celles dont le schéma
+        la déclare, sinon celles dont le schéma est inconnu."""
+        if column == ALL_COLUMNS:
+            return tables
+        known = [t for t in tables if self._columns_of(t) is not None]
+        declared = [t for t in known if column in self._columns_of(t)]
+        return declared or [t for t in tables if t not in known]
+
+    # ── Requêtes ──────────────────────────────────────────────────────────────
+    def usage(self, table: str, column: str, yaml_path: str) -> tuple[int, bool] | None:
+        """(masque des rôles, table entière) de `column` de `table` pour le
+        flux, ou None s'il ne l'utilise pas. Un flux absent de
+        `covered[table]` utilise toute la table (masque 0 : rôles inconnus)."""
+        if yaml_path not in self.covered.get(table, ()):
+            return 0, True
+        star = self.postings.get((table, ALL_COLUMNS), {}).get(yaml_path, 0)
+        mask = star | self.postings.get((table, column.lower()), {}).get(yaml_path, 0)
+        return (mask, bool(star)) if mask else None
+
+    def columns(self, table: str) -> list[str]:
+        """Colonnes de `table` utilisées par au moins un flux, triées."""
+        return sorted(self._columns.get(table, ()))
+
+
+# ── Public API ────────────────────────────────────────────────────────────────
+_MEMO = IndexMemo()
+
+
+def get_column_index(index: Mapping | None = None, workspace: Path | None = None) -> ColumnIndex:
+    """`ColumnIndex` d'un index en mémoire, mémoïsé tant que le même objet est
+    passé (avec un store : `IndexStore.column_index()`). Schémas : catalogue
+    de `workspace` (défaut : racine du `CompactIndex`, sinon WORKSPACE_ROOT)."""
+    source = index if index is not None else build_index()
+    if workspace is None:
+        workspace = Path(source.root) if isinstance(source, CompactIndex) else WORKSPACE_ROOT
+    return _MEMO.get_or_compute(source, lambda: ColumnIndex(source["flux"], get_schema_catalog(workspace)))
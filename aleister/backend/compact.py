@@ -0,0 +1,441 @@
+"""Aleister — Représentation compacte de l'index.
+
+`CompactIndex` stocke les flux en colonnes au lieu d'une liste de dicts :
+
+  - domaine, type et plateforme : identifiants entiers vers un vocabulaire
+    de chaînes internées (array 'H' / 'B') ;
+  - références de tables : identifiants entiers (array 'I') vers un
+    catalogue unique de tables, avec le domaine propriétaire encodé de
+    la même façon et les rôles en masque de bits (array 'B') ;
+  - chemins : YAML réduit à son nom de fichier quand il suit l'arborescence
+    `<Domaine>/<Type>/config/` (sinon relatif à la racine), SQL réduits à
+    leur nom (ils sont toujours dans le répertoire sql/ voisin du YAML) ;
+  - index inverse `tables` : positions de flux (array 'I') et masques de
+    rôles par table ;
+  - jobs : chemins et descriptions à plat, job_id et noms de paramètres
+    en vocabulaires, valeurs de paramètres à plat (offsets par flux et
+    par job).
+
+L'objet reste compatible avec les appelants existants : `idx["flux"]`
+est une séquence de `FluxRecord` (vues en lecture seule exposant les
+mêmes clés qu'un flux de `build_index()`), `idx["tables"]` un mapping
+table → {id_script : rôles}. Le pickling ne sérialise que les colonnes, ce qui
+réduit d'autant le coût de copie (`st.cache_data`, multiprocessing).
+
+Un `CompactIndex` est immuable : le mode incrémental et le watcher
+travaillent sur l'index dict, converti via `CompactIndex.from_index()`.
+Chargé depuis un snapshot (`snapshot.load_snapshot`), ses colonnes sont
+des vues (memoryview, `StringColumn`) sur le fichier projeté en mémoire.
+"""
+
+from __future__ import annotations
+
+import sys
+from array import array
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from aleister.backend.sql_scanner import mask_of, roles_of
+from aleister.backend.table_lookup import TableLookup
+
+FLUX_KEYS = (
+    "id_script", "description", "domaine", "type", "plateforme",
+    "yaml_path", "sql_files", "tables_referenced", "is_transverse", "jobs",
+)
+
+
+class _Vocab:
+    """Vocabulaire de chaînes internées ↔ identifiants entiers."""
+
+    __slots__ = ("names", "ids")
+
+    def __init__(self, names: list[str] | None = None):
+        self.names: list[str] = []
+        self.ids: dict[str, int] = {}
+        for name in names or []:
+            self.id_of(name)
+
+    def id_of(self, name: str) -> int:
+        value = self.ids.get(name)
+        if value is None:
+            value = self.ids[name] = len(self.names)
+            self.names.append(sys.intern(name))
+        return value
+
+
+class StringColumn(Sequence):
+    """Colonne de chaînes UTF-8 concaténées, décodées à la lecture.
+
+    `offsets[i]:offsets[i + 1]` délimite la i-ème chaîne dans `blob`.
+    """
+
+    __slots__ = ("_blob", "_offsets")
+
+    def __init__(self, blob: memoryview, offsets: memoryview):
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, pos):
+        if isinstance(pos, slice):
+            return [self[i] for i in range(*pos.indices(len(self)))]
+        if pos < 0:
+            pos += len(self)
+        if not 0 <= pos < len(self):
+            raise IndexError(pos)
+        raw = self._blob[self._offsets[pos]:self._offsets[pos + 1]]
+        return str(raw, "utf-8", "surrogateescape")
+
+
+def _materialize(value: Any) -> Any:
+    """Colonne de snapshot → équivalent en mémoire (pour le pickling)."""
+    if isinstance(value, memoryview):
+        return array(value.format, value)
+    if isinstance(value, StringColumn):
+        return list(value)
+    return value
+
+
+class FluxRecord(Mapping):
+    """Vue dict-compatible (lecture seule) d'un flux d'un `CompactIndex`."""
+
+    __slots__ = ("_idx", "_pos")
+
+    def __init__(self, idx: "CompactIndex", pos: int):
+        self._idx = idx
+        self._pos = pos
+
+    def __getitem__(self, key: str) -> Any:
+        getter = _GETTERS.get(key)
+        if getter is None:
+            raise KeyError(key)
+        return getter(self._idx, self._pos)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(FLUX_KEYS)
+
+    def __len__(self) -> int:
+        return len(FLUX_KEYS)
+
+    def __repr__(self) -> str:
+        return f"FluxRecord({self['id_script']!r})"
+
+    @property
+    def position(self) -> int:
+        return self._pos
+
+    def table_ids(self) -> array:
+        """Identifiants des tables référencées (sans matérialiser de dicts)."""
+        idx = self._idx
+        return idx._ref_tables[idx._ref_offsets[self._pos]:idx._ref_offsets[self._pos + 1]]
+
+
+def _yaml_rel(idx: "CompactIndex", pos: int) -> str:
+    rel = idx._yaml_rel[pos]
+    if "/" in rel:
+        return rel
+    domaine = idx._domains.names[idx._domaine_col[pos]]
+    flow_type = idx._types.names[idx._type_col[pos]]
+    return f"{domaine}/{flow_type}/config/{rel}"
+
+
+def _sql_files(idx: "CompactIndex", pos: int) -> list[str]:
+    names = idx._sql_names[idx._sql_offsets[pos]:idx._sql_offsets[pos + 1]]
+    if not names:
+        return []
+    sql_dir = Path(idx.root) / Path(_yaml_rel(idx, pos)).parent.parent / "sql"
+    return [str(sql_dir / name) for name in names]
+
+
+def _tables_referenced(idx: "CompactIndex", pos: int) -> list[dict]:
+    start, end = idx._ref_offsets[pos], idx._ref_offsets[pos + 1]
+    refs: list[dict] = []
+    for i in range(start, end):
+        platform, dataset, table = idx.table_parts[idx._ref_tables[i]]
+        refs.append({
+            "platform":      platform,
+            "dataset":       dataset,
+            "table":         table,
+            "roles":         roles_of(idx._ref_roles[i]),
+            "domaine_owner": idx._domains.names[idx._ref_owners[i]],
+        })
+    return refs
+
+
+def _jobs(idx: "CompactIndex", pos: int) -> list[dict]:
+    job_ids, param_names = idx._job_vocab.names, idx._param_vocab.names
+    offsets = idx._param_offsets
+    jobs: list[dict] = []
+    for j in range(idx._job_offsets[pos], idx._job_offsets[pos + 1]):
+        start, end = offsets[j], offsets[j + 1]
+        jobs.append({
+            "path":        idx._job_paths[j],
+            "job_id":      job_ids[idx._job_id_col[j]],
+            "description": idx._job_descriptions[j],
+            "parametres":  dict(zip(
+                (param_names[n] for n in idx._param_name_col[start:end]),
+                idx._param_values[start:end],
+            )),
+        })
+    return jobs
+
+
+_GETTERS = {
+    "id_script":         lambda idx, pos: idx._id_scripts[pos],
+    "description":       lambda idx, pos: idx._descriptions[pos],
+    "domaine":           lambda idx, pos: idx._domains.names[idx._domaine_col[pos]],
+    "type":              lambda idx, pos: idx._types.names[idx._type_col[pos]],
+    "plateforme":        lambda idx, pos: idx._platforms.names[idx._platform_col[pos]],
+    "yaml_path":         lambda idx, pos: str(Path(idx.root) / _yaml_rel(idx, pos)),
+    "sql_files":         _sql_files,
+    "tables_referenced": _tables_referenced,
+    "is_transverse":     lambda idx, pos: bool(idx._transverse[pos]),
+    "jobs":              _jobs,
+}
+
+
+class _FluxView(Sequence):
+    __slots__ = ("_idx",)
+
+    def __init__(self, idx: "CompactIndex"):
+        self._idx = idx
+
+    def __len__(self) -> int:
+        return len(self._idx._id_scripts)
+
+    def __getitem__(self, pos):
+        if isinstance(pos, slice):
+            return [FluxRecord(self._idx, i) for i in range(*pos.indices(len(self)))]
+        if pos < 0:
+            pos += len(self)
+        if not 0 <= pos < len(self):
+            raise IndexError(pos)
+        return FluxRecord(self._idx, pos)
+
+
+class _TablesView(Mapping):
+    __slots__ = ("_idx",)
+
+    def __init__(self, idx: "CompactIndex"):
+        self._idx = idx
+
+    def __getitem__(self, key: str) -> dict[str, list[str]]:
+        idx = self._idx
+        table_id = idx._table_ids.get(key)
+        if table_id is None:
+            raise KeyError(key)
+        masks: dict[str, int] = {}
+        for pos, mask in zip(idx._table_flux[table_id], idx._table_masks[table_id]):
+            id_script = idx._id_scripts[pos]
+            masks[id_script] = masks.get(id_script, 0) | mask
+        return {id_script: roles_of(mask) for id_script, mask in masks.items()}
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._idx.table_keys)
+
+    def __len__(self) -> int:
+        return len(self._idx.table_keys)
+
+
+class CompactIndex(Mapping):
+    """Index en colonnes, compatible avec le dict retourné par `build_index()`."""
+
+    _COLUMNS = (
+        "root", "_domains", "_types", "_platforms", "table_keys", "table_parts",
+        "_id_scripts", "_descriptions", "_domaine_col", "_type_col", "_platform_col",
+        "_yaml_rel", "_sql_names", "_sql_offsets", "_ref_tables", "_ref_owners",
+        "_ref_roles", "_ref_offsets", "_transverse",
+        "_job_vocab", "_param_vocab", "_job_offsets", "_job_paths", "_job_id_col",
+        "_job_descriptions", "_param_offsets", "_param_name_col", "_param_values",
+    )
+
+    def __init__(self, root: Path | str):
+        self.root = str(root)
+        self._domains = _Vocab()
+        self._types = _Vocab()
+        self._platforms = _Vocab()
+        self.table_keys: list[str] = []
+        self.table_parts: list[tuple[str, str, str]] = []
+        self._id_scripts: list[str] = []
+        self._descriptions: list[str] = []
+        self._domaine_col = array("H")
+        self._type_col = array("B")
+        self._platform_col = array("B")
+        self._yaml_rel: list[str] = []
+        self._sql_names: list[str] = []
+        self._sql_offsets = array("I", [0])
+        self._ref_tables = array("I")
+        self._ref_owners = array("H")
+        self._ref_roles = array("B")
+        self._ref_offsets = array("I", [0])
+        self._transverse = bytearray()
+        self._job_vocab = _Vocab()
+        self._param_vocab = _Vocab()
+        self._job_offsets = array("I", [0])
+        self._job_paths: list[str] = []
+        self._job_id_col = array("H")
+        self._job_descriptions: list[str] = []
+        self._param_offsets = array("I", [0])
+        self._param_name_col = array("H")
+        self._param_values: list[str] = []
+        self._init_derived()
+
+    def _init_derived(self) -> None:
+        """Structures reconstruites à la volée (jamais sérialisées)."""
+        self._table_ids = {key: i for i, key in enumerate(self.table_keys)}
+        self._table_flux: list[array] = [array("I") for _ in self.table_keys]
+        self._table_masks: list[array] = [array("B") for _ in self.table_keys]
+        for pos in range(len(self._id_scripts)):
+            for i in range(self._ref_offsets[pos], self._ref_offsets[pos + 1]):
+                table_id = self._ref_tables[i]
+                self._table_flux[table_id].append(pos)
+                self._table_masks[table_id].append(self._ref_roles[i])
+        self._domaines = sorted({self._domains.names[d] for d in self._domaine_col})
+        self._lookup: TableLookup | None = None
+
+    # ── Construction ──────────────────────────────────────────────────────────
+    @classmethod
+    def from_columns(
+        cls,
+        root: Path | str,
+        columns: Mapping[str, Any],
+        table_flux: list,
+        table_masks: list,
+    ) -> "CompactIndex":
+        """Index à partir de colonnes déjà construites (snapshot), sans recalcul
+        de l'index inverse : `table_flux` / `table_masks` sont fournis."""
+        compact = cls.__new__(cls)
+        for name in cls._COLUMNS:
+            setattr(compact, name, columns[name])
+        compact.root = str(root)
+        compact._table_ids = {key: i for i, key in enumerate(compact.table_keys)}
+        compact._table_flux = table_flux
+        compact._table_masks = table_masks
+        compact._domaines = sorted({compact._domains.names[d] for d in set(compact._domaine_col)})
+        compact._lookup = None
+        return compact
+
+    @classmethod
+    def from_index(cls, index: Mapping, root: Path | str) -> "CompactIndex":
+        compact = cls(root)
+        for flux in index["flux"]:
+            compact._append(flux)
+        compact._domaines = sorted({compact._domains.names[d] for d in compact._domaine_col})
+        return compact
+
+    def _table_id(self, platform: str, dataset: str, table: str) -> int:
+        key = f"{dataset}.{table}"
+        table_id = self._table_ids.get(key)
+        if table_id is None:
+            table_id = self._table_ids[key] = len(self.table_keys)
+            self.table_keys.append(sys.intern(key))
+            self.table_parts.append((sys.intern(platform), sys.intern(dataset), sys.intern(table)))
+            self._table_flux.append(array("I"))
+            self._table_masks.append(array("B"))
+            self._lookup = None
+        return table_id
+
+    def _append(self, flux: Mapping) -> None:
+        pos = len(self._id_scripts)
+        self._id_scripts.append(flux["id_script"])
+        self._descriptions.append(flux["description"])
+        self._domaine_col.append(self._domains.id_of(flux["domaine"]))
+        self._type_col.append(self._types.id_of(flux["type"]))
+        self._platform_col.append(self._platforms.id_of(flux["plateforme"]))
+        yaml_path = Path(flux["yaml_path"])
+        try:
+            yaml_rel = yaml_path.relative_to(self.root).as_posix()
+        except ValueError:
+            yaml_rel = yaml_path.as_posix()
+        if yaml_rel == f"{flux['domaine']}/{flux['type']}/config/{yaml_path.name}":
+            yaml_rel = yaml_path.name  # chemin déduit de domaine et type
+        self._yaml_rel.append(yaml_rel)
+        self._sql_names.extend(sys.intern(Path(p).name) for p in flux["sql_files"])
+        self._sql_offsets.append(len(self._sql_names))
+        for ref in flux["tables_referenced"]:
+            table_id = self._table_id(ref["platform"], ref["dataset"], ref["table"])
+            self._ref_tables.append(table_id)
+            self._ref_owners.append(self._domains.id_of(ref.get("domaine_owner", flux["domaine"])))
+            mask = mask_of(ref.get("roles", ()))
+            self._ref_roles.append(mask)
+            self._table_flux[table_id].append(pos)
+            self._table_masks[table_id].append(mask)
+        self._ref_offsets.append(len(self._ref_tables))
+        self._transverse.append(1 if flux["is_transverse"] else 0)
+        for job in flux.get("jobs", ()):
+            self._job_paths.append(job["path"])
+            self._job_id_col.append(self._job_vocab.id_of(job["job_id"]))
+            self._job_descriptions.append(job["description"])
+            for name, value in job["parametres"].items():
+                self._param_name_col.append(self._param_vocab.id_of(name))
+                self._param_values.append(value)
+            self._param_offsets.append(len(self._param_values))
+        self._job_offsets.append(len(self._job_paths))
+
+    # ── Protocole Mapping (compatibilité avec l'index dict) ──────────────────
+    def __getitem__(self, key: str) -> Any:
+        if key == "domaines":
+            return self._domaines
+        if key == "flux":
+            return _FluxView(self)
+        if key == "tables":
+            return _TablesView(self)
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(("domaines", "flux", "tables"))
+
+    def __len__(self) -> int:
+        return 3
+
+    def __getstate__(self) -> tuple:
+        return tuple(_materialize(getattr(self, name)) for name in self._COLUMNS)
+
+    def __setstate__(self, state: tuple) -> None:
+        for name, value in zip(self._COLUMNS, state):
+            setattr(self, name, value)
+        self._init_derived()
+
+    # ── Requêtes ──────────────────────────────────────────────────────────────
+    def to_dict(self) -> dict[str, Any]:
+        """Matérialise l'index au format dict de `build_index()`."""
+        return {
+            "domaines": list(self._domaines),
+            "flux":     [dict(flux) for flux in self["flux"]],
+            "tables":   {key: scripts for key, scripts in self["tables"].items() if scripts},
+        }
+
+    def table_lookup(self) -> TableLookup:
+        """Recherche exacte / préfixe / sous-chaîne sur `table_keys` (mêmes identifiants)."""
+        if self._lookup is None:
+            self._lookup = TableLookup(self.table_keys)
+        return self._lookup
+
+    def flux_referencing(
+        self,
+        search_key: str,
+        roles: Iterable[str] | None = None,
+    ) -> list[tuple[FluxRecord, str, str, list[str]]]:
+        """Comme `IndexStore.flux_referencing` : recherche sur le catalogue de
+        tables (`table_lookup`), puis parcours des seuls flux qui les référencent."""
+        matched = set(self.table_lookup().find(search_key))
+        if not matched:
+            return []
+        wanted = mask_of(roles) if roles else 0
+        positions = sorted({pos for t in matched for pos in self._table_flux[t]})
+        hits: list[tuple[FluxRecord, str, str, list[str]]] = []
+        for pos in positions:
+            start, end = self._ref_offsets[pos], self._ref_offsets[pos + 1]
+            for i in range(start, end):
+                table_id = self._ref_tables[i]
+                if table_id in matched and (not wanted or self._ref_roles[i] & wanted):
+                    owner = self._domains.names[self._ref_owners[i]]
+                    hits.append((
+                        FluxRecord(self, pos), self.table_keys[table_id], owner,
+                        roles_of(self._ref_roles[i]),
+                    ))
+                    break
+        return hits
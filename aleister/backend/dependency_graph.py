@@ -0,0 +1,255 @@
+"""Aleister — Graphe de dépendances table → flux → table.
+
+`analyze_impact` s'arrête aux flux qui citent la table. Ce module suit
+les données en aval : les flux qui lisent une table écrivent d'autres
+tables (staging → SOCLE → agrégats, enrichissements transverses…), dont
+les lecteurs sont à leur tour impactés.
+
+Le graphe est biparti et stocké en tableaux d'entiers (format CSR) :
+
+  - tables : identifiants entiers vers `table_keys` (« BQ_SOCLE.clients »),
+    domaine propriétaire de chaque table (`table_owner`) ;
+  - table → flux qui la référencent (`_ref_flux`, offsets `_ref_offsets`),
+    avec le masque de rôles de chaque référence (`_ref_masks`) ;
+  - flux → tables qu'il écrit, crée ou purge (`_writes`, offsets
+    `_write_offsets`).
+
+Les flux sont désignés par leur position dans l'index (`index["flux"]`) ;
+`flux_ids` donne l'identifiant de chacun dans le store (position + 1 après
+une écriture complète, rang des identifiants après un delta). Le graphe est
+construit à chaque écriture du store et persisté à côté de la base
+(`IndexStore.dependency_graph`).
+
+Parcours (`downstream`) : en largeur depuis les tables analysées.
+Profondeur 1 : tous les flux qui citent la table (ceux d'`analyze_impact`) ;
+profondeur n + 1 : les flux qui lisent une table écrite par un flux
+lecteur de profondeur n. Un flux qui ne fait qu'écrire une table n'en
+propage pas l'impact.
+"""
+
+from __future__ import annotations
+
+import pickle
+from array import array
+from pathlib import Path
+from typing import Iterable, Iterator, Mapping
+
+from aleister.backend.compact import CompactIndex
+from aleister.backend.index_memo import IndexMemo
+from aleister.backend.sql_scanner import ROLE_BITS, mask_of
+from aleister.backend.table_lookup import TableLookup
+
+_GRAPH_VERSION = 2
+
+_READ = ROLE_BITS["read"]
+# Rôles qui modifient le contenu de la table
+_WRITES = ROLE_BITS["write"] | ROLE_BITS["create"] | ROLE_BITS["delete"]
+
+
+def _csr(count: int, pairs: list[tuple[int, int, int]]) -> tuple[array, array, array]:
+    """(offsets, valeurs, masques) d'une liste d'arêtes (source, cible, masque)
+    triée par source ; `count` sources."""
+    offsets = array("I", [0]) * (count + 1)
+    for source, _, _ in pairs:
+        offsets[source + 1] += 1
+    for i in range(count):
+        offsets[i + 1] += offsets[i]
+    return offsets, array("I", (t for _, t, _ in pairs)), array("B", (m for _, _, m in pairs))
+
+
+class DependencyGraph:
+    """Graphe biparti tables / flux en tableaux d'entiers."""
+
+    _STATE = (
+        "table_keys", "domains", "table_owner", "flux_domain", "flux_ids",
+        "_ref_offsets", "_ref_flux", "_ref_masks", "_write_offsets", "_writes",
+    )
+
+    def __init__(self):
+        self.table_keys: list[str] = []
+        self.domains: list[str] = []
+        self.table_owner = array("H")
+        self.flux_domain = array("H")
+        self.flux_ids = array("I")
+        self._ref_offsets = array("I", [0])
+        self._ref_flux = array("I")
+        self._ref_masks = array("B")
+        self._write_offsets = array("I", [0])
+        self._writes = array("I")
+        self._init_derived()
+
+    def _init_derived(self) -> None:
+        self.lookup = TableLookup(self.table_keys)
+
+    # ── Construction ──────────────────────────────────────────────────────────
+    @classmethod
+    def from_refs(
+        cls,
+        flux_domains: Iterable[str],
+        refs: Iterable[tuple[int, str, str, int]],
+        flux_ids: Iterable[int] | None = None,
+    ) -> "DependencyGraph":
+        """Graphe à partir des références (position du flux, clé de table,
+        domaine propriétaire, masque de rôles). `flux_ids` : identifiants des
+        flux dans le store (défaut : position + 1)."""
+        graph = cls()
+        domain_ids: dict[str, int] = {}
+
+        def domain_id(name: str) -> int:
+            value = domain_ids.get(name)
+            if value is None:
+                value = domain_ids[name] = len(graph.domains)
+                graph.domains.append(name)
+            return value
+
+        graph.flux_domain = array("H", (domain_id(d) for d in flux_domains))
+        if flux_ids is None:
+            flux_ids = range(1, len(graph.flux_domain) + 1)
+        graph.flux_ids = array("I", flux_ids)
+        table_ids: dict[str, int] = {}
+        by_table: list[tuple[int, int, int]] = []
+        by_flux: list[tuple[int, int, int]] = []
+        for pos, key, owner, mask in refs:
+            table_id = table_ids.get(key)
+            if table_id is None:
+                table_id = table_ids[key] = len(graph.table_keys)
+                graph.table_keys.append(key)
+                graph.table_owner.append(domain_id(owner))
+            by_table.append((table_id, pos, mask))
+            if mask & _WRITES:
+                by_flux.append((pos, table_id, mask))
+        by_table.sort(key=lambda edge: edge[0])
+        by_flux.sort(key=lambda edge: edge[0])
+        graph._ref_offsets, graph._ref_flux, graph._ref_masks = _csr(len(graph.table_keys), by_table)
+        graph._write_offsets, graph._writes, _ = _csr(len(graph.flux_domain), by_flux)
+        graph._init_derived()
+        return graph
+
+    @classmethod
+    def from_index(cls, index: Mapping) -> "DependencyGraph":
+        """Graphe d'un index `build_index()` (dict ou `CompactIndex`)."""
+        if isinstance(index, CompactIndex):
+            owners, domains = index._ref_owners, index._domains.names
+            refs = (
+                (pos, index.table_keys[index._ref_tables[i]], domains[owners[i]], index._ref_roles[i])
+                for pos in range(len(index._id_scripts))
+                for i in range(index._ref_offsets[pos], index._ref_offsets[pos + 1])
+            )
+            return cls.from_refs((domains[d] for d in index._domaine_col), refs)
+        flux_list = index["flux"]
+        refs = (
+            (pos, f"{ref['dataset']}.{ref['table']}", ref.get("domaine_owner", flux["domaine"]),
+             mask_of(ref.get("roles", ())))
+            for pos, flux in enumerate(flux_list)
+            for ref in flux["tables_referenced"]
+        )
+        return cls.from_refs([flux["domaine"] for flux in flux_list], refs)
+
+    # ── Persistance ───────────────────────────────────────────────────────────
+    def save(self, path: Path, version: str) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        state = {name: getattr(self, name) for name in self._STATE}
+        with open(tmp, "wb") as fh:
+            pickle.dump(
+                {"format": _GRAPH_VERSION, "version": version, "state": state},
+                fh, protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path, version: str) -> "DependencyGraph | None":
+        """Graphe persisté pour `version` du store (None s'il est absent,
+        illisible ou obsolète)."""
+        try:
+            with open(path, "rb") as fh:
+                saved = pickle.load(fh)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            return None
+        if not isinstance(saved, dict) or saved.get("format") != _GRAPH_VERSION \
+                or saved.get("version") != version:
+            return None
+        graph = cls.__new__(cls)
+        for name in cls._STATE:
+            setattr(graph, name, saved["state"][name])
+        graph._init_derived()
+        return graph
+
+    # ── Requêtes ──────────────────────────────────────────────────────────────
+    @property
+    def flux_count(self) -> int:
+        return len(self.flux_domain)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self._ref_flux) + len(self._writes)
+
+    def references(self, table_id: int) -> Iterator[tuple[int, int]]:
+        """(position du flux, masque de rôles) des flux qui citent la table."""
+        for i in range(self._ref_offsets[table_id], self._ref_offsets[table_id + 1]):
+            yield self._ref_flux[i], self._ref_masks[i]
+
+    def readers(self, table_id: int) -> array:
+        """Positions des flux qui lisent la table."""
+        return array("I", (pos for pos, mask in self.references(table_id) if mask & _READ))
+
+    def written_by(self, pos: int) -> array:
+        """Tables que le flux écrit, crée ou purge."""
+        return self._writes[self._write_offsets[pos]:self._write_offsets[pos + 1]]
+
+    def match(self, search_key: str) -> list[int]:
+        """Tables désignées par `search_key`, comme `analyze_impact`
+        (`TableLookup.find`)."""
+        return self.lookup.find(search_key)
+
+    def downstream(
+        self,
+        seeds: Iterable[int],
+        max_depth: int | None = None,
+    ) -> tuple[dict[int, tuple[int, int, int]], dict[int, tuple[int, int]]]:
+        """Parcours en largeur depuis les tables `seeds`.
+
+        Returns:
+            (flux, tables) :
+              flux   : {position : (profondeur, table d'entrée, masque de la référence)} ;
+              tables : {table : (profondeur, position du flux qui l'écrit)} —
+                       profondeur 0 et position -1 pour les tables de départ.
+        """
+        ref_offsets, ref_flux, ref_masks = self._ref_offsets, self._ref_flux, self._ref_masks
+        write_offsets, writes = self._write_offsets, self._writes
+        tables: dict[int, tuple[int, int]] = {t: (0, -1) for t in seeds}
+        flux: dict[int, tuple[int, int, int]] = {}
+        expanded = bytearray(len(self.flux_domain))
+        frontier = list(tables)
+        depth = 1
+        while frontier and (max_depth is None or depth <= max_depth):
+            next_frontier: list[int] = []
+            for table_id in frontier:
+                for i in range(ref_offsets[table_id], ref_offsets[table_id + 1]):
+                    pos, mask = ref_flux[i], ref_masks[i]
+                    reads = mask & _READ
+                    if depth > 1 and not reads:
+                        continue  # autre producteur d'une table dérivée : non impacté
+                    if pos not in flux:
+                        flux[pos] = (depth, table_id, mask)
+                    if not reads or expanded[pos]:
+                        continue
+                    expanded[pos] = 1
+                    for j in range(write_offsets[pos], write_offsets[pos + 1]):
+                        written = writes[j]
+                        if written not in tables:
+                            tables[written] = (depth, pos)
+                            next_frontier.append(written)
+            frontier = next_frontier
+            depth += 1
+        return flux, tables
+
+
+# ── Public API ────────────────────────────────────────────────────────────────
+_MEMO = IndexMemo()
+
+
+def get_dependency_graph(index: Mapping) -> DependencyGraph:
+    """Graphe d'un index en mémoire, mémoïsé tant que le même objet est passé
+    (avec un store : `IndexStore.dependency_graph()`)."""
+    return _MEMO.get_or_compute(index, lambda: DependencyGraph.from_index(index))
@@ -12,7 +12,9 @@ from pathlib import Path
 from typing import Any
 
 from aleister.config import DOCS_ROOT
+from aleister.backend.index_store import IndexStore
 from aleister.backend.knowledge_base import build_index
+from aleister.backend.sql_scanner import roles_label
 
 
 def _read_cdc(yaml_path: str) -> str | None:
@@ -61,7 +63,8 @@ def flux_to_markdown(flux: dict) -> str:
         for ref in flux["tables_referenced"]:
             owner = ref.get("domaine_owner", flux["domaine"])
             tag = " **(transverse)**" if owner != flux["domaine"] else ""
-            lines.append(f"- `{ref['dataset']}.{ref['table']}`  (domaine : {owner}){tag}")
+            roles = roles_label(ref.get("roles", []))
+            lines.append(f"- `{ref['dataset']}.{ref['table']}`  ({roles} — domaine : {owner}){tag}")
         lines.append("")
 
     if flux["sql_files"]:
@@ -76,10 +79,17 @@ def flux_to_markdown(flux: dict) -> str:
     return "\n".join(lines)
 
 
-def domain_index_markdown(domaine: str, index: dict | None = None) -> str:
+def domain_index_markdown(
+    domaine: str,
+    index: dict | None = None,
+    store: IndexStore | None = None,
+) -> str:
     """Génère un index Markdown de tous les flux d'un domaine."""
-    idx = index or build_index()
-    flux_domaine = [f for f in idx["flux"] if f["domaine"] == domaine]
+    if store is not None:
+        flux_domaine = store.query_flux(domaine=domaine)
+    else:
+        idx = index or build_index()
+        flux_domaine = [f for f in idx["flux"] if f["domaine"] == domaine]
 
     lines = [f"# Domaine : {domaine}", "", f"**{len(flux_domaine)} flux indexés**", ""]
 
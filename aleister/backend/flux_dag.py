@@ -0,0 +1,319 @@
+"""Aleister — Graphe d'ordonnancement des flux (DAG flux → flux).
+
+Un flux B dépend d'un flux A dès que B lit une table que A écrit, crée ou
+purge : Import → Alimentation → Aggregat → Export, enrichissements
+transverses… Ce module ordonne ainsi tous les flux du workspace pour
+préparer la fenêtre batch :
+
+  - niveaux topologiques : niveau 0 = flux sans prédécesseur, niveau n + 1 =
+    flux dont le prédécesseur le plus tardif est au niveau n ; les flux
+    d'un même niveau peuvent tourner en parallèle (largeur du niveau) ;
+  - composantes fortement connexes (Tarjan, itératif) : une composante de
+    plus d'un flux est un cycle, ses flux partagent un niveau et sont
+    signalés ;
+  - exports DOT, GraphML et JSON.
+
+Les arêtes viennent des tableaux du `DependencyGraph` (flux → tables
+écrites, table → flux qui la lisent) et restent des tableaux d'entiers
+(format CSR) ; les flux sont désignés par leur position dans l'index.
+Un flux qui lit la table qu'il écrit (MERGE incrémental) n'a pas de
+boucle sur lui-même.
+"""
+
+from __future__ import annotations
+
+import json
+from array import array
+from typing import Any, Iterable, Mapping
+from xml.sax.saxutils import escape
+
+from aleister.backend.compact import CompactIndex
+from aleister.backend.dependency_graph import DependencyGraph, get_dependency_graph
+from aleister.backend.index_memo import IndexMemo
+from aleister.backend.index_store import IndexStore
+from aleister.backend.knowledge_base import build_index
+
+# Ordre d'exécution attendu des types, pour trier les flux d'un niveau
+TYPE_ORDER = ("Import", "Alimentation", "Aggregat", "Export")
+
+_DOT_COLORS = {"Import": "#4e79a7", "Alimentation": "#59a14f", "Aggregat": "#b07aa1", "Export": "#f28e2b"}
+
+
+def _dot_quote(text: str) -> str:
+    """Chaîne Graphviz entre guillemets (retours à la ligne en `\\n`)."""
+    return '"' + text.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+
+
+def _flux_edges(graph: DependencyGraph) -> tuple[array, array, array]:
+    """(offsets, successeurs, table de l'arête) : arêtes écrivain → lecteur,
+    sans doublon ni boucle, la première table commune sert d'étiquette."""
+    readers = [graph.readers(table_id) for table_id in range(len(graph.table_keys))]
+    count = graph.flux_count
+    offsets = array("I", [0]) * (count + 1)
+    succ, via = array("I"), array("I")
+    seen = array("I", [0]) * count  # seen[v] == u + 1 : arête u → v déjà émise
+    for u in range(count):
+        stamp = u + 1
+        for table_id in graph.written_by(u):
+            for v in readers[table_id]:
+                if v != u and seen[v] != stamp:
+                    seen[v] = stamp
+                    succ.append(v)
+                    via.append(table_id)
+        offsets[u + 1] = len(succ)
+    return offsets, succ, via
+
+
+def _tarjan(count: int, offsets: array, succ: array) -> tuple[array, int]:
+    """Composante fortement connexe de chaque flux, et nombre de composantes.
+
+    Les composantes sont numérotées dans l'ordre topologique inverse : une
+    arête entre composantes va toujours d'un numéro à un numéro plus petit.
+    """
+    order = array("i", [-1]) * count
+    low = array("i", [0]) * count
+    component = array("i", [-1]) * count
+    on_stack = bytearray(count)
+    stack: list[int] = []
+    counter = components = 0
+    for root in range(count):
+        if order[root] != -1:
+            continue
+        order[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = 1
+        work = [[root, offsets[root]]]
+        while work:
+            frame = work[-1]
+            v, i = frame
+            if i < offsets[v + 1]:
+                frame[1] = i + 1
+                w = succ[i]
+                if order[w] == -1:
+                    order[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    on_stack[w] = 1
+                    work.append([w, offsets[w]])
+                elif on_stack[w] and order[w] < low[v]:
+                    low[v] = order[w]
+                continue
+            work.pop()
+            if work and low[v] < low[work[-1][0]]:
+                low[work[-1][0]] = low[v]
+            if low[v] == order[v]:
+                while True:
+                    w = stack.pop()
+                    on_stack[w] = 0
+                    component[w] = components
+                    if w == v:
+                        break
+                components += 1
+    return component, components
+
+
+class FluxDag:
+    """Graphe flux → flux d'un workspace, niveaux et cycles précalculés."""
+
+    def __init__(self, graph: DependencyGraph, id_scripts: list[str], types: list[str]):
+        self.id_scripts = id_scripts
+        self.types = types
+        self.domains = [graph.domains[d] for d in graph.flux_domain]
+        self.table_keys = graph.table_keys
+        count = len(self.domains)
+        self._offsets, self._succ, self._via = _flux_edges(graph)
+        self.component, components = _tarjan(count, self._offsets, self._succ)
+
+        # Membres de chaque composante (tri par dénombrement)
+        starts = array("I", [0]) * (components + 1)
+        for c in self.component:
+            starts[c + 1] += 1
+        for c in range(components):
+            starts[c + 1] += starts[c]
+        members = array("I", [0]) * count
+        fill = array("I", starts)
+        for v in range(count):
+            c = self.component[v]
+            members[fill[c]] = v
+            fill[c] += 1
+
+        # Plus long chemin dans le graphe des composantes, sources d'abord
+        comp_level = array("I", [0]) * components
+        offsets, succ, component = self._offsets, self._succ, self.component
+        for c in range(components - 1, -1, -1):
+            next_level = comp_level[c] + 1
+            for k in range(starts[c], starts[c + 1]):
+                v = members[k]
+                for i in range(offsets[v], offsets[v + 1]):
+                    target = component[succ[i]]
+                    if target != c and comp_level[target] < next_level:
+                        comp_level[target] = next_level
+        self.level = array("I", (comp_level[c] for c in component))
+
+        rank = {name: i for i, name in enumerate(TYPE_ORDER)}
+        by_level: list[list[int]] = [[] for _ in range(max(comp_level, default=-1) + 1)]
+        for v in range(count):
+            by_level[self.level[v]].append(v)
+        for level in by_level:
+            level.sort(key=lambda v: (rank.get(self.types[v], len(rank)), self.id_scripts[v]))
+        self.levels = by_level
+        self.cycles = sorted(
+            (
+                sorted(members[starts[c]:starts[c + 1]])
+                for c in range(components)
+                if starts[c + 1] - starts[c] > 1
+            ),
+            key=lambda cycle: (-len(cycle), cycle[0]),
+        )
+
+    @classmethod
+    def from_index(cls, index: Mapping) -> "FluxDag":
+        """DAG d'un index `build_index()` (dict ou `CompactIndex`)."""
+        if isinstance(index, CompactIndex):
+            types = index._types.names
+            return cls(
+                get_dependency_graph(index), list(index._id_scripts),
+                [types[t] for t in index._type_col],
+            )
+        flux_list = index["flux"]
+        return cls(
+            get_dependency_graph(index),
+            [f["id_script"] for f in flux_list], [f["type"] for f in flux_list],
+        )
+
+    # ── Requêtes ──────────────────────────────────────────────────────────────
+    @property
+    def flux_count(self) -> int:
+        return len(self.domains)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self._succ)
+
+    @property
+    def widths(self) -> list[int]:
+        """Nombre de flux de chaque niveau (parallélisme maximal du niveau)."""
+        return [len(level) for level in self.levels]
+
+    @property
+    def max_width(self) -> int:
+        return max(self.widths, default=0)
+
+    def edges(self) -> Iterable[tuple[int, int, str]]:
+        """(flux amont, flux aval, table qui les relie)."""
+        for u in range(self.flux_count):
+            for i in range(self._offsets[u], self._offsets[u + 1]):
+                yield u, self._succ[i], self.table_keys[self._via[i]]
+
+    def summary(self) -> dict[str, Any]:
+        """{"flux", "edges", "depth", "max_width", "levels": [{"level", "width",
+        "types": {type: nombre}}], "cycles": nombre de cycles, "flux_in_cycles"}."""
+        levels = []
+        for depth, members in enumerate(self.levels):
+            types: dict[str, int] = {}
+            for v in members:
+                types[self.types[v]] = types.get(self.types[v], 0) + 1
+            levels.append({"level": depth, "width": len(members), "types": types})
+        return {
+            "flux": self.flux_count,
+            "edges": self.edge_count,
+            "depth": len(self.levels),
+            "max_width": self.max_width,
+            "levels": levels,
+            "cycles": len(self.cycles),
+            "flux_in_cycles": sum(len(cycle) for cycle in self.cycles),
+        }
+
+    # ── Exports ───────────────────────────────────────────────────────────────
+    def _cycle_of(self) -> dict[int, int]:
+        return {v: n for n, cycle in enumerate(self.cycles) for v in cycle}
+
+    def to_json(self) -> str:
+        """Nœuds (position, id_script, domaine, type, niveau, cycle), arêtes
+        (source, cible, table), résumé et cycles."""
+        cycle_of = self._cycle_of()
+        payload = {
+            "summary": self.summary(),
+            "nodes": [
+                {
+                    "id": v,
+                    "id_script": self.id_scripts[v],
+                    "domaine": self.domains[v],
+                    "type": self.types[v],
+                    "level": self.level[v],
+                    "cycle": cycle_of.get(v),
+                }
+                for v in range(self.flux_count)
+            ],
+            "edges": [{"source": u, "target": v, "via": table} for u, v, table in self.edges()],
+            "cycles": self.cycles,
+        }
+        return json.dumps(payload, ensure_ascii=False)
+
+    def to_dot(self) -> str:
+        """Graphviz : un rang par niveau, couleur par type, cycles en rouge."""
+        cycle_of = self._cycle_of()
+        lines = ["digraph flux {", "  rankdir=LR;", '  node [shape=box, style="rounded,filled", fillcolor=white];']
+        for depth, members in enumerate(self.levels):
+            lines.append(f"  subgraph level_{depth} {{ rank=same;")
+            for v in members:
+                label = _dot_quote(f"{self.id_scripts[v]}\n{self.domains[v]} — {self.types[v]}")
+                color = "#e15759" if v in cycle_of else _DOT_COLORS.get(self.types[v], "#bab0ac")
+                lines.append(f'    f{v} [label={label}, color="{color}"];')
+            lines.append("  }")
+        for u, v, table in self.edges():
+            lines.append(f"  f{u} -> f{v} [tooltip={_dot_quote(table)}];")
+        lines.append("}")
+        return "\n".join(lines) + "\n"
+
+    def to_graphml(self) -> str:
+        """GraphML (yEd, Gephi…) : attributs de nœud et table de chaque arête."""
+        cycle_of = self._cycle_of()
+        lines = [
+            '<?xml version="1.0" encoding="UTF-8"?>',
+            '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">',
+            '  <key id="id_script" for="node" attr.name="id_script" attr.type="string"/>',
+            '  <key id="domaine" for="node" attr.name="domaine" attr.type="string"/>',
+            '  <key id="type" for="node" attr.name="type" attr.type="string"/>',
+            '  <key id="level" for="node" attr.name="level" attr.type="int"/>',
+            '  <key id="cycle" for="node" attr.name="cycle" attr.type="int"/>',
+            '  <key id="via" for="edge" attr.name="via" attr.type="string"/>',
+            '  <graph id="flux" edgedefault="directed">',
+        ]
+        for v in range(self.flux_count):
+            lines.append(
+                f'    <node id="f{v}">'
+                f'<data key="id_script">{escape(self.id_scripts[v])}</data>'
+                f'<data key="domaine">{escape(self.domains[v])}</data>'
+                f'<data key="type">{escape(self.types[v])}</data>'
+                f'<data key="level">{self.level[v]}</data>'
+                f'<data key="cycle">{cycle_of.get(v, -1)}</data></node>'
+            )
+        for u, v, table in self.edges():
+            lines.append(
+                f'    <edge source="f{u}" target="f{v}"><data key="via">{escape(table)}</data></edge>'
+            )
+        lines += ["  </graph>", "</graphml>"]
+        return "\n".join(lines) + "\n"
+
+
+# ── Public API ────────────────────────────────────────────────────────────────
+_MEMO = IndexMemo()
+
+
+def flux_dag(index: Mapping | None = None, store: IndexStore | None = None) -> FluxDag:
+    """DAG des flux de l'index (ou du store), mémoïsé tant que le graphe de
+    dépendances sous-jacent est le même objet (un rafraîchissement du store
+    en produit un nouveau)."""
+    if store is not None:
+        graph = store.dependency_graph()
+
+        def compute() -> FluxDag:
+            labels = store.flux_labels()
+            return FluxDag(graph, [name for name, _ in labels], [kind for _, kind in labels])
+
+        return _MEMO.get_or_compute(graph, compute, slot=("store", str(store.db_path)))
+    index = index if index is not None else build_index()
+    graph = get_dependency_graph(index)
+    return _MEMO.get_or_compute(graph, lambda: FluxDag.from_index(index), slot=type(index))
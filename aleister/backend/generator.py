@@ -9,6 +9,7 @@ from groq import Groq
 
 from aleister.config import DOC_PATH, GROQ_API_KEY
 from aleister.backend.prompts import construire_system_prompt, construire_user_prompt
+from aleister.backend.schema_catalog import get_schema_catalog
 
 
 # ── Documentation ─────────────────────────────────────────────────────────────
@@ -25,6 +26,20 @@ def charger_documentation() -> str:
     return _DOC_CACHE
 
 
+# ── Schémas existants ─────────────────────────────────────────────────────────
+def schemas_existants(contexte: dict) -> dict[str, list[dict]]:
+    """Colonnes des tables staging / SOCLE du contexte qui existent déjà dans
+    le workspace, types convertis vers la plateforme cible (catalogue des schémas)."""
+    catalog = get_schema_catalog()
+    schemas: dict[str, list[dict]] = {}
+    for cle in ("nom_table_staging", "nom_table_socle"):
+        nom = (contexte.get(cle) or "").strip()
+        colonnes = catalog.columns(nom, contexte.get("plateforme")) if nom else []
+        if colonnes:
+            schemas[nom] = colonnes
+    return schemas
+
+
 # ── Client Groq ───────────────────────────────────────────────────────────────
 def get_groq_client(api_key: str = "") -> Groq:
     key = api_key or GROQ_API_KEY
@@ -58,6 +73,7 @@ def generer_workflow(
 ) -> str:
     """Génère un workflow complet à partir du contexte collecté."""
     doc = charger_documentation()
+    contexte = {**contexte, "schemas_existants": schemas_existants(contexte)}
     messages = [
         {"role": "system", "content": construire_system_prompt(doc)},
         {"role": "user",   "content": construire_user_prompt(contexte)},
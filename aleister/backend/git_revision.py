@@ -0,0 +1,198 @@
+"""Aleister — Index d'une révision git, sans checkout.
+
+`build_index_at(revision)` construit le même index que `build_index()`,
+mais lit les YAML et SQL directement dans les objets git (arbre de la
+révision, blobs) : aucune copie de travail n'est modifiée, on peut donc
+indexer la branche cible et la branche source d'une merge request côte à
+côte.
+
+Les résultats de parsing sont mis en cache par hash de blob (YAML : méta-
+données et Requete ; SQL : références et rôles ; scripts socle : tables
+créées). Un fichier inchangé entre deux révisions a le même blob et n'est
+ni relu ni re-parsé : indexer dix révisions récentes coûte un parsing
+complet plus les deltas. Ce cache est `parse_cache`, celui du build de
+la copie de travail (mêmes clés, hash de blob) : un fichier déjà parsé
+dans la copie de travail ne l'est pas de nouveau. Chaque lecture rend une
+copie : les index de deux révisions ne partagent aucun objet.
+Avec PARSE_CACHE_MB = 0, chaque révision est parsée entièrement.
+
+Les chemins de l'index (`yaml_path`, `sql_files`) sont ceux qu'auraient
+les fichiers dans le workspace extrait : les index de deux révisions se
+comparent directement, et avec celui du workspace courant.
+"""
+
+from __future__ import annotations
+
+import subprocess
+from pathlib import Path
+from typing import Any, Callable
+
+from aleister.config import WORKSPACE_ROOT
+from aleister.backend.compact import CompactIndex
+from aleister.backend.knowledge_base import (
+    _CACHE_VERSION,
+    _decode_text,
+    _flux_entry,
+    _is_indexed,
+    _parse_yaml_text,
+    _socle_tables,
+    _table_refs,
+    _tables_index,
+    _type_dir_of,
+)
+from aleister.backend.parse_cache import ParseCache, get_parse_cache
+from aleister.backend.sql_scanner import scan_sql_refs
+
+
+def _git(cwd: Path, *args: str) -> bytes:
+    try:
+        return subprocess.run(
+            ["git", *args], cwd=cwd, check=True, capture_output=True
+        ).stdout
+    except subprocess.CalledProcessError as exc:
+        message = exc.stderr.decode("utf-8", "replace").strip()
+        raise ValueError(f"git {args[0]} : {message}") from exc
+
+
+class _BlobReader:
+    """Lecture de blobs via un processus `git cat-file --batch` persistant."""
+
+    def __init__(self, repo: Path):
+        self._proc = subprocess.Popen(
+            ["git", "cat-file", "--batch"],
+            cwd=repo, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+        )
+
+    def read(self, sha: str) -> bytes:
+        self._proc.stdin.write(sha.encode() + b"\n")
+        self._proc.stdin.flush()
+        header = self._proc.stdout.readline().split()
+        if len(header) != 3:
+            raise ValueError(f"blob introuvable : {sha}")
+        data = self._proc.stdout.read(int(header[2]) + 1)
+        return data[:-1]  # saut de ligne final du protocole
+
+    def close(self) -> None:
+        self._proc.stdin.close()
+        self._proc.wait()
+
+    def __enter__(self) -> "_BlobReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _parsed(
+    reader: _BlobReader,
+    cache: ParseCache | None,
+    kind: str,
+    sha: str,
+    parse: Callable[[bytes], Any],
+    qualifier: str = "",
+) -> Any:
+    """Résultat de `parse` pour un blob : cache de parsing, sinon lecture."""
+    key = f"{kind}:{sha}{qualifier}"
+    value = cache.get(key) if cache is not None else None
+    if value is None:
+        value = parse(reader.read(sha))
+        if cache is not None:
+            cache.put(key, value)
+    return value
+
+
+def _list_tree(repo: Path, revision: str, prefix: str) -> dict[str, str]:
+    """{chemin relatif à `prefix` : hash du blob} de tous les fichiers de la révision."""
+    args = ["ls-tree", "-r", "-z", "--full-tree", revision]
+    if prefix:
+        args += ["--", prefix]
+    blobs: dict[str, str] = {}
+    for record in _git(repo, *args).split(b"\0"):
+        if not record:
+            continue
+        info, path = record.split(b"\t", 1)
+        _, kind, sha = info.split()
+        if kind != b"blob":
+            continue  # sous-module
+        rel = path.decode("utf-8", "surrogateescape")
+        if prefix:
+            rel = rel[len(prefix) + 1:]
+        blobs[rel] = sha.decode()
+    return blobs
+
+
+def _locate(workspace: Path) -> tuple[Path, str]:
+    """(racine du dépôt, chemin du workspace relatif à cette racine)."""
+    top = Path(_git(workspace, "rev-parse", "--show-toplevel").decode().strip())
+    prefix = workspace.resolve().relative_to(top.resolve()).as_posix()
+    return top, "" if prefix == "." else prefix
+
+
+# ── Public API ────────────────────────────────────────────────────────────────
+def build_index_at(
+    revision: str,
+    workspace: Path | None = None,
+    compact: bool = False,
+) -> dict[str, Any]:
+    """Construit l'index du workspace tel qu'il est à `revision` (sans checkout).
+
+    Args:
+        revision:  toute révision git (branche, tag, sha, `HEAD~3`, `origin/main`…).
+        workspace: répertoire du workspace dans une copie de travail du dépôt
+                   (défaut : WORKSPACE_ROOT) ; seul son chemin est utilisé.
+        compact:   retourne un `CompactIndex` au lieu de dicts.
+
+    Raises:
+        ValueError: `workspace` hors d'un dépôt git, ou révision inconnue.
+
+    Returns a dict with keys: domaines, flux, tables (format de `build_index()`).
+    """
+    root = (workspace or WORKSPACE_ROOT).resolve()
+    repo, prefix = _locate(root)
+    tree = _list_tree(repo, revision, prefix)
+    rels = sorted((rel for rel in tree if _is_indexed(rel)), key=lambda rel: rel.split("/"))
+
+    cache = get_parse_cache(_CACHE_VERSION)
+    with _BlobReader(repo) as reader:
+        socle_map: dict[str, str] = {}
+        for rel in rels:
+            if "_creation_table_socle." not in rel:
+                continue
+            for table in _parsed(reader, cache, "socle", tree[rel], _socle_tables):
+                socle_map[table] = rel.split("/", 1)[0]
+
+        flux_list: list[dict] = []
+        for rel in rels:
+            loc = _type_dir_of(rel)
+            if loc is None or rel.split("/")[2] != "config":
+                continue
+            domaine, flow_type = loc
+            stem = Path(rel).stem
+            meta = _parsed(
+                reader, cache, "yaml", tree[rel],
+                lambda data: _parse_yaml_text(_decode_text(data), stem), f":{stem}",
+            )
+
+            sql_rels = [
+                f"{domaine}/{flow_type}/sql/{name}" for name in meta["requetes"]
+                if f"{domaine}/{flow_type}/sql/{name}" in tree
+            ]
+            table_refs = _table_refs(meta, [
+                _parsed(reader, cache, "sql", tree[sql_rel], scan_sql_refs)
+                for sql_rel in sql_rels
+            ])
+            flux_list.append(_flux_entry(
+                meta, domaine, flow_type, root / rel,
+                [root / sql_rel for sql_rel in sql_rels], table_refs, socle_map,
+            ))
+    if cache is not None:
+        cache.flush()
+
+    index = {
+        "domaines": sorted({f["domaine"] for f in flux_list}),
+        "flux":     flux_list,
+        "tables":   _tables_index(flux_list),
+    }
+    if compact:
+        return CompactIndex.from_index(index, root)
+    return index
@@ -0,0 +1,168 @@
+"""Aleister — Cache mémoire des résultats d'analyse d'impact.
+
+Chaque interaction Streamlit réexécute la page : la même table est
+réanalysée à chaque clic (changement de rôle, d'onglet, de profondeur…).
+Les résultats d'`analyze_impact`, `analyze_column_impact` et
+`analyze_downstream` sont donc gardés en mémoire, avec éviction LRU au-delà
+de IMPACT_CACHE_SIZE entrées.
+
+Clé : (source, version de l'index, analyse, table, options normalisées).
+
+  - store : la source est le chemin de la base, la version son `built_at`
+    (`IndexStore.version()`), qui change à chaque `write_index` — un
+    rafraîchissement (watcher, `refresh()`) invalide donc les résultats ;
+  - index en mémoire : une seule source, dont la version est l'identité
+    de l'objet ; analyser un autre index purge les résultats du précédent
+    (un seul index en mémoire à la fois). L'index est tenu par référence
+    faible quand son type le permet (`CompactIndex`), sinon par le seul
+    emplacement de version (un dict n'accepte pas de référence faible).
+
+Dès qu'une source change de version, ses anciennes entrées sont purgées ;
+quand sa dernière entrée est évincée, sa version est oubliée.
+Les résultats sont partagés entre les appels : ne pas les modifier.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Mapping
+
+from aleister.config import IMPACT_CACHE_SIZE
+from aleister.backend.index_memo import IndexVersion
+from aleister.backend.index_store import IndexStore
+
+
+def _freeze(value: Any, ordered: bool = True) -> Any:
+    """Argument hachable ; `ordered=False` pour les options dont l'ordre
+    n'a pas d'importance (listes de rôles)."""
+    if isinstance(value, (set, frozenset)) or (isinstance(value, (list, tuple)) and not ordered):
+        return tuple(sorted(value))
+    if isinstance(value, list):
+        return tuple(value)
+    return value
+
+
+class ImpactCache:
+    """Résultats d'analyse par clé, éviction LRU, compteurs de ce processus."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[tuple, Any] = OrderedDict()
+        self._versions: dict[Any, Any] = {}
+        self._counts: dict[Any, int] = {}  # entrées par source
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: tuple, compute: Callable[[], Any]) -> Any:
+        """Résultat sous `key` = (source, version, …), calculé par `compute()`
+        s'il est absent."""
+        source, version = key[0], key[1]
+        with self._lock:
+            if self._versions.get(source, version) != version:
+                self._purge(source)
+            self._versions[source] = version
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        try:
+            value = compute()  # hors verrou : deux calculs concurrents donnent le même résultat
+        except BaseException:
+            with self._lock:
+                if self._versions.get(source) == version:
+                    self._release(source, 0)  # ne garde pas la version d'une source vide
+            raise
+        with self._lock:
+            if self._versions.get(source) != version:
+                return value  # l'index a changé pendant le calcul
+            if key not in self._entries:
+                self._counts[source] = self._counts.get(source, 0) + 1
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._release(evicted[0])
+                self.evictions += 1
+        return value
+
+    def _release(self, source: Any, count: int = 1) -> None:
+        """Décompte `count` entrées de `source` ; oublie sa version à zéro."""
+        remaining = self._counts.get(source, 0) - count
+        if remaining > 0:
+            self._counts[source] = remaining
+        else:
+            self._counts.pop(source, None)
+            self._versions.pop(source, None)
+
+    def _purge(self, source: Any) -> None:
+        for key in [k for k in self._entries if k[0] == source]:
+            del self._entries[key]
+        self._counts.pop(source, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+            self._counts.clear()
+
+    def info(self) -> dict[str, int]:
+        """{"entries", "max_entries", "hits", "misses", "evictions"}."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+# ── Cache du processus ────────────────────────────────────────────────────────
+_CACHE = ImpactCache(max(IMPACT_CACHE_SIZE, 0))
+
+
+def get_impact_cache() -> ImpactCache:
+    """Cache partagé par le processus (toutes les sessions Streamlit)."""
+    return _CACHE
+
+
+def _source(index: Mapping | None, store: IndexStore | None) -> tuple[Any, Any]:
+    """(source, version) de l'index interrogé."""
+    if store is not None:
+        return ("store", str(store.db_path)), store.version()
+    if index is not None:
+        return ("index",), IndexVersion(index)
+    return ("workspace",), None  # build_index() par défaut : jamais mis en cache
+
+
+def cached_impact(
+    analysis: Callable[..., dict[str, Any]],
+    *args: Any,
+    index: Mapping | None = None,
+    store: IndexStore | None = None,
+    **options: Any,
+) -> dict[str, Any]:
+    """`analysis(*args, index=index, store=store, **options)`, mémoïsé.
+
+    `analysis` : `analyze_impact`, `analyze_column_impact`,
+    `analyze_downstream`… (toute analyse pure de l'index). Sans index ni
+    store, ou avec IMPACT_CACHE_SIZE = 0, l'analyse est toujours exécutée.
+    """
+    def compute() -> dict[str, Any]:
+        return analysis(*args, index=index, store=store, **options)
+
+    source, version = _source(index, store)
+    if _CACHE.max_entries <= 0 or source == ("workspace",):
+        return compute()
+    key = (
+        source, version,
+        analysis.__module__, analysis.__qualname__,
+        tuple(_freeze(a) for a in args),
+        tuple(sorted((k, _freeze(v, ordered=False)) for k, v in options.items())),
+    )
+    return _CACHE.get_or_compute(key, compute)
+
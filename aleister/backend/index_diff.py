@@ -0,0 +1,297 @@
+"""Aleister — Comparaison de deux index.
+
+`diff_indexes(old, new)` compare deux index (dicts de `build_index()`,
+`CompactIndex`, snapshots chargés par `read_snapshot`) et retourne le
+delta de dépendances :
+
+  - flux ajoutés, supprimés, modifiés (champs, tables ajoutées ou
+    retirées, rôles changés) — les flux sont appariés par id_script ;
+  - bascules `is_transverse` (flux devenus ou redevenus locaux) ;
+  - dépendances cross-domaine apparues ou disparues (flux, table, domaine
+    propriétaire) ;
+  - changements de propriétaire des tables SOCLE (scripts de création
+    déplacés d'un domaine à l'autre).
+
+Les `CompactIndex` sont comparés sur leurs colonnes, sans matérialiser de
+dicts : comparer deux snapshots de ~10 000 flux prend une fraction de
+seconde, sans parcours du workspace (usage CI, revue de merge request).
+
+    diff = diff_snapshots(Path("main.snap"), Path("branche.snap"))
+    print(diff_markdown(diff))
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Mapping
+
+from aleister.backend.compact import CompactIndex, _jobs, _yaml_rel
+from aleister.backend.snapshot import read_snapshot
+from aleister.backend.sql_scanner import mask_of, roles_label, roles_of
+
+# Champs descriptifs d'un flux comparés un à un
+FIELDS = ("description", "domaine", "type", "plateforme", "yaml_file", "sql_files", "jobs")
+
+# État d'un flux : (valeurs de FIELDS, {table : (masque de rôles, propriétaire)}, transverse)
+_State = tuple[tuple, dict[str, tuple[int, str]], bool]
+
+
+# ── États des flux ────────────────────────────────────────────────────────────
+def _jobs_state(jobs) -> tuple:
+    return tuple(
+        (job["path"], job["job_id"], job["description"], tuple(job["parametres"].items()))
+        for job in jobs
+    )
+
+
+def _compact_states(idx: CompactIndex) -> list[tuple[str, str, _State]]:
+    domains = idx._domains.names
+    types = idx._types.names
+    platforms = idx._platforms.names
+    keys = idx.table_keys
+    ref_tables, ref_roles, ref_owners = idx._ref_tables, idx._ref_roles, idx._ref_owners
+    ref_offsets, sql_offsets = idx._ref_offsets, idx._sql_offsets
+    states: list[tuple[str, str, _State]] = []
+    for pos in range(len(idx._id_scripts)):
+        yaml_file = _yaml_rel(idx, pos).rsplit("/", 1)[-1]
+        domaine, flow_type = domains[idx._domaine_col[pos]], types[idx._type_col[pos]]
+        fields = (
+            idx._descriptions[pos],
+            domaine,
+            flow_type,
+            platforms[idx._platform_col[pos]],
+            yaml_file,
+            tuple(idx._sql_names[sql_offsets[pos]:sql_offsets[pos + 1]]),
+            _jobs_state(_jobs(idx, pos)),
+        )
+        refs = {
+            keys[ref_tables[i]]: (ref_roles[i], domains[ref_owners[i]])
+            for i in range(ref_offsets[pos], ref_offsets[pos + 1])
+        }
+        location = f"{domaine}/{flow_type}/{yaml_file}"
+        states.append((idx._id_scripts[pos], location, (fields, refs, bool(idx._transverse[pos]))))
+    return states
+
+
+def _dict_states(index: Mapping) -> list[tuple[str, str, _State]]:
+    states: list[tuple[str, str, _State]] = []
+    for flux in index["flux"]:
+        yaml_file = Path(flux["yaml_path"]).name
+        fields = (
+            flux["description"],
+            flux["domaine"],
+            flux["type"],
+            flux["plateforme"],
+            yaml_file,
+            tuple(Path(p).name for p in flux["sql_files"]),
+            _jobs_state(flux.get("jobs", ())),
+        )
+        refs = {
+            f"{ref['dataset']}.{ref['table']}": (
+                mask_of(ref.get("roles", ())),
+                ref.get("domaine_owner", flux["domaine"]),
+            )
+            for ref in flux["tables_referenced"]
+        }
+        location = f"{flux['domaine']}/{flux['type']}/{yaml_file}"
+        states.append((flux["id_script"], location, (fields, refs, bool(flux["is_transverse"]))))
+    return states
+
+
+def _flux_states(index: Mapping) -> list[tuple[str, str, _State]]:
+    """[(id_script, « domaine/type/fichier.yml », état), ...] de chaque flux."""
+    if isinstance(index, CompactIndex):
+        return _compact_states(index)
+    return _dict_states(index)
+
+
+def _duplicated(states: list[tuple[str, str, _State]]) -> set[str]:
+    seen: set[str] = set()
+    duplicated: set[str] = set()
+    for id_script, _, _ in states:
+        (duplicated if id_script in seen else seen).add(id_script)
+    return duplicated
+
+
+def _keyed(states: list[tuple[str, str, _State]], duplicated: set[str]) -> dict[str, _State]:
+    """Appariement par id_script ; un id_script porté par plusieurs flux (dans
+    l'un ou l'autre index) est qualifié par l'emplacement de son YAML."""
+    return {
+        f"{id_script} [{location}]" if id_script in duplicated else id_script: state
+        for id_script, location, state in states
+    }
+
+
+def _cross_domain(states: dict[str, _State]) -> dict[tuple[str, str], str]:
+    """{(flux, table) : propriétaire} des références vers un autre domaine."""
+    edges: dict[tuple[str, str], str] = {}
+    for key, (fields, refs, _) in states.items():
+        domaine = fields[1]
+        for table, (_, owner) in refs.items():
+            if owner != domaine:
+                edges[(key, table)] = owner
+    return edges
+
+
+def _socle_owners(states: dict[str, _State]) -> dict[str, str]:
+    """Propriétaire de chaque table SOCLE référencée, s'il est connu.
+
+    Une table SOCLE sans script de création est attribuée au domaine de
+    chaque flux qui la cite : elle n'a pas de propriétaire unique et n'est
+    pas retenue.
+    """
+    owners: dict[str, set[str]] = {}
+    for fields, refs, _ in states.values():
+        for table, (_, owner) in refs.items():
+            if table.split(".", 1)[0].endswith("_SOCLE"):
+                owners.setdefault(table, set()).add(owner)
+    return {table: found.pop() for table, found in owners.items() if len(found) == 1}
+
+
+# ── Comparaison ───────────────────────────────────────────────────────────────
+def _flux_delta(key: str, old: _State, new: _State) -> dict[str, Any] | None:
+    """Différences d'un flux présent des deux côtés, ou None s'il est inchangé."""
+    old_fields, old_refs, _ = old
+    new_fields, new_refs, _ = new
+    fields = [name for name, a, b in zip(FIELDS, old_fields, new_fields) if a != b]
+    tables_added = [
+        {"table": table, "roles": roles_of(new_refs[table][0])}
+        for table in new_refs if table not in old_refs
+    ]
+    tables_removed = [
+        {"table": table, "roles": roles_of(old_refs[table][0])}
+        for table in old_refs if table not in new_refs
+    ]
+    roles_changed = [
+        {"table": table, "before": roles_of(old_refs[table][0]), "after": roles_of(mask)}
+        for table, (mask, _) in new_refs.items()
+        if table in old_refs and old_refs[table][0] != mask
+    ]
+    if not (fields or tables_added or tables_removed or roles_changed):
+        return None
+    return {
+        "id_script":      key,
+        "fields":         fields,
+        "tables_added":   tables_added,
+        "tables_removed": tables_removed,
+        "roles_changed":  roles_changed,
+    }
+
+
+def diff_indexes(old: Mapping, new: Mapping) -> dict[str, Any]:
+    """Compare deux index (dict de `build_index()` ou `CompactIndex`).
+
+    Returns:
+        {
+          "added":        [id_script, ...],
+          "removed":      [id_script, ...],
+          "modified":     [{"id_script", "fields", "tables_added", "tables_removed",
+                            "roles_changed"}, ...],
+          "transverse":   {"became": [id_script, ...], "ceased": [id_script, ...]},
+          "cross_domain": {"added":   [{"id_script", "table", "owner"}, ...],
+                           "removed": [{"id_script", "table", "owner"}, ...]},
+          "ownership":    [{"table", "before", "after"}, ...],
+        }
+        Un id_script porté par plusieurs flux est suffixé de l'emplacement
+        de son YAML (« id_script [domaine/type/fichier.yml] »).
+    """
+    old_list, new_list = _flux_states(old), _flux_states(new)
+    duplicated = _duplicated(old_list) | _duplicated(new_list)
+    old_states = _keyed(old_list, duplicated)
+    new_states = _keyed(new_list, duplicated)
+    common = sorted(old_states.keys() & new_states.keys())
+
+    modified = [
+        delta for key in common
+        if (delta := _flux_delta(key, old_states[key], new_states[key])) is not None
+    ]
+
+    old_edges = _cross_domain(old_states)
+    new_edges = _cross_domain(new_states)
+
+    old_owners = _socle_owners(old_states)
+    new_owners = _socle_owners(new_states)
+
+    return {
+        "added":    sorted(new_states.keys() - old_states.keys()),
+        "removed":  sorted(old_states.keys() - new_states.keys()),
+        "modified": modified,
+        "transverse": {
+            "became": [k for k in common if new_states[k][2] and not old_states[k][2]],
+            "ceased": [k for k in common if old_states[k][2] and not new_states[k][2]],
+        },
+        "cross_domain": {
+            "added": [
+                {"id_script": key, "table": table, "owner": owner}
+                for (key, table), owner in sorted(new_edges.items())
+                if old_edges.get((key, table)) != owner
+            ],
+            "removed": [
+                {"id_script": key, "table": table, "owner": owner}
+                for (key, table), owner in sorted(old_edges.items())
+                if new_edges.get((key, table)) != owner
+            ],
+        },
+        "ownership": [
+            {"table": table, "before": old_owners[table], "after": new_owners[table]}
+            for table in sorted(old_owners.keys() & new_owners.keys())
+            if old_owners[table] != new_owners[table]
+        ],
+    }
+
+
+def diff_snapshots(old_path: Path, new_path: Path) -> dict[str, Any]:
+    """`diff_indexes` entre deux snapshots (voir `snapshot.read_snapshot`)."""
+    return diff_indexes(read_snapshot(old_path), read_snapshot(new_path))
+
+
+def is_empty(diff: dict[str, Any]) -> bool:
+    """True si les deux index sont équivalents."""
+    return not (
+        diff["added"] or diff["removed"] or diff["modified"] or diff["ownership"]
+        or diff["transverse"]["became"] or diff["transverse"]["ceased"]
+        or diff["cross_domain"]["added"] or diff["cross_domain"]["removed"]
+    )
+
+
+def diff_markdown(diff: dict[str, Any]) -> str:
+    """Rapport Markdown du delta (commentaire de merge request, sortie CI)."""
+    if is_empty(diff):
+        return "_Aucun changement de dépendances._\n"
+    lines = ["# Delta de dépendances", ""]
+    if diff["added"]:
+        lines += ["## Flux ajoutés", ""] + [f"- `{k}`" for k in diff["added"]] + [""]
+    if diff["removed"]:
+        lines += ["## Flux supprimés", ""] + [f"- `{k}`" for k in diff["removed"]] + [""]
+    if diff["modified"]:
+        lines += ["## Flux modifiés", ""]
+        for delta in diff["modified"]:
+            details = []
+            if delta["fields"]:
+                details.append("champs : " + ", ".join(delta["fields"]))
+            details += [f"+ `{t['table']}` ({roles_label(t['roles'])})" for t in delta["tables_added"]]
+            details += [f"− `{t['table']}` ({roles_label(t['roles'])})" for t in delta["tables_removed"]]
+            details += [
+                f"~ `{t['table']}` : {roles_label(t['before'])} → {roles_label(t['after'])}"
+                for t in delta["roles_changed"]
+            ]
+            lines.append(f"- `{delta['id_script']}`")
+            lines += [f"  - {d}" for d in details]
+        lines.append("")
+    cross = diff["cross_domain"]
+    if cross["added"] or cross["removed"]:
+        lines += ["## Dépendances cross-domaine", ""]
+        lines += [f"- nouvelle : `{e['id_script']}` → `{e['table']}` (domaine : {e['owner']})" for e in cross["added"]]
+        lines += [f"- rompue : `{e['id_script']}` → `{e['table']}` (domaine : {e['owner']})" for e in cross["removed"]]
+        lines.append("")
+    transverse = diff["transverse"]
+    if transverse["became"] or transverse["ceased"]:
+        lines += ["## Flux transverses", ""]
+        lines += [f"- `{k}` devient transverse" for k in transverse["became"]]
+        lines += [f"- `{k}` n'est plus transverse" for k in transverse["ceased"]]
+        lines.append("")
+    if diff["ownership"]:
+        lines += ["## Propriété des tables SOCLE", ""]
+        lines += [f"- `{o['table']}` : {o['before']} → {o['after']}" for o in diff["ownership"]]
+        lines.append("")
+    return "\n".join(lines)
@@ -0,0 +1,77 @@
+"""Aleister — Mémo des structures dérivées d'un index en mémoire.
+
+`TableLookup`, `DependencyGraph`, `FluxDag` et `ColumnIndex` se calculent à
+partir d'un index (dict de `build_index()` ou `CompactIndex`) et restent
+valables tant que le même objet est passé. `IndexMemo` garde une valeur
+par emplacement — par défaut le type de l'index : un index dict et un
+`CompactIndex` interrogés en alternance ne s'évincent pas.
+
+L'index est tenu par référence faible quand son type le permet
+(`CompactIndex`, `DependencyGraph`) : les entrées d'index disparus sont
+purgées au calcul suivant. Un dict n'accepte pas de référence faible ; il
+reste tenu jusqu'au prochain index du même emplacement.
+"""
+
+from __future__ import annotations
+
+import threading
+import weakref
+from typing import Any, Callable, Hashable
+
+
+class IndexVersion:
+    """Version d'un index en mémoire : égale seulement au même objet vivant."""
+
+    __slots__ = ("_ref", "_index", "_hash")
+
+    def __init__(self, index: Any):
+        try:
+            self._ref, self._index = weakref.ref(index), None
+        except TypeError:  # dict
+            self._ref, self._index = None, index
+        self._hash = id(index)
+
+    def get(self) -> Any:
+        return self._index if self._ref is None else self._ref()
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, IndexVersion):
+            return False
+        index = self.get()
+        return index is not None and other.get() is index
+
+    def __hash__(self) -> int:
+        return self._hash
+
+
+class IndexMemo:
+    """Valeur calculée pour le dernier index de chaque emplacement."""
+
+    def __init__(self):
+        self._entries: dict[Hashable, tuple[IndexVersion, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(
+        self,
+        index: Any,
+        compute: Callable[[], Any],
+        slot: Hashable | None = None,
+    ) -> Any:
+        """Valeur mémorisée pour `index`, sinon `compute()` (hors verrou), qui
+        remplace celle de l'index précédent du même emplacement (défaut :
+        le type de `index`)."""
+        slot = type(index) if slot is None else slot
+        with self._lock:
+            memo = self._entries.get(slot)
+            if memo is not None and memo[0].get() is index:
+                return memo[1]
+        value = compute()
+        with self._lock:
+            for dead in [k for k, (v, _) in self._entries.items() if v.get() is None]:
+                del self._entries[dead]
+            self._entries[slot] = (IndexVersion(index), value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
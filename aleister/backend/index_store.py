@@ -0,0 +1,815 @@
+"""Aleister — Store SQLite de l'index.
+
+Persiste la sortie de `build_index()` dans une base SQLite partagée par
+toutes les pages Streamlit et tous les processus workers. Un démarrage à
+froid coûte une ouverture de fichier et des lookups indexés au lieu d'un
+scan complet du workspace.
+
+Schéma :
+  meta(key, value)                       — version du schéma, racine, date de build
+  domaines(name)
+  flux(id, id_script, description, domaine, type, plateforme,
+       yaml_path, is_transverse)
+  sql_files(flux_id, path, position)
+  tables(id, key, platform, dataset, name)   — key = "BQ_SOCLE.clients"
+  table_refs(flux_id, table_id, domaine_owner, roles, position)
+                                         — roles : masque read/write/create/delete
+  jobs(id, flux_id, path, job_id, description, position)
+  job_params(job_row, name, value, position) — paramètres de chaque job (texte)
+  search_docs / search_fts                — index plein texte (voir `search_index`)
+
+Chaque écriture met aussi à jour le graphe de dépendances
+(`dependency_graph`), l'index des colonnes (`column_index`) et, pour une
+écriture complète, le catalogue des schémas de tables (`schema_catalog`),
+persistés à côté de la base.
+
+`write_index` remplace tout le contenu ; `write_changes` n'applique qu'un
+delta du watcher (flux modifiés, ajoutés ou supprimés). Après un delta,
+les identifiants de flux et de tables peuvent avoir des trous : le graphe
+et le lookup des tables désignent les lignes par leur rang.
+
+La base est ouverte en mode WAL : les lecteurs ne sont jamais bloqués
+pendant qu'un worker rafraîchit l'index.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Iterable
+
+from aleister.config import DOCS_ROOT, WORKSPACE_ROOT
+from aleister.backend import search_index
+from aleister.backend.column_index import ColumnIndex
+from aleister.backend.dependency_graph import DependencyGraph
+from aleister.backend.knowledge_base import _cache_dir, _tables_index, build_index
+from aleister.backend.schema_catalog import get_schema_catalog, update_schema_catalog
+from aleister.backend.sql_scanner import mask_of, roles_of
+from aleister.backend.table_lookup import TableLookup
+
+_SCHEMA_VERSION = "4"
+
+# Nombre maximal de paramètres liés par requête (limite SQLite historique : 999)
+_MAX_PARAMS = 900
+
+# Âge maximal (secondes) avant qu'un store soit rafraîchi depuis le workspace.
+DEFAULT_MAX_AGE = 120
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS domaines (
+    name TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS flux (
+    id            INTEGER PRIMARY KEY,
+    id_script     TEXT NOT NULL,
+    description   TEXT NOT NULL,
+    domaine       TEXT NOT NULL,
+    type          TEXT NOT NULL,
+    plateforme    TEXT NOT NULL,
+    yaml_path     TEXT NOT NULL,
+    is_transverse INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS flux_domaine_type ON flux(domaine, type);
+CREATE INDEX IF NOT EXISTS flux_type         ON flux(type);
+CREATE INDEX IF NOT EXISTS flux_plateforme   ON flux(plateforme);
+CREATE INDEX IF NOT EXISTS flux_transverse   ON flux(is_transverse);
+CREATE INDEX IF NOT EXISTS flux_id_script    ON flux(id_script);
+CREATE INDEX IF NOT EXISTS flux_yaml_path    ON flux(yaml_path);
+CREATE TABLE IF NOT EXISTS sql_files (
+    flux_id  INTEGER NOT NULL REFERENCES flux(id),
+    path     TEXT NOT NULL,
+    position INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sql_files_flux ON sql_files(flux_id);
+CREATE TABLE IF NOT EXISTS tables (
+    id       INTEGER PRIMARY KEY,
+    key      TEXT NOT NULL UNIQUE,
+    platform TEXT NOT NULL,
+    dataset  TEXT NOT NULL,
+    name     TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS table_refs (
+    flux_id       INTEGER NOT NULL REFERENCES flux(id),
+    table_id      INTEGER NOT NULL REFERENCES tables(id),
+    domaine_owner TEXT NOT NULL,
+    roles         INTEGER NOT NULL,
+    position      INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS table_refs_table ON table_refs(table_id);
+CREATE INDEX IF NOT EXISTS table_refs_flux  ON table_refs(flux_id);
+CREATE TABLE IF NOT EXISTS jobs (
+    id          INTEGER PRIMARY KEY,
+    flux_id     INTEGER NOT NULL REFERENCES flux(id),
+    path        TEXT NOT NULL,
+    job_id      TEXT NOT NULL,
+    description TEXT NOT NULL,
+    position    INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_job_id ON jobs(job_id);
+CREATE INDEX IF NOT EXISTS jobs_flux   ON jobs(flux_id);
+CREATE TABLE IF NOT EXISTS job_params (
+    job_row  INTEGER NOT NULL REFERENCES jobs(id),
+    name     TEXT NOT NULL,
+    value    TEXT NOT NULL,
+    position INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS job_params_name_value ON job_params(name, value);
+CREATE INDEX IF NOT EXISTS job_params_job        ON job_params(job_row);
+"""
+
+_DATA_TABLES = ("job_params", "jobs", "table_refs", "sql_files", "tables", "flux", "domaines")
+
+# Insertion des lignes de `_flux_rows`, dans l'ordre des clés étrangères
+_INSERTS = {
+    "flux":       "INSERT INTO flux VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+    "sql_files":  "INSERT INTO sql_files VALUES (?, ?, ?)",
+    "tables":     "INSERT INTO tables VALUES (?, ?, ?, ?, ?)",
+    "table_refs": "INSERT INTO table_refs VALUES (?, ?, ?, ?, ?)",
+    "jobs":       "INSERT INTO jobs VALUES (?, ?, ?, ?, ?, ?)",
+    "job_params": "INSERT INTO job_params VALUES (?, ?, ?, ?)",
+}
+
+
+def default_store_path(workspace: Path | None = None) -> Path:
+    """Chemin de la base SQLite associée à un workspace (dans INDEX_CACHE_DIR)."""
+    return _cache_dir(workspace or WORKSPACE_ROOT) / "index.sqlite"
+
+
+def _flux_rows(
+    numbered: Iterable[tuple[int, dict]],
+    table_ids: dict[str, int],
+    next_job: int,
+) -> dict[str, list[tuple]]:
+    """Lignes à insérer (voir `_INSERTS`) pour des flux (identifiant, flux).
+
+    `table_ids` : tables déjà en base (clé → id), complété en place par les
+    nouvelles ; les jobs sont numérotés à partir de `next_job`.
+    """
+    rows: dict[str, list[tuple]] = {name: [] for name in _INSERTS}
+    next_table = max(table_ids.values(), default=0) + 1
+    for flux_id, flux in numbered:
+        rows["flux"].append((
+            flux_id, flux["id_script"], flux["description"] or "", flux["domaine"],
+            flux["type"], flux["plateforme"], flux["yaml_path"], int(flux["is_transverse"]),
+        ))
+        for pos, path in enumerate(flux["sql_files"]):
+            rows["sql_files"].append((flux_id, path, pos))
+        for pos, ref in enumerate(flux["tables_referenced"]):
+            key = f"{ref['dataset']}.{ref['table']}"
+            table_id = table_ids.get(key)
+            if table_id is None:
+                table_id = table_ids[key] = next_table
+                next_table += 1
+                rows["tables"].append((table_id, key, ref["platform"], ref["dataset"], ref["table"]))
+            rows["table_refs"].append((
+                flux_id, table_id, ref.get("domaine_owner", flux["domaine"]),
+                mask_of(ref.get("roles", ())), pos,
+            ))
+        for pos, job in enumerate(flux.get("jobs", ())):
+            job_row = next_job
+            next_job += 1
+            rows["jobs"].append((job_row, flux_id, job["path"], job["job_id"], job["description"], pos))
+            rows["job_params"] += [
+                (job_row, name, value, i)
+                for i, (name, value) in enumerate(job["parametres"].items())
+            ]
+    return rows
+
+
+def _insert_rows(conn: sqlite3.Connection, rows: dict[str, list[tuple]]) -> None:
+    for name, statement in _INSERTS.items():
+        conn.executemany(statement, rows[name])
+
+
+class IndexStore:
+    """Accès en lecture/écriture à l'index persisté dans SQLite.
+
+    Une connexion est ouverte par thread : l'objet peut être partagé via
+    `st.cache_resource` entre les sessions Streamlit.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        workspace: Path | None = None,
+        docs_root: Path | None = None,
+    ):
+        self.db_path = Path(db_path)
+        self.workspace = (workspace or WORKSPACE_ROOT).resolve()
+        self.docs_root = docs_root or DOCS_ROOT
+        self._local = threading.local()
+        self._graph: tuple[str, DependencyGraph] | None = None
+        self._columns: tuple[str, ColumnIndex] | None = None
+        self._lookup: tuple[str, TableLookup, list[int], dict[int, int]] | None = None
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._conn() as conn:
+            conn.executescript(_SCHEMA)
+            self.fts = search_index.available(conn)
+            if self._meta().get("schema_version", _SCHEMA_VERSION) != _SCHEMA_VERSION:
+                # Schéma obsolète : on repart d'une base vide, reconstruite au prochain refresh
+                for name in (*_DATA_TABLES, *search_index.TABLES, "meta"):
+                    conn.execute(f"DROP TABLE IF EXISTS {name}")
+                conn.executescript(_SCHEMA)
+            if self.fts:
+                conn.executescript(search_index.SCHEMA)
+
+    # ── Connexion ─────────────────────────────────────────────────────────────
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # ── Écriture ──────────────────────────────────────────────────────────────
+    def write_index(self, index: dict[str, Any]) -> None:
+        """Remplace le contenu du store par `index` en une seule transaction.
+
+        L'index plein texte est mis à jour dans la même transaction, en ne
+        relisant que les documents (flux, CDCs) modifiés depuis l'écriture
+        précédente.
+        """
+        conn = self._conn()
+        rows = _flux_rows(enumerate(index["flux"], start=1), {}, 1)
+        docs = search_index.collect_documents(index, self.docs_root) if self.fts else {}
+        built_at = repr(time.time())
+
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for name in _DATA_TABLES:
+                conn.execute(f"DELETE FROM {name}")
+            conn.executemany("INSERT INTO domaines(name) VALUES (?)", [(d,) for d in index["domaines"]])
+            _insert_rows(conn, rows)
+            if self.fts:
+                search_index.sync_documents(conn, docs)
+            self._write_meta(conn, built_at)
+        self._save_graph(DependencyGraph.from_index(index), built_at)
+        # Les scripts de création ne changent qu'avec le workspace : le
+        # catalogue des schémas suit chaque écriture (seuls les scripts
+        # modifiés sont relus).
+        catalog = update_schema_catalog(self.workspace)
+        self._save_columns(ColumnIndex(index["flux"], catalog), built_at)
+
+    def write_changes(self, changed: list[dict], removed: list[str]) -> None:
+        """Applique un delta en une seule transaction : les flux `changed`
+        remplacent ceux de même `yaml_path`, ceux de `removed` (yaml_path)
+        sont supprimés, avec leurs SQL, références, jobs et documents plein
+        texte ; le reste du store n'est pas réécrit.
+
+        Un flux modifié garde son identifiant, un flux ajouté est numéroté à
+        la suite : jusqu'à la prochaine `write_index`, l'ordre des
+        identifiants n'est plus exactement celui de l'index. La propriété
+        des tables (scripts de création socle) n'est pas recalculée : un tel
+        changement s'écrit avec `write_index`.
+        """
+        conn = self._conn()
+        paths = [flux["yaml_path"] for flux in changed]
+        docs = search_index.flux_documents(changed) if self.fts else {}
+        built_at = repr(time.time())
+
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            previous = self.version()
+            ids: dict[str, int] = {}
+            touched = [*paths, *removed]
+            for start in range(0, len(touched), _MAX_PARAMS):
+                chunk = touched[start:start + _MAX_PARAMS]
+                ids.update(conn.execute(
+                    f"SELECT yaml_path, id FROM flux WHERE yaml_path IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall())
+            old = list(ids.values())
+            for start in range(0, len(old), _MAX_PARAMS):
+                chunk = old[start:start + _MAX_PARAMS]
+                placeholders = ",".join("?" * len(chunk))
+                conn.execute(
+                    f"DELETE FROM job_params WHERE job_row IN "
+                    f"(SELECT id FROM jobs WHERE flux_id IN ({placeholders}))",
+                    chunk,
+                )
+                for name in ("jobs", "table_refs", "sql_files"):
+                    conn.execute(f"DELETE FROM {name} WHERE flux_id IN ({placeholders})", chunk)
+                conn.execute(f"DELETE FROM flux WHERE id IN ({placeholders})", chunk)
+
+            next_id = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM flux").fetchone()[0]
+            numbered: list[tuple[int, dict]] = []
+            for flux in changed:
+                flux_id = ids.get(flux["yaml_path"])
+                if flux_id is None:
+                    flux_id, next_id = next_id, next_id + 1
+                numbered.append((flux_id, flux))
+            table_ids = dict(conn.execute("SELECT key, id FROM tables").fetchall())
+            next_job = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM jobs").fetchone()[0]
+            _insert_rows(conn, _flux_rows(numbered, table_ids, next_job))
+
+            # Tables qui ne sont plus référencées, domaines sans flux
+            conn.execute("DELETE FROM tables WHERE id NOT IN (SELECT table_id FROM table_refs)")
+            conn.execute("DELETE FROM domaines")
+            conn.execute("INSERT INTO domaines(name) SELECT DISTINCT domaine FROM flux")
+            if self.fts:
+                search_index.sync_documents(conn, docs, touched)
+            self._write_meta(conn, built_at)
+            graph = self._build_graph(conn)
+            columns = self._load_columns(previous)
+            if columns is None:
+                columns = ColumnIndex(self.flux_sql_files(), get_schema_catalog(self.workspace))
+            else:
+                columns = columns.updated(touched, changed)  # seuls les SQL des flux touchés
+        # Catalogue des schémas inchangé : un script de création modifié
+        # passe par `write_index`.
+        self._save_graph(graph, built_at)
+        self._save_columns(columns, built_at)
+
+    def _write_meta(self, conn: sqlite3.Connection, built_at: str) -> None:
+        conn.executemany(
+            "INSERT OR REPLACE INTO meta(key, value) VALUES (?, ?)",
+            [
+                ("schema_version", _SCHEMA_VERSION),
+                ("workspace", str(self.workspace)),
+                ("built_at", built_at),
+            ],
+        )
+
+    def refresh(self) -> None:
+        """Reconstruit le store depuis le workspace (build incrémental)."""
+        self.write_index(build_index(self.workspace, incremental=True))
+
+    def is_stale(self, max_age: float = DEFAULT_MAX_AGE) -> bool:
+        meta = self._meta()
+        if meta.get("schema_version") != _SCHEMA_VERSION or "built_at" not in meta:
+            return True
+        return time.time() - float(meta["built_at"]) > max_age
+
+    def refresh_if_stale(self, max_age: float = DEFAULT_MAX_AGE) -> bool:
+        """Rafraîchit le store s'il est plus vieux que `max_age`. Retourne True si rafraîchi."""
+        if not self.is_stale(max_age):
+            return False
+        self.refresh()
+        return True
+
+    def dependency_graph(self) -> DependencyGraph:
+        """Graphe de dépendances de la dernière écriture : précalculé par
+        `write_index`, rechargé depuis le disque, ou reconstruit depuis
+        `table_refs` s'il manque."""
+        version = self.version()
+        cached = self._graph
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        graph = DependencyGraph.load(self._graph_path(), version)
+        if graph is None:
+            conn = self._conn()
+            with conn:
+                conn.execute("BEGIN")  # flux et références lus dans le même état
+                version = self.version()
+                graph = self._build_graph(conn)
+            self._save_graph(graph, version)
+        self._graph = (version, graph)
+        return graph
+
+    def _build_graph(self, conn: sqlite3.Connection) -> DependencyGraph:
+        """Graphe reconstruit depuis `table_refs` : les positions sont les
+        rangs des identifiants de flux (un delta laisse des trous)."""
+        rows = conn.execute("SELECT id, domaine FROM flux ORDER BY id").fetchall()
+        rank = {r["id"]: pos for pos, r in enumerate(rows)}
+        refs = conn.execute(
+            """
+            SELECT r.flux_id, t.key, r.domaine_owner, r.roles
+            FROM table_refs r JOIN tables t ON t.id = r.table_id
+            ORDER BY r.flux_id, r.position
+            """
+        ).fetchall()
+        return DependencyGraph.from_refs(
+            [r["domaine"] for r in rows],
+            ((rank[flux_id], key, owner, mask) for flux_id, key, owner, mask in refs),
+            [r["id"] for r in rows],
+        )
+
+    def _graph_path(self) -> Path:
+        return self.db_path.with_name(self.db_path.stem + ".graph.pkl")
+
+    def _save_graph(self, graph: DependencyGraph, version: str) -> None:
+        self._graph = (version, graph)
+        try:
+            graph.save(self._graph_path(), version)
+        except OSError:
+            pass  # le graphe reste utilisable en mémoire
+
+    def column_index(self) -> ColumnIndex:
+        """Index des colonnes de la dernière écriture : précalculé par chaque
+        écriture, rechargé depuis le disque, ou reconstruit depuis les SQL
+        des flux s'il manque."""
+        version = self.version()
+        column_index = self._load_columns(version)
+        if column_index is None:
+            conn = self._conn()
+            with conn:
+                conn.execute("BEGIN")  # flux et SQL lus dans le même état
+                version = self.version()
+                column_index = ColumnIndex(self.flux_sql_files(), get_schema_catalog(self.workspace))
+            self._save_columns(column_index, version)
+        self._columns = (version, column_index)
+        return column_index
+
+    def _load_columns(self, version: str) -> ColumnIndex | None:
+        cached = self._columns
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        return ColumnIndex.load(self._columns_path(), version, get_schema_catalog(self.workspace))
+
+    def _columns_path(self) -> Path:
+        return self.db_path.with_name(self.db_path.stem + ".columns.pkl")
+
+    def _save_columns(self, column_index: ColumnIndex, version: str) -> None:
+        self._columns = (version, column_index)
+        try:
+            column_index.save(self._columns_path(), version)
+        except OSError:
+            pass  # l'index reste utilisable en mémoire
+
+    def version(self) -> str:
+        """Identifiant de la dernière écriture (change à chaque `write_index`)."""
+        return self._meta().get("built_at", "")
+
+    def _meta(self) -> dict[str, str]:
+        rows = self._conn().execute("SELECT key, value FROM meta").fetchall()
+        return {r["key"]: r["value"] for r in rows}
+
+    # ── Lecture ───────────────────────────────────────────────────────────────
+    def domaines(self) -> list[str]:
+        rows = self._conn().execute("SELECT name FROM domaines ORDER BY name").fetchall()
+        return [r["name"] for r in rows]
+
+    def list_tables(self) -> list[str]:
+        rows = self._conn().execute("SELECT key FROM tables ORDER BY key").fetchall()
+        return [r["key"] for r in rows]
+
+    def flux_labels(self) -> list[tuple[str, str]]:
+        """[(id_script, type), ...] de tous les flux, dans l'ordre de l'index."""
+        rows = self._conn().execute("SELECT id_script, type FROM flux ORDER BY id").fetchall()
+        return [(r["id_script"], r["type"]) for r in rows]
+
+    def table_lookup(self) -> TableLookup:
+        """Recherche de tables de la dernière écriture ; l'identifiant d'une
+        table dans le lookup est le rang de son `tables.id`."""
+        return self._tables()[1]
+
+    def _tables(self) -> tuple[str, TableLookup, list[int], dict[int, int]]:
+        """(version, lookup, tables.id par rang, rang par tables.id)."""
+        version = self.version()
+        cached = self._lookup
+        if cached is None or cached[0] != version:
+            rows = self._conn().execute("SELECT id, key FROM tables ORDER BY id").fetchall()
+            ids = [r["id"] for r in rows]
+            cached = self._lookup = (
+                version, TableLookup([r["key"] for r in rows]), ids,
+                {table_id: rank for rank, table_id in enumerate(ids)},
+            )
+        return cached
+
+    def search_tables(self, text: str) -> list[str]:
+        """Tables triées correspondant à une saisie (`TableLookup.search`)."""
+        return self.table_lookup().search(text)
+
+    def query_flux(
+        self,
+        domaine: str | None = None,
+        flow_type: str | None = None,
+        plateforme: str | None = None,
+        transverse_only: bool = False,
+        search: str | None = None,
+    ) -> list[dict]:
+        """Retourne les flux correspondant aux filtres (mêmes dicts que `build_index`).
+
+        `search` : recherche plein texte (id_script, description, paramètres
+        YAML, SQL), résultats classés par pertinence. Sans FTS5, filtre
+        sous-chaîne sur id_script ou description.
+        """
+        clauses: list[str] = []
+        params: list[Any] = []
+        if domaine:
+            clauses.append("domaine = ?")
+            params.append(domaine)
+        if flow_type:
+            clauses.append("type = ?")
+            params.append(flow_type)
+        if plateforme:
+            clauses.append("plateforme = ?")
+            params.append(plateforme)
+        if transverse_only:
+            clauses.append("is_transverse = 1")
+        if search and self.fts:
+            if search_index.match_query(search) is None:
+                return []
+            return self._search_flux(clauses, params, search)
+        if search:
+            clauses.append("(instr(lower(id_script), ?) > 0 OR instr(lower(description), ?) > 0)")
+            params += [search.lower(), search.lower()]
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._conn().execute(f"SELECT * FROM flux {where} ORDER BY id", params).fetchall()
+        return self._hydrate(rows)
+
+    def _search_flux(self, clauses: list[str], params: list[Any], search: str) -> list[dict]:
+        where = "".join(f" AND {c}" for c in clauses)
+        rows = self._conn().execute(
+            f"""
+            SELECT flux.* FROM flux JOIN (
+                SELECT d.path, {search_index.BM25} AS score
+                FROM search_fts JOIN search_docs d ON d.id = search_fts.rowid
+                WHERE search_fts MATCH ? AND d.kind = 'flux'
+            ) s ON s.path = flux.yaml_path
+            WHERE 1 = 1{where}
+            ORDER BY s.score, flux.id
+            """,
+            [search_index.match_query(search), *params],
+        ).fetchall()
+        return self._hydrate(rows)
+
+    def search(self, query: str, kind: str | None = None, limit: int | None = 50) -> list[dict]:
+        """Recherche plein texte classée (BM25) sur les flux et/ou les CDCs.
+
+        Args:
+            query: termes saisis (chacun cherché en préfixe, tous requis).
+            kind:  "flux", "cdc" ou None (les deux).
+            limit: nombre maximal de résultats (None = tous).
+
+        Returns:
+            [{"kind", "path", "title", "score", "snippet"}, ...]
+        """
+        if self.fts:
+            return search_index.search(self._conn(), query, kind, limit)
+        # Repli sans FTS5 : sous-chaîne sur le titre
+        kw = query.lower().strip()
+        hits: list[dict] = []
+        if kind in (None, "flux"):
+            for flux in self.query_flux(search=query):
+                hits.append({"kind": "flux", "path": flux["yaml_path"], "title": flux["id_script"],
+                             "score": 0.0, "snippet": flux["description"]})
+        if kind in (None, "cdc") and self.docs_root.exists():
+            for md_path in sorted(self.docs_root.rglob("*.md")):
+                if kw in md_path.stem.lower():
+                    hits.append({"kind": "cdc", "path": str(md_path), "title": md_path.stem,
+                                 "score": 0.0, "snippet": ""})
+        return hits[:limit] if limit else hits
+
+    def flux_referencing(
+        self,
+        search_key: str,
+        roles: list[str] | None = None,
+    ) -> list[tuple[dict, str, str, list[str]]]:
+        """Flux référençant la table `search_key`, ou à défaut les tables dont
+        la clé contient `search_key`.
+
+        Les tables sont trouvées par `table_lookup` (clé exacte, trigrammes) ;
+        la jointure vers les flux passe par l'index `table_refs_table`.
+        `roles` restreint aux références ayant au moins un des rôles demandés
+        (ex. ["write"] : producteurs de la table).
+
+        Returns:
+            [(flux, clé de la première table correspondante, domaine_owner, rôles), ...]
+            dans l'ordre de l'index, un seul tuple par flux.
+        """
+        lookup = self.table_lookup()
+        rows = self.table_references(lookup.find(search_key), roles)
+        first: dict[int, tuple[str, str, int]] = {}
+        for flux_id, _, table_id, owner, mask in rows:
+            first.setdefault(flux_id, (lookup.keys[table_id], owner, mask))
+        if not first:
+            return []
+        flux_by_id = dict(self.flux_by_ids(list(first)))
+        return [
+            (flux_by_id[f_id], key, owner, roles_of(mask))
+            for f_id, (key, owner, mask) in first.items()
+        ]
+
+    def table_references(
+        self,
+        table_ids: list[int],
+        roles: list[str] | None = None,
+    ) -> list[tuple[int, int, int, str, int]]:
+        """Références aux tables `table_ids` (identifiants de `table_lookup`) :
+        [(flux.id, rang dans le flux, table, domaine_owner, masque), ...]
+        triées par flux puis rang. `roles` : au moins un de ces rôles."""
+        wanted = mask_of(roles or ())
+        conn = self._conn()
+        _, _, ids, ranks = self._tables()
+        refs: list[tuple[int, int, int, str, int]] = []
+        for start in range(0, len(table_ids), _MAX_PARAMS):
+            chunk = [ids[table_id] for table_id in table_ids[start:start + _MAX_PARAMS]]
+            refs += [
+                (r["flux_id"], r["position"], ranks[r["table_id"]], r["domaine_owner"], r["roles"])
+                for r in conn.execute(
+                    f"""
+                    SELECT flux_id, position, table_id, domaine_owner, roles FROM table_refs
+                    WHERE table_id IN ({",".join("?" * len(chunk))}) AND (? = 0 OR roles & ? != 0)
+                    """,
+                    (*chunk, wanted, wanted),
+                )
+            ]
+        refs.sort()
+        return refs
+
+    def query_jobs(
+        self,
+        job_id: str | None = None,
+        params: dict[str, str | None] | None = None,
+    ) -> list[dict]:
+        """Jobs de type `job_id` ayant tous les paramètres `params` (même format
+        que `JobIndex.find`) ; une valeur None exige seulement la présence du
+        paramètre. Chaque filtre passe par un index (`jobs_job_id`,
+        `job_params_name_value`)."""
+        clauses: list[str] = []
+        args: list[Any] = []
+        if job_id is not None:
+            clauses.append("j.job_id = ?")
+            args.append(job_id)
+        for name, value in (params or {}).items():
+            if value is None:
+                clauses.append("j.id IN (SELECT job_row FROM job_params WHERE name = ?)")
+                args.append(name)
+            else:
+                clauses.append("j.id IN (SELECT job_row FROM job_params WHERE name = ? AND value = ?)")
+                args += [name, value]
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self._job_hits(where, args)
+
+    def jobs_referencing(self, text: str) -> list[dict]:
+        """Jobs dont au moins une valeur de paramètre contient `text`."""
+        return self._job_hits(
+            "WHERE j.id IN (SELECT job_row FROM job_params WHERE instr(value, ?) > 0)", [text]
+        )
+
+    def _job_hits(self, where: str, args: list[Any]) -> list[dict]:
+        query = f"""
+            SELECT j.*, f.id_script, f.domaine, f.type, f.yaml_path
+            FROM jobs j JOIN flux f ON f.id = j.flux_id
+            {where}
+            ORDER BY j.id
+        """
+        return [
+            {
+                "id_script": r["id_script"], "domaine": r["domaine"],
+                "type": r["type"], "yaml_path": r["yaml_path"], **job,
+            }
+            for r, job in self._jobs_of(query, args)
+        ]
+
+    def to_index(self) -> dict[str, Any]:
+        """Reconstitue l'index complet au format `build_index()`."""
+        flux_list = self.query_flux()
+        return {"domaines": self.domaines(), "flux": flux_list, "tables": _tables_index(flux_list)}
+
+    def flux_sql_files(self, yaml_paths: Iterable[str] | None = None) -> list[dict]:
+        """[{"yaml_path", "sql_files"}, ...] de tous les flux, ou de ceux de
+        `yaml_paths` encore présents, sans hydratation."""
+        conn = self._conn()
+        query = """
+            SELECT f.yaml_path, s.path FROM flux f LEFT JOIN sql_files s ON s.flux_id = f.id
+            {where} ORDER BY f.id, s.position
+        """
+        if yaml_paths is None:
+            rows = conn.execute(query.format(where="")).fetchall()
+        else:
+            wanted = list(yaml_paths)
+            rows = []
+            for start in range(0, len(wanted), _MAX_PARAMS):
+                chunk = wanted[start:start + _MAX_PARAMS]
+                rows += conn.execute(
+                    query.format(where=f"WHERE f.yaml_path IN ({','.join('?' * len(chunk))})"), chunk
+                ).fetchall()
+        sql_files: dict[str, list[str]] = {}
+        for yaml_path, path in rows:
+            files = sql_files.setdefault(yaml_path, [])
+            if path is not None:
+                files.append(path)
+        return [{"yaml_path": yaml_path, "sql_files": files} for yaml_path, files in sql_files.items()]
+
+    def flux_by_ids(self, flux_ids: list[int]) -> list[tuple[int, dict]]:
+        """[(flux.id, flux), ...] des identifiants demandés, triés par
+        identifiant (les absents sont ignorés)."""
+        conn = self._conn()
+        ids = sorted(set(flux_ids))
+        rows: list[sqlite3.Row] = []
+        for start in range(0, len(ids), _MAX_PARAMS):
+            chunk = ids[start:start + _MAX_PARAMS]
+            rows += conn.execute(
+                f"SELECT * FROM flux WHERE id IN ({','.join('?' * len(chunk))}) ORDER BY id", chunk
+            ).fetchall()
+        return list(zip((r["id"] for r in rows), self._hydrate(rows)))
+
+    # ── Hydratation ───────────────────────────────────────────────────────────
+
+    def _hydrate(self, rows: list[sqlite3.Row]) -> list[dict]:
+        """Convertit des lignes `flux` en dicts complets (SQL + tables référencées)."""
+        if not rows:
+            return []
+        conn = self._conn()
+        ids = [r["id"] for r in rows]
+        sql_by_flux: dict[int, list[str]] = {}
+        refs_by_flux: dict[int, list[dict]] = {}
+        jobs_by_flux: dict[int, list[dict]] = {}
+        # Découpage par lots : SQLite limite le nombre de paramètres par requête
+        for start in range(0, len(ids), _MAX_PARAMS):
+            chunk = ids[start:start + _MAX_PARAMS]
+            placeholders = ",".join("?" * len(chunk))
+            for r in conn.execute(
+                f"SELECT flux_id, path FROM sql_files WHERE flux_id IN ({placeholders}) "
+                "ORDER BY flux_id, position",
+                chunk,
+            ):
+                sql_by_flux.setdefault(r["flux_id"], []).append(r["path"])
+            for r in conn.execute(
+                f"""
+                SELECT r.flux_id, t.platform, t.dataset, t.name, r.roles, r.domaine_owner
+                FROM table_refs r JOIN tables t ON t.id = r.table_id
+                WHERE r.flux_id IN ({placeholders})
+                ORDER BY r.flux_id, r.position
+                """,
+                chunk,
+            ):
+                refs_by_flux.setdefault(r["flux_id"], []).append({
+                    "platform":      r["platform"],
+                    "dataset":       r["dataset"],
+                    "table":         r["name"],
+                    "roles":         roles_of(r["roles"]),
+                    "domaine_owner": r["domaine_owner"],
+                })
+            for job_row, job in self._jobs_of(
+                f"SELECT * FROM jobs WHERE flux_id IN ({placeholders}) ORDER BY flux_id, position",
+                chunk,
+            ):
+                jobs_by_flux.setdefault(job_row["flux_id"], []).append(job)
+        return [
+            {
+                "id_script":         r["id_script"],
+                "description":       r["description"],
+                "domaine":           r["domaine"],
+                "type":              r["type"],
+                "plateforme":        r["plateforme"],
+                "yaml_path":         r["yaml_path"],
+                "sql_files":         sql_by_flux.get(r["id"], []),
+                "tables_referenced": refs_by_flux.get(r["id"], []),
+                "is_transverse":     bool(r["is_transverse"]),
+                "jobs":              jobs_by_flux.get(r["id"], []),
+            }
+            for r in rows
+        ]
+
+    def _jobs_of(self, query: str, params: list[Any]) -> list[tuple[sqlite3.Row, dict]]:
+        """(ligne `jobs`, job au format de `build_index()`) des jobs sélectionnés par `query`."""
+        conn = self._conn()
+        rows = conn.execute(query, params).fetchall()
+        params_by_job: dict[int, dict[str, str]] = {}
+        ids = [r["id"] for r in rows]
+        for start in range(0, len(ids), _MAX_PARAMS):
+            chunk = ids[start:start + _MAX_PARAMS]
+            for p in conn.execute(
+                f"SELECT job_row, name, value FROM job_params WHERE job_row IN ({','.join('?' * len(chunk))}) "
+                "ORDER BY job_row, position",
+                chunk,
+            ):
+                params_by_job.setdefault(p["job_row"], {})[p["name"]] = p["value"]
+        return [
+            (r, {
+                "path":        r["path"],
+                "job_id":      r["job_id"],
+                "description": r["description"],
+                "parametres":  params_by_job.get(r["id"], {}),
+            })
+            for r in rows
+        ]
+
+
+# ── Public API ────────────────────────────────────────────────────────────────
+def open_store(
+    workspace: Path | None = None,
+    db_path: Path | None = None,
+    max_age: float | None = None,
+) -> IndexStore:
+    """Ouvre le store d'un workspace, en le construisant s'il est vide.
+
+    Args:
+        workspace: racine du workspace (défaut : WORKSPACE_ROOT).
+        db_path:   chemin de la base (défaut : `default_store_path(workspace)`).
+        max_age:   si fourni, rafraîchit le store s'il est plus vieux (secondes).
+                   Sinon, un store existant est utilisé tel quel.
+    """
+    root = (workspace or WORKSPACE_ROOT).resolve()
+    store = IndexStore(db_path or default_store_path(root), root)
+    if store.is_stale(float("inf") if max_age is None else max_age):
+        store.refresh()
+    return store
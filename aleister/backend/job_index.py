@@ -0,0 +1,201 @@
+"""Aleister — Index des jobs.
+
+`build_index()` conserve l'arbre complet des jobs de chaque YAML (à plat,
+chaque job repéré par sa position « 2.1 »). `JobIndex` en dérive des
+index inverses, construits en un seul parcours :
+
+  - job_id → jobs ;
+  - (paramètre, valeur) → jobs, et paramètre → jobs ;
+  - variable dynamique → jobs qui la déclarent (paramètre `Variable`,
+    doc JobMaster §4.5) et jobs qui la lisent (`Variable` d'un
+    job.conditionnelle.si, ou « £NOM » dans une valeur de paramètre).
+
+Les questions « quels flux utilisent job.run.transfert vers BQ ? » ou
+« où FLAG_STAGING_OK est-il produit et testé ? » se résolvent par lookups,
+sans relire de YAML. Avec un `IndexStore`, les mêmes requêtes passent par
+les index SQLite (`find_jobs`, `variable_usage`).
+
+    jobs = JobIndex(build_index(compact=True))
+    jobs.find("job.run.transfert", PlateformeCible="BQ")
+    jobs.variable_usage("FLAG_STAGING_OK")
+"""
+
+from __future__ import annotations
+
+import re
+from array import array
+from bisect import bisect_right
+from typing import Mapping
+
+from aleister.backend.compact import CompactIndex
+from aleister.backend.index_store import IndexStore
+from aleister.backend.knowledge_base import build_index
+from aleister.backend.variables import CONDITION_JOB, VARIABLE_PARAM
+
+_VAR_REF = re.compile(r"£(\w+)")
+
+
+def _declared(job_id: str, params: Mapping[str, str]) -> str | None:
+    """Variable dynamique déclarée par le job, s'il en déclare une."""
+    if job_id == CONDITION_JOB:
+        return None
+    return params.get(VARIABLE_PARAM) or None
+
+
+def _consumed(job_id: str, params: Mapping[str, str]) -> set[str]:
+    """Variables lues par le job (£NOM dans ses paramètres, variable testée)."""
+    names = {name for value in params.values() for name in _VAR_REF.findall(value)}
+    if job_id == CONDITION_JOB and params.get(VARIABLE_PARAM):
+        names.add(params[VARIABLE_PARAM])
+    return names
+
+
+class JobIndex:
+    """Index inverses des jobs d'un index (dict de `build_index()` ou `CompactIndex`).
+
+    Les jobs sont numérotés dans l'ordre de l'index ; chaque lookup retourne
+    des numéros de jobs, matérialisés en dicts au dernier moment.
+    """
+
+    def __init__(self, index: Mapping):
+        self._flux = index["flux"]
+        self.by_job_id: dict[str, list[int]] = {}
+        self.by_param: dict[tuple[str, str], list[int]] = {}
+        self.by_name: dict[str, list[int]] = {}
+        self.declared: dict[str, list[int]] = {}
+        self.consumed: dict[str, list[int]] = {}
+        self._jobs: list[dict] | None = None   # jobs à plat (index dict seulement)
+        if isinstance(index, CompactIndex):
+            self._offsets = index._job_offsets
+            self._build_compact(index)
+        else:
+            self._offsets = array("I", [0])
+            self._jobs = []
+            for flux in self._flux:
+                self._jobs.extend(flux.get("jobs", ()))
+                self._offsets.append(len(self._jobs))
+            for row, job in enumerate(self._jobs):
+                self._add(row, job["job_id"], job["parametres"])
+
+    def _build_compact(self, idx: CompactIndex) -> None:
+        job_ids, names = idx._job_vocab.names, idx._param_vocab.names
+        offsets, name_col, values = idx._param_offsets, idx._param_name_col, idx._param_values
+        for row in range(len(idx._job_paths)):
+            start, end = offsets[row], offsets[row + 1]
+            params = dict(zip((names[n] for n in name_col[start:end]), values[start:end]))
+            self._add(row, job_ids[idx._job_id_col[row]], params)
+
+    def _add(self, row: int, job_id: str, params: Mapping[str, str]) -> None:
+        self.by_job_id.setdefault(job_id, []).append(row)
+        for name, value in params.items():
+            self.by_param.setdefault((name, value), []).append(row)
+            self.by_name.setdefault(name, []).append(row)
+        variable = _declared(job_id, params)
+        if variable:
+            self.declared.setdefault(variable, []).append(row)
+        for variable in _consumed(job_id, params):
+            self.consumed.setdefault(variable, []).append(row)
+
+    # ── Matérialisation ───────────────────────────────────────────────────────
+    def _job(self, row: int) -> dict:
+        pos = bisect_right(self._offsets, row) - 1
+        flux = self._flux[pos]
+        if self._jobs is not None:
+            job = self._jobs[row]
+        else:
+            job = flux["jobs"][row - self._offsets[pos]]
+        return {
+            "id_script": flux["id_script"], "domaine": flux["domaine"],
+            "type": flux["type"], "yaml_path": flux["yaml_path"], **job,
+        }
+
+    def _jobs_at(self, rows) -> list[dict]:
+        return [self._job(row) for row in sorted(rows)]
+
+    # ── Requêtes ──────────────────────────────────────────────────────────────
+    def find(self, job_id: str | None = None, **params: str | None) -> list[dict]:
+        """Jobs de type `job_id` (si fourni) ayant tous les paramètres `params`.
+
+        Une valeur None exige seulement la présence du paramètre :
+        `find(Variable=None)` liste tous les jobs qui déclarent une variable.
+
+        Returns:
+            [{"id_script", "domaine", "type", "yaml_path",
+              "path", "job_id", "description", "parametres"}, ...] dans l'ordre de l'index.
+        """
+        postings: list[list[int]] = []
+        if job_id is not None:
+            postings.append(self.by_job_id.get(job_id, []))
+        for name, value in params.items():
+            postings.append(
+                self.by_name.get(name, []) if value is None else self.by_param.get((name, value), [])
+            )
+        if not postings:
+            return self._jobs_at(range(self._offsets[-1]))
+        postings.sort(key=len)
+        rows = set(postings[0])
+        for other in postings[1:]:
+            rows.intersection_update(other)
+        return self._jobs_at(rows)
+
+    def variable_usage(self, name: str) -> dict[str, list[dict]]:
+        """{"declared": [...], "consumed": [...]} : jobs qui produisent la
+        variable dynamique `name` (avec ou sans « £ ») et jobs qui la lisent."""
+        name = name.lstrip("£")
+        return {
+            "declared": self._jobs_at(self.declared.get(name, ())),
+            "consumed": self._jobs_at(self.consumed.get(name, ())),
+        }
+
+    def variables(self) -> list[str]:
+        """Variables dynamiques déclarées dans le workspace, triées."""
+        return sorted(self.declared)
+
+    def job_counts(self) -> dict[str, int]:
+        """{job_id : nombre d'occurrences}, par nombre décroissant."""
+        return dict(sorted(
+            ((job_id, len(rows)) for job_id, rows in self.by_job_id.items()),
+            key=lambda item: (-item[1], item[0]),
+        ))
+
+
+# ── Public API ────────────────────────────────────────────────────────────────
+def find_jobs(
+    job_id: str | None = None,
+    params: dict[str, str | None] | None = None,
+    index: Mapping | None = None,
+    store: IndexStore | None = None,
+) -> list[dict]:
+    """`JobIndex.find` sur le store SQLite (prioritaire) ou sur `index`."""
+    if store is not None:
+        return store.query_jobs(job_id, params)
+    return JobIndex(index or build_index()).find(job_id, **(params or {}))
+
+
+def variable_usage(
+    name: str,
+    index: Mapping | None = None,
+    store: IndexStore | None = None,
+) -> dict[str, list[dict]]:
+    """`JobIndex.variable_usage` sur le store SQLite (prioritaire) ou sur `index`."""
+    if store is None:
+        return JobIndex(index or build_index()).variable_usage(name)
+    name = name.lstrip("£")
+    declared = [
+        job for job in store.query_jobs(params={VARIABLE_PARAM: name})
+        if _declared(job["job_id"], job["parametres"]) == name
+    ]
+    consumed: dict[tuple[str, str], dict] = {}
+    candidates = store.query_jobs(CONDITION_JOB, {VARIABLE_PARAM: name}) + store.jobs_referencing(f"£{name}")
+    for job in candidates:
+        if name in _consumed(job["job_id"], job["parametres"]):
+            consumed.setdefault((job["yaml_path"], job["path"]), job)
+    return {
+        "declared": declared,
+        "consumed": sorted(consumed.values(), key=_job_order),
+    }
+
+
+def _job_order(job: dict) -> tuple:
+    """Ordre de l'index : YAML, puis position du job (2 < 2.1 < 10)."""
+    return job["yaml_path"].split("/"), [int(part) for part in job["path"].split(".")]
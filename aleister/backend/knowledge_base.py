@@ -2,7 +2,9 @@
 
 Parcourt WORKSPACE_ROOT, parse les YAML de chaque flux et extrait les
 références SQL (£XX_SOCLE.table, £XX_HISTO.table) pour détecter les
-dépendances cross-domaine.
+dépendances cross-domaine. Les tables désignées par une variable de
+`parametres_env`, dans les SQL ou dans les paramètres des jobs
+(`Table: £TBL_SOCLE`), sont résolues (voir `variables`).
 
 Structure de l'index retourné par `build_index()` :
   {
@@ -15,36 +17,98 @@ Structure de l'index retourné par `build_index()` :
         "type": "Import",            # Import | Alimentation | Export | Aggregat
         "plateforme": "BQ",
         "yaml_path": "...",
-        "sql_files": ["..."],
-        "tables_referenced": [       # toutes les tables £XX.table trouvées dans les SQL
-          {"platform": "BQ", "dataset": "BQ_SOCLE", "table": "clients", "domaine_owner": "Clients"},
+        "sql_files": ["..."],        # SQL cités par les paramètres Requete des jobs
+        "tables_referenced": [       # tables £XX.table des SQL et des paramètres des jobs
+          {"platform": "BQ", "dataset": "BQ_SOCLE", "table": "clients",
+           "roles": ["read"], "domaine_owner": "Clients"},
           ...
         ],
         "is_transverse": bool,       # True si une table référencée appartient à un autre domaine
+        "jobs": [                    # arbre des jobs à plat, dans l'ordre du YAML
+          {"path": "2.1",            # position (1, 2, 2.1… : 1er enfant du 2e job)
+           "job_id": "job.run.sql", "description": "...",
+           "parametres": {"Plateforme": "BQ", "Requete": "x.gql", ...}},  # valeurs en texte
+          ...
+        ],
       },
       ...
     ],
-    "tables": {                      # index inverse : table → flux qui la référencent
-      "BQ_SOCLE.clients": ["Clients_Import_...", ...],
+    "tables": {                      # index inverse : table → {flux : rôles}
+      "BQ_SOCLE.clients": {"Clients_Import_...": ["write"], ...},
       ...
     },
   }
+
+Rôles (voir `sql_scanner`) : read, write, create, delete — selon la position
+de la table dans l'instruction (FROM/JOIN, INSERT/MERGE/UPDATE, CREATE,
+DELETE/TRUNCATE/DROP). Commentaires et littéraux SQL sont ignorés.
+
+Mode incrémental (`build_index(incremental=True)`) : l'index est sérialisé
+dans INDEX_CACHE_DIR avec un manifest (chemin, taille, mtime, hash) de chaque
+fichier indexé. Au build suivant, seuls les fichiers ajoutés, modifiés ou
+supprimés sont re-parsés ; `flux` et `tables` sont patchés en place.
+
+Snapshot (`build_index(snapshot=True)`, défaut INDEX_SNAPSHOT) : chaque
+build écrit aussi un snapshot binaire versionné de l'index (`snapshot`),
+associé à une empreinte du workspace. Tant que l'empreinte est inchangée,
+les appels suivants le rechargent par mmap au lieu de reconstruire.
+
+Cache de parsing (`parse_cache`, PARSE_CACHE_MB) : le résultat du parsing
+de chaque YAML, SQL et script socle est mémorisé sous le hash de son
+contenu ; un fichier déjà vu (autre domaine, autre branche, autre
+workspace) n'est pas re-parsé.
+
+Mode parallèle (`build_index(workers=N)`) : le parsing YAML + SQL est
+réparti par lots de YAML d'un même répertoire de type sur un
+ProcessPoolExecutor ; les lots sont fusionnés dans l'ordre de soumission,
+le résultat est donc identique à un build séquentiel.
 """
 
 from __future__ import annotations
 
+import hashlib
+import json
+import os
+import pickle
 import re
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Iterable
 
 import yaml
 
-from aleister.config import WORKSPACE_ROOT
+from aleister.config import FLOW_TYPES, INDEX_CACHE_DIR, INDEX_SNAPSHOT, INDEX_WORKERS, WORKSPACE_ROOT
+from aleister.backend.compact import CompactIndex
+from aleister.backend.parse_cache import blob_hash, get_parse_cache
+from aleister.backend.snapshot import load_snapshot, save_snapshot
+from aleister.backend.workspace_scan import WorkspaceScan, scan_workspace
+from aleister.backend.sql_scanner import (
+    TABLE_PATTERN_BYTES,
+    map_file,
+    mask_of,
+    roles_of,
+    scan_sql_refs,
+)
+from aleister.backend.variables import ScriptVariables, job_table_refs, sql_table_refs
+
+
+# Version du format de cache : à incrémenter dès que la structure d'un flux change.
+_CACHE_VERSION = 7
+
+# Nombre maximal de YAML par tâche envoyée au pool de processus.
+_PARALLEL_CHUNK = 64
 
 
 # ── Patterns ──────────────────────────────────────────────────────────────────
-# Capture £BQ_SOCLE.clients, £TD_HISTO.cdr_voix, etc.
-_TABLE_RE = re.compile(r"£(BQ|TD)_(SOCLE|HISTO|TMP|VUES|SOURCE)\.(\w+)")
+# Capture £BQ_SOCLE.clients, £TD_HISTO.cdr_voix, etc. (sur les octets du fichier)
+_TABLE_RE = re.compile(TABLE_PATTERN_BYTES)
+
+# Ligne « clé: valeur » d'un YAML (repli ligne à ligne et lecture d'en-tête)
+_LINE_RE = re.compile(r"^( *)(?:- )?(\w+):\s*(.*?)\s*(?:#.*)?$")
+
+# Loader libyaml (C) si disponible, sinon loader pur Python
+_YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
 
 # Mapping table_name → domaine propriétaire (socle tables)
 # Construit dynamiquement depuis l'arborescence des workspaces.
@@ -52,140 +116,833 @@ _SOCLE_TABLE_TO_DOMAIN: dict[str, str] = {}
 
 
 # ── Helpers ───────────────────────────────────────────────────────────────────
-def _build_socle_index(workspace: Path) -> dict[str, str]:
+def _build_socle_index(workspace: Path, scan: WorkspaceScan | None = None) -> dict[str, str]:
     """Associe chaque table SOCLE à son domaine propriétaire.
 
     Stratégie : cherche les fichiers SQL de création dans Alimentation/installation/sql/
     et Import/installation/sql/ et déduit le domaine depuis le chemin.
+    `scan` évite un nouveau parcours du workspace s'il a déjà été fait.
     """
+    if scan is None:
+        scan = scan_workspace(workspace)
     mapping: dict[str, str] = {}
-    for create_sql in workspace.rglob("*_creation_table_socle.*"):
+    for create_sql in scan.socle_scripts:
         domaine = create_sql.parts[len(workspace.parts)]
-        for m in _TABLE_RE.finditer(create_sql.read_text(encoding="utf-8", errors="ignore")):
-            _, dataset, table = m.groups()
-            if dataset == "SOCLE":
+        try:
+            for table in _parse_cached(create_sql, "socle", _socle_tables):
                 mapping[table] = domaine
+        except OSError:
+            continue
+    cache = get_parse_cache(_CACHE_VERSION)
+    if cache is not None:
+        cache.flush()
     return mapping
 
 
-def _extract_tables(sql_paths: list[Path]) -> list[dict]:
-    """Extrait toutes les références £XX_DATASET.table depuis des fichiers SQL."""
-    seen: set[str] = set()
-    refs: list[dict] = []
+def _socle_tables(buf: bytes) -> list[str]:
+    """Tables £XX_SOCLE.table citées par un script de création."""
+    return [
+        table.decode()
+        for _, dataset, table in (m.groups() for m in _TABLE_RE.finditer(buf))
+        if dataset == b"SOCLE"
+    ]
+
+
+def _parse_cached(path: Path, kind: str, parse: Callable[[Any], Any], qualifier: str = "") -> Any:
+    """`parse(contenu)` d'un fichier projeté en mémoire, via le cache de parsing.
+
+    La clé est le hash du contenu (`blob_hash`) : un fichier identique à un
+    fichier déjà parsé, dans ce workspace ou un autre, n'est pas re-parsé.
+    `qualifier` distingue les résultats qui dépendent aussi du nom du fichier.
+    """
+    cache = get_parse_cache(_CACHE_VERSION)
+    with map_file(path) as buf:
+        if cache is None:
+            return parse(buf)
+        key = f"{kind}:{blob_hash(buf)}{qualifier}"
+        value = cache.get(key)
+        if value is None:
+            value = parse(buf)
+            cache.put(key, value)
+        return value
+
+
+def _scan_sql(path: Path) -> tuple[list[tuple[str, str, str, int]], list[tuple[str, int]]]:
+    """Références d'un fichier SQL : tables (platform, dataset, table, masque de
+    rôles) et £variables (voir `sql_scanner.scan_sql_refs`).
+
+    Le fichier est projeté en mémoire et analysé sur ses octets : seuls les
+    noms de tables trouvés sont décodés (mémoire constante, même pour un
+    script de plusieurs dizaines de Mo).
+    """
+    try:
+        return _parse_cached(path, "sql", scan_sql_refs)
+    except (OSError, ValueError):
+        return [], []
+
+
+def _extract_tables(
+    sql_paths: list[Path],
+    meta: dict,
+    sql_cache: dict[Path, tuple[list, list]] | None = None,
+) -> list[dict]:
+    """Extrait toutes les références £XX_DATASET.table (et leurs rôles) d'un flux.
+
+    `sql_cache` mémorise le résultat par fichier : un SQL partagé par
+    plusieurs flux d'un même répertoire n'est lu qu'une fois. Une table
+    citée par plusieurs SQL du flux cumule leurs rôles.
+    """
+    if sql_cache is None:
+        sql_cache = {}
     for path in sql_paths:
-        try:
-            content = path.read_text(encoding="utf-8", errors="ignore")
-        except OSError:
-            continue
-        for m in _TABLE_RE.finditer(content):
-            platform, dataset, table = m.groups()
-            key = f"{platform}_{dataset}.{table}"
-            if key not in seen:
-                seen.add(key)
-                refs.append({"platform": platform, "dataset": f"{platform}_{dataset}", "table": table})
+        if path not in sql_cache:
+            sql_cache[path] = _scan_sql(path)
+    return _table_refs(meta, [sql_cache[path] for path in sql_paths])
+
+
+def _table_refs(meta: dict, sql_scans: list[tuple[list, list]]) -> list[dict]:
+    """Tables d'un flux : littérales des SQL, puis désignées par une variable de
+    script dans les SQL, puis citées par les paramètres des jobs."""
+    return _merge_refs([
+        *(tables for tables, _ in sql_scans),
+        *(sql_table_refs(meta["variables"], refs) for _, refs in sql_scans),
+        meta["param_tables"],
+    ])
+
+
+def _merge_refs(scans: Iterable[list[tuple[str, str, str, int]]]) -> list[dict]:
+    """Fusionne les références de plusieurs SQL (ordre de première occurrence,
+    union des rôles)."""
+    masks: dict[str, int] = {}
+    refs: list[dict] = []
+    for scanned in scans:
+        for platform, dataset, table, mask in scanned:
+            key = f"{dataset}.{table}"
+            if key not in masks:
+                masks[key] = 0
+                refs.append({"platform": platform, "dataset": dataset, "table": table})
+            masks[key] |= mask
+    for ref in refs:
+        ref["roles"] = roles_of(masks[f"{ref['dataset']}.{ref['table']}"])
     return refs
 
 
+def _iter_jobs(jobs: Any):
+    """Parcourt récursivement une liste de jobs, y compris les blocs enfants `jobs:`
+    de job.process.* et job.conditionnelle.si."""
+    if not isinstance(jobs, list):
+        return
+    for job in jobs:
+        if not isinstance(job, dict):
+            continue
+        yield job
+        yield from _iter_jobs(job.get("jobs"))
+
+
+def _collect_requetes(script: dict) -> list[str]:
+    """Noms des fichiers SQL cités par les paramètres Requete, dans l'ordre des jobs."""
+    names: list[str] = []
+    for job in _iter_jobs(script.get("jobs")):
+        params = job.get("parametres")
+        if not isinstance(params, dict):
+            continue
+        requete = params.get("Requete")
+        if isinstance(requete, str) and requete.strip():
+            name = Path(requete.strip()).name
+            if name not in names:
+                names.append(name)
+    return names
+
+
+def _scalar(value: Any) -> str:
+    """Valeur de paramètre YAML → texte, tel qu'écrit dans le fichier (true, 3, OUI)."""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if value is None:
+        return ""
+    return str(value)
+
+
+def _collect_jobs(jobs: Any, prefix: str = "") -> list[dict]:
+    """Arbre des jobs à plat (ordre du YAML), chaque job repéré par sa position."""
+    found: list[dict] = []
+    if not isinstance(jobs, list):
+        return found
+    position = 0
+    for job in jobs:
+        if not isinstance(job, dict):
+            continue
+        position += 1
+        path = f"{prefix}.{position}" if prefix else str(position)
+        params = job.get("parametres")
+        found.append({
+            "path":        path,
+            "job_id":      _scalar(job.get("job_id")),
+            "description": _scalar(job.get("description")),
+            "parametres":  (
+                {str(k): _scalar(v) for k, v in params.items()} if isinstance(params, dict) else {}
+            ),
+        })
+        found.extend(_collect_jobs(job.get("jobs"), path))
+    return found
+
+
 def _parse_yaml_meta(yaml_path: Path) -> dict:
-    """Extrait id_script, description et plateforme depuis un YAML."""
+    """Extrait id_script, description, fichiers Requete, plateforme et jobs d'un YAML.
+
+    Le fichier est lu et parsé une seule fois. Si le YAML est invalide
+    (ex. échappement `\\d` dans une chaîne entre guillemets), les mêmes
+    informations sont extraites ligne à ligne.
+    """
+    stem = yaml_path.stem
     try:
-        data = yaml.safe_load(yaml_path.read_text(encoding="utf-8", errors="ignore"))
-        script = data.get("script", {}) if data else {}
-        return {
-            "id_script":   script.get("id_script", yaml_path.stem),
-            "description": script.get("description", ""),
-        }
-    except Exception:
-        return {"id_script": yaml_path.stem, "description": ""}
+        return _parse_cached(
+            yaml_path, "yaml", lambda buf: _parse_yaml_text(_decode_text(buf), stem), f":{stem}"
+        )
+    except OSError:
+        return _with_variables(
+            {"id_script": stem, "description": "", "requetes": [], "plateforme": "?", "jobs": []}, {}
+        )
+
 
+def _decode_text(data: Any) -> str:
+    """Octets d'un fichier texte → str, comme `read_text` (UTF-8, fins de ligne normalisées)."""
+    text = str(data, "utf-8", "ignore")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
 
-def _detect_platform(yaml_path: Path, meta: dict) -> str:
-    """Déduit la plateforme (BQ/TD) depuis le contenu YAML."""
+
+def _parse_yaml_text(text: str, default_id: str) -> dict:
+    """`_parse_yaml_meta` sur un texte déjà lu (`default_id` : nom du fichier sans extension)."""
     try:
-        content = yaml_path.read_text(encoding="utf-8", errors="ignore")
-        if "Plateforme: BQ" in content or "PlateformeSource: BQ" in content:
-            return "BQ"
-        if "Plateforme: TD" in content or "PlateformeSource: TD" in content:
-            return "TD"
+        data = yaml.load(text, Loader=_YamlLoader)
+    except yaml.YAMLError:
+        return _scan_yaml_lines(text, default_id)
+    script = data.get("script", {}) if isinstance(data, dict) else {}
+    if not isinstance(script, dict):
+        script = {}
+    env = script.get("parametres_env")
+    return _with_variables({
+        "id_script":   str(script.get("id_script") or default_id),
+        "description": str(script.get("description") or ""),
+        "requetes":    _collect_requetes(script),
+        "plateforme":  _detect_platform(script),
+        "jobs":        _collect_jobs(script.get("jobs")),
+    }, {str(k): _scalar(v) for k, v in env.items()} if isinstance(env, dict) else {})
+
+
+def _with_variables(meta: dict, env: dict[str, str]) -> dict:
+    """Ajoute à `meta` les variables de script résolues ("variables") et les
+    tables citées par les paramètres des jobs ("param_tables")."""
+    variables = ScriptVariables(env)
+    meta["param_tables"] = job_table_refs(variables, meta["jobs"])
+    meta["variables"] = variables.resolved()
+    return meta
+
+
+def _detect_platform(script: dict) -> str:
+    """Déduit la plateforme (BQ/TD) des paramètres Plateforme / PlateformeSource des jobs.
+
+    Un flux qui touche les deux plateformes est rattaché à BQ.
+    """
+    found: set[str] = set()
+    for job in _iter_jobs(script.get("jobs")):
+        params = job.get("parametres")
+        if not isinstance(params, dict):
+            continue
+        for name in ("Plateforme", "PlateformeSource"):
+            value = params.get(name)
+            if value in ("BQ", "TD"):
+                found.add(value)
+    if "BQ" in found:
+        return "BQ"
+    if "TD" in found:
+        return "TD"
+    return "?"
+
+
+def _unquote(value: str) -> str:
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    return value
+
+
+def _scan_yaml_lines(text: str, default_id: str) -> dict:
+    """Extraction ligne à ligne, sans parser YAML (repli pour les fichiers invalides)."""
+    lines = text.splitlines()
+    meta = {
+        "id_script": default_id, "description": "", "requetes": [], "plateforme": "?",
+        "jobs": _scan_jobs_lines(lines),
+    }
+    platforms: set[str] = set()
+    env: dict[str, str] = {}
+    in_header, in_env = True, False
+    for line in lines:
+        m = _LINE_RE.match(line)
+        if not m:
+            continue
+        indent, key, value = len(m.group(1)), m.group(2), _unquote(m.group(3))
+        if in_env and indent == 4:
+            env[key] = value
+            continue
+        in_env = in_header and indent == 2 and key == "parametres_env"
+        if key == "jobs":
+            in_header = False
+        elif in_header and indent == 2 and key == "id_script" and value:
+            meta["id_script"] = value
+        elif in_header and indent == 2 and key == "description":
+            meta["description"] = value
+        elif key == "Requete" and value:
+            name = Path(value).name
+            if name not in meta["requetes"]:
+                meta["requetes"].append(name)
+        elif key in ("Plateforme", "PlateformeSource") and value in ("BQ", "TD"):
+            platforms.add(value)
+    meta["plateforme"] = "BQ" if "BQ" in platforms else "TD" if "TD" in platforms else "?"
+    return _with_variables(meta, env)
+
+
+def _scan_jobs_lines(lines: list[str]) -> list[dict]:
+    """`_collect_jobs` ligne à ligne : l'imbrication est déduite de l'indentation
+    des lignes « - job_id: »."""
+    jobs: list[dict] = []
+    lists: list[list] = []          # [indentation du « - », chemin du parent, nb de jobs]
+    current: dict | None = None
+    job_indent = params_indent = -1
+    for line in lines:
+        m = _LINE_RE.match(line)
+        if not m:
+            continue
+        indent, key, value = len(m.group(1)), m.group(2), _unquote(m.group(3))
+        is_item = line.startswith("- ", indent)
+        if is_item and key == "job_id":
+            while lists and lists[-1][0] > indent:
+                lists.pop()
+            if lists and lists[-1][0] == indent:
+                lists[-1][2] += 1
+            else:
+                lists.append([indent, current["path"] if current else "", 1])
+            parent, position = lists[-1][1], lists[-1][2]
+            current = {
+                "path":        f"{parent}.{position}" if parent else str(position),
+                "job_id":      value,
+                "description": "",
+                "parametres":  {},
+            }
+            jobs.append(current)
+            job_indent, params_indent = indent + 2, -1
+            continue
+        if current is None:
+            continue
+        key_indent = indent + 2 if is_item else indent
+        if params_indent >= 0 and key_indent > params_indent:
+            current["parametres"][key] = value
+            continue
+        params_indent = -1
+        if key_indent == job_indent and key == "description":
+            current["description"] = value
+        elif key_indent == job_indent and key == "parametres":
+            params_indent = key_indent
+    return jobs
+
+
+def read_yaml_header(yaml_path: Path) -> dict:
+    """Lit uniquement l'en-tête `script:` d'un YAML (id_script, description).
+
+    Chemin rapide pour les rafraîchissements de métadonnées : la lecture
+    s'arrête à la ligne `jobs:`, sans parser le reste du document.
+    """
+    header = {"id_script": yaml_path.stem, "description": ""}
+    try:
+        with open(yaml_path, encoding="utf-8", errors="ignore") as fh:
+            for line in fh:
+                m = _LINE_RE.match(line.rstrip("\r\n"))
+                if not m or len(m.group(1)) != 2:
+                    continue
+                key, value = m.group(2), _unquote(m.group(3))
+                if key == "jobs":
+                    break
+                if key == "id_script" and value:
+                    header["id_script"] = value
+                elif key == "description":
+                    header["description"] = value
     except OSError:
         pass
-    return "?"
+    return header
 
 
-# ── Public API ────────────────────────────────────────────────────────────────
-def build_index(workspace: Path | None = None) -> dict[str, Any]:
-    """Construit l'index complet des flux depuis le workspace.
+def _index_flux(
+    yaml_path: Path,
+    domaine: str,
+    flow_type: str,
+    sql_cache: dict[Path, tuple[list, list]],
+    socle_map: dict[str, str],
+) -> dict:
+    """Construit l'entrée d'index d'un flux à partir de son YAML et de ses SQL.
 
-    Returns a dict with keys: domaines, flux, tables.
+    Seuls les SQL cités par un paramètre Requete et présents dans le
+    répertoire sql/ voisin sont rattachés au flux (règle de résolution §1).
     """
-    root = workspace or WORKSPACE_ROOT
-    if not root.exists():
-        return {"domaines": [], "flux": [], "tables": {}}
+    meta = _parse_yaml_meta(yaml_path)
+    sql_dir = yaml_path.parent.parent / "sql"
+    sql_files = [sql_dir / name for name in meta["requetes"] if (sql_dir / name).is_file()]
+    table_refs = _extract_tables(sql_files, meta, sql_cache)
+    return _flux_entry(meta, domaine, flow_type, yaml_path, sql_files, table_refs, socle_map)
+
+
+def _flux_entry(
+    meta: dict,
+    domaine: str,
+    flow_type: str,
+    yaml_path: Path,
+    sql_files: list[Path],
+    table_refs: list[dict],
+    socle_map: dict[str, str],
+) -> dict:
+    """Entrée d'index d'un flux, propriété des tables appliquée."""
+    flux = {
+        "id_script":         meta["id_script"],
+        "description":       meta["description"],
+        "domaine":           domaine,
+        "type":              flow_type,
+        "plateforme":        meta["plateforme"],
+        "yaml_path":         str(yaml_path),
+        "sql_files":         [str(p) for p in sql_files],
+        "tables_referenced": table_refs,
+        "is_transverse":     False,
+        "jobs":              meta["jobs"],
+    }
+    _apply_ownership(flux, socle_map)
+    return flux
+
+
+def _apply_ownership(flux: dict, socle_map: dict[str, str]) -> None:
+    """Renseigne domaine_owner sur chaque référence et recalcule is_transverse."""
+    domaine = flux["domaine"]
+    for ref in flux["tables_referenced"]:
+        if ref["dataset"].endswith("_SOCLE"):
+            ref["domaine_owner"] = socle_map.get(ref["table"], domaine)
+        else:
+            ref["domaine_owner"] = domaine
+    flux["is_transverse"] = any(
+        ref.get("domaine_owner", domaine) != domaine
+        for ref in flux["tables_referenced"]
+    )
+
+
+def _tables_index(flux_list: list[dict]) -> dict[str, dict[str, list[str]]]:
+    """Index inverse table → {id_script : rôles}.
+
+    Reconstruit à partir de la liste des flux (un id_script porté par
+    plusieurs flux cumule leurs rôles) : O(nombre de références), sans
+    commune mesure avec le parsing.
+    """
+    tables: dict[str, dict[str, list[str]]] = {}
+    for flux in flux_list:
+        for ref in flux["tables_referenced"]:
+            scripts = tables.setdefault(f"{ref['dataset']}.{ref['table']}", {})
+            roles = scripts.get(flux["id_script"])
+            if roles is None:
+                scripts[flux["id_script"]] = list(ref.get("roles", ()))
+            else:
+                scripts[flux["id_script"]] = roles_of(
+                    mask_of(roles) | mask_of(ref.get("roles", ()))
+                )
+    return tables
+
+
+def _flux_sort_key(flux: dict) -> tuple[str, str, str]:
+    """Ordre canonique d'un build complet : domaine, type, nom du YAML."""
+    return (flux["domaine"], flux["type"], Path(flux["yaml_path"]).name)
+
+
+# ── Manifest (mode incrémental) ───────────────────────────────────────────────
+def _file_hash(path: Path) -> str:
+    return hashlib.sha1(path.read_bytes()).hexdigest()
+
+
+def _stat_files(root: Path, scan: WorkspaceScan | None = None) -> dict[str, tuple[int, int]]:
+    """Retourne {chemin relatif : (taille, mtime_ns)} sans lire le contenu."""
+    return (scan or scan_workspace(root)).stat_files()
+
+
+def _cache_dir(root: Path) -> Path:
+    digest = hashlib.sha1(str(root.resolve()).encode("utf-8")).hexdigest()[:16]
+    return INDEX_CACHE_DIR / digest
 
+
+def _load_cache(root: Path) -> tuple[dict, dict, dict] | None:
+    """Charge (index, manifest, socle_map) depuis le cache, ou None si invalide."""
+    cache = _cache_dir(root)
+    try:
+        manifest = json.loads((cache / "manifest.json").read_text(encoding="utf-8"))
+        # Racine résolue : les chemins des flux en dépendent
+        if manifest.get("version") != _CACHE_VERSION or manifest.get("root") != str(root.resolve()):
+            return None
+        with open(cache / "index.pkl", "rb") as fh:
+            index = pickle.load(fh)
+    except (OSError, ValueError, pickle.UnpicklingError, EOFError):
+        return None
+    return index, manifest["files"], manifest["socle_map"]
+
+
+def _save_cache(root: Path, index: dict, files: dict, socle_map: dict[str, str]) -> None:
+    cache = _cache_dir(root)
+    try:
+        cache.mkdir(parents=True, exist_ok=True)
+        tmp = cache / "index.pkl.tmp"
+        with open(tmp, "wb") as fh:
+            pickle.dump(index, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp.replace(cache / "index.pkl")
+        manifest = {
+            "version":   _CACHE_VERSION,
+            "root":      str(root.resolve()),
+            "files":     files,
+            "socle_map": socle_map,
+        }
+        tmp = cache / "manifest.json.tmp"
+        tmp.write_text(json.dumps(manifest), encoding="utf-8")
+        tmp.replace(cache / "manifest.json")
+    except OSError:
+        pass  # le cache est une optimisation : un échec d'écriture n'est pas bloquant
+
+
+def _build_manifest(root: Path, stats: dict[str, tuple[int, int]]) -> dict[str, dict]:
+    files: dict[str, dict] = {}
+    for rel, (size, mtime_ns) in stats.items():
+        try:
+            digest = _file_hash(root / rel)
+        except OSError:
+            continue
+        files[rel] = {"size": size, "mtime_ns": mtime_ns, "sha1": digest}
+    return files
+
+
+def _diff_manifest(
+    root: Path,
+    old: dict[str, dict],
+    stats: dict[str, tuple[int, int]],
+) -> tuple[dict[str, dict], set[str], set[str]]:
+    """Compare le manifest aux stats courantes.
+
+    Le hash n'est recalculé que si taille ou mtime ont bougé : un simple
+    `touch` ne déclenche donc pas de re-parsing.
+
+    Returns:
+        (nouveau manifest, fichiers ajoutés/modifiés, fichiers supprimés)
+    """
+    files: dict[str, dict] = {}
+    changed: set[str] = set()
+    for rel, (size, mtime_ns) in stats.items():
+        entry = old.get(rel)
+        if entry and entry["size"] == size and entry["mtime_ns"] == mtime_ns:
+            files[rel] = entry
+            continue
+        try:
+            digest = _file_hash(root / rel)
+        except OSError:
+            continue
+        files[rel] = {"size": size, "mtime_ns": mtime_ns, "sha1": digest}
+        if not entry or entry["sha1"] != digest:
+            changed.add(rel)
+    deleted = set(old) - set(files)
+    return files, changed, deleted
+
+
+def _type_dir_of(rel: str) -> tuple[str, str] | None:
+    """'<Domaine>/<Type>/config|sql/x' → (Domaine, Type), sinon None."""
+    parts = rel.split("/")
+    if len(parts) == 4 and parts[1] in FLOW_TYPES and parts[2] in ("config", "sql"):
+        return parts[0], parts[1]
+    return None
+
+
+def _is_indexed(rel: str) -> bool:
+    """True si le fichier (chemin relatif) fait partie de ceux suivis par le manifest."""
+    if "_creation_table_socle." in rel:
+        return True
+    if _type_dir_of(rel) is None:
+        return False
+    folder = rel.split("/")[2]
+    return rel.endswith(".yml") if folder == "config" else rel.endswith((".gql", ".dql"))
+
+
+def _update_index(
+    root: Path,
+    index: dict[str, Any],
+    old_socle_map: dict[str, str],
+    changed: set[str],
+    deleted: set[str],
+    added: set[str],
+    workers: int = 1,
+) -> dict[str, str]:
+    """Patche `flux` en place pour les fichiers modifiés et reconstruit `tables`.
+
+    Un YAML est re-parsé s'il a changé ou si l'un des SQL qu'il cite a
+    changé ou disparu. Un SQL ajouté peut satisfaire une Requete jusque-là
+    orpheline : tous les YAML de son répertoire sont alors re-parsés. Si un
+    script de création socle a changé, la propriété des tables est
+    réappliquée à tous les flux (sans re-parsing).
+
+    Returns:
+        Le mapping socle → domaine en vigueur après mise à jour.
+    """
+    touched = changed | deleted
+    socle_map = old_socle_map
+    if any("_creation_table_socle." in rel for rel in touched):
+        socle_map = _build_socle_index(root)
+
+    dirty_types: set[tuple[str, str]] = set()
+    dirty_yamls: set[str] = set()
+    dirty_sql: set[str] = set()
+    for rel in touched:
+        loc = _type_dir_of(rel)
+        if loc is None:
+            continue
+        if rel.endswith(".yml"):
+            dirty_yamls.add(rel)
+        elif rel in added:
+            dirty_types.add(loc)
+        else:
+            dirty_sql.add(rel)
+
+    def is_dirty(flux: dict, rel: str) -> bool:
+        if rel in dirty_yamls or _type_dir_of(rel) in dirty_types:
+            return True
+        return any(
+            Path(sql).relative_to(root).as_posix() in dirty_sql
+            for sql in flux["sql_files"]
+        )
+
+    flux_list: list[dict] = index["flux"]
+
+    kept: list[dict] = []
+    to_parse: set[str] = {rel for rel in dirty_yamls if rel not in deleted}
+    for flux in flux_list:
+        rel = Path(flux["yaml_path"]).relative_to(root).as_posix()
+        if is_dirty(flux, rel):
+            if rel not in deleted:
+                to_parse.add(rel)
+        else:
+            kept.append(flux)
+    flux_list[:] = kept
+
+    # Re-parse des YAML des répertoires ayant reçu un nouveau SQL
+    for domaine, flow_type in dirty_types:
+        config_dir = root / domaine / flow_type / "config"
+        to_parse.update(p.relative_to(root).as_posix() for p in config_dir.glob("*.yml"))
+
+    by_type: dict[Path, list[Path]] = {}
+    for rel in sorted(to_parse):
+        domaine, flow_type = _type_dir_of(rel)
+        yaml_path = root / rel
+        if yaml_path.exists():
+            by_type.setdefault(root / domaine / flow_type, []).append(yaml_path)
+
+    flux_list.extend(_run_tasks(_chunk_tasks(by_type), socle_map, workers))
+
+    if socle_map != old_socle_map:
+        for flux in flux_list:
+            _apply_ownership(flux, socle_map)
+
+    flux_list.sort(key=_flux_sort_key)
+    index["domaines"] = sorted({f["domaine"] for f in flux_list})
+    index["tables"] = _tables_index(flux_list)
+    return socle_map
+
+
+# ── Scan (séquentiel ou parallèle) ─────────────────────────────────────────────
+def _resolve_workers(workers: int | None) -> int:
+    """None → INDEX_WORKERS ; 0 → nombre de cœurs ; sinon la valeur demandée."""
+    if workers is None:
+        workers = INDEX_WORKERS
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    return workers
+
+
+def _index_yamls(type_dir: Path, yaml_paths: list[Path], socle_map: dict[str, str]) -> list[dict]:
+    """Indexe une liste de YAML d'un même `<Domaine>/<Type>/` (exécutable dans un worker)."""
+    domaine, flow_type = type_dir.parent.name, type_dir.name
+    # Cache par répertoire sql/ : chaque SQL est lu une seule fois par lot
+    sql_cache: dict[Path, tuple[list, list]] = {}
+    flux_list = [
+        _index_flux(yaml_path, domaine, flow_type, sql_cache, socle_map)
+        for yaml_path in yaml_paths
+    ]
+    cache = get_parse_cache(_CACHE_VERSION)
+    if cache is not None:
+        cache.flush()
+    return flux_list
+
+
+def _chunk_tasks(by_type: dict[Path, list[Path]]) -> list[tuple[Path, list[Path]]]:
+    """Découpe chaque répertoire de type en lots d'au plus _PARALLEL_CHUNK YAML."""
+    return [
+        (type_dir, yaml_paths[start:start + _PARALLEL_CHUNK])
+        for type_dir, yaml_paths in by_type.items()
+        for start in range(0, len(yaml_paths), _PARALLEL_CHUNK)
+    ]
+
+
+def _run_tasks(
+    tasks: list[tuple[Path, list[Path]]],
+    socle_map: dict[str, str],
+    workers: int,
+) -> list[dict]:
+    """Exécute les lots et concatène les flux dans l'ordre des tâches."""
+    if workers <= 1 or len(tasks) <= 1:
+        batches = [_index_yamls(type_dir, yamls, socle_map) for type_dir, yamls in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            batches = list(pool.map(
+                _index_yamls,
+                [type_dir for type_dir, _ in tasks],
+                [yamls for _, yamls in tasks],
+                repeat(socle_map),
+            ))
+    return [flux for batch in batches for flux in batch]
+
+
+def _full_build(
+    root: Path,
+    workers: int = 1,
+    scan: WorkspaceScan | None = None,
+) -> tuple[dict[str, Any], dict[str, str]]:
+    """Scan complet du workspace. Retourne (index, mapping socle → domaine)."""
+    if scan is None:
+        scan = scan_workspace(root)
     # Build socle → domain mapping from installation scripts
-    socle_map = _build_socle_index(root)
-
-    flux_list: list[dict] = []
-    tables_index: dict[str, list[str]] = {}
-
-    for domain_dir in sorted(d for d in root.iterdir() if d.is_dir()):
-        domaine = domain_dir.name
-        for type_dir in sorted(t for t in domain_dir.iterdir() if t.is_dir()):
-            flow_type = type_dir.name
-            if flow_type not in ("Import", "Alimentation", "Export", "Aggregat"):
-                continue
-            config_dir = type_dir / "config"
-            sql_dir    = type_dir / "sql"
-            if not config_dir.exists():
-                continue
-
-            for yaml_path in sorted(config_dir.glob("*.yml")):
-                # Skip installation configs (they live in installation/config/)
-                meta = _parse_yaml_meta(yaml_path)
-                platform = _detect_platform(yaml_path, meta)
-
-                # Collect SQL files for this YAML (same sql_dir, same stem prefix)
-                sql_files: list[Path] = []
-                if sql_dir.exists():
-                    sql_files = list(sql_dir.glob("*.gql")) + list(sql_dir.glob("*.dql"))
-
-                table_refs = _extract_tables(sql_files)
-
-                # Enrich with domain ownership
-                for ref in table_refs:
-                    if ref["dataset"].endswith("_SOCLE"):
-                        owner = socle_map.get(ref["table"], domaine)
-                        ref["domaine_owner"] = owner
-                    else:
-                        ref["domaine_owner"] = domaine
-
-                is_transverse = any(
-                    ref.get("domaine_owner", domaine) != domaine
-                    for ref in table_refs
-                )
+    socle_map = _build_socle_index(root, scan)
+
+    by_type: dict[Path, list[Path]] = {
+        root / domaine / flow_type: yaml_paths
+        for (domaine, flow_type), yaml_paths in sorted(scan.configs.items())
+    }
+
+    flux_list = _run_tasks(_chunk_tasks(by_type), socle_map, workers)
 
-                flux = {
-                    "id_script":         meta["id_script"],
-                    "description":       meta["description"],
-                    "domaine":           domaine,
-                    "type":              flow_type,
-                    "plateforme":        platform,
-                    "yaml_path":         str(yaml_path),
-                    "sql_files":         [str(p) for p in sql_files],
-                    "tables_referenced": table_refs,
-                    "is_transverse":     is_transverse,
-                }
-                flux_list.append(flux)
-
-                # Update inverse index
-                for ref in table_refs:
-                    key = f"{ref['dataset']}.{ref['table']}"
-                    tables_index.setdefault(key, []).append(meta["id_script"])
+    tables_index = _tables_index(flux_list)
 
     domaines = sorted({f["domaine"] for f in flux_list})
 
-    return {
+    index = {
         "domaines": domaines,
         "flux":     flux_list,
         "tables":   tables_index,
     }
+    return index, socle_map
+
+
+def _build_index(
+    root: Path,
+    incremental: bool,
+    workers: int,
+    scan: WorkspaceScan | None = None,
+) -> dict[str, Any]:
+    """Build complet ou incrémental de l'index dict."""
+    if not root.exists():
+        return {"domaines": [], "flux": [], "tables": {}}
+
+    # Un seul parcours du workspace, partagé par le manifest et le build complet
+    if scan is None:
+        scan = scan_workspace(root)
+    if not incremental:
+        return _full_build(root, workers, scan)[0]
+
+    stats = _stat_files(root, scan)
+    cached = _load_cache(root)
+    if cached is None:
+        index, socle_map = _full_build(root, workers, scan)
+        _save_cache(root, index, _build_manifest(root, stats), socle_map)
+        return index
+
+    index, old_files, old_socle_map = cached
+    files, changed, deleted = _diff_manifest(root, old_files, stats)
+    if changed or deleted:
+        added = changed - set(old_files)
+        socle_map = _update_index(root, index, old_socle_map, changed, deleted, added, workers)
+        _save_cache(root, index, files, socle_map)
+    elif files != old_files:
+        _save_cache(root, index, files, old_socle_map)  # mtimes rafraîchies
+    return index
+
+
+# ── Public API ────────────────────────────────────────────────────────────────
+def build_index(
+    workspace: Path | None = None,
+    incremental: bool = False,
+    workers: int | None = None,
+    compact: bool = False,
+    snapshot: bool | None = None,
+) -> dict[str, Any]:
+    """Construit l'index complet des flux depuis le workspace.
+
+    Args:
+        workspace:   racine du workspace (défaut : WORKSPACE_ROOT), résolue :
+                     les chemins de l'index sont absolus.
+        incremental: réutilise l'index sérialisé dans INDEX_CACHE_DIR et ne
+                     re-parse que les fichiers ajoutés, modifiés ou supprimés
+                     depuis le build précédent.
+        workers:     nombre de processus de parsing (défaut : INDEX_WORKERS,
+                     0 = tous les cœurs, 1 = séquentiel).
+        compact:     retourne un `CompactIndex` (colonnes, chaînes internées,
+                     identifiants de tables entiers) au lieu de dicts.
+        snapshot:    recharge le snapshot binaire s'il est à jour, sinon
+                     reconstruit et l'écrit (défaut : INDEX_SNAPSHOT). Le type
+                     retourné ne dépend que de `compact` : sans lui, le
+                     snapshot rechargé est matérialisé en dicts.
+
+    Returns a dict with keys: domaines, flux, tables.
+    """
+    root = (workspace or WORKSPACE_ROOT).resolve()
+    if snapshot is None:
+        snapshot = INDEX_SNAPSHOT
+    if not snapshot or not root.exists():
+        index = _build_index(root, incremental, _resolve_workers(workers))
+        return CompactIndex.from_index(index, root) if compact else index
+
+    path = _cache_dir(root) / "index.snap"
+    loaded = load_snapshot(path, root, _CACHE_VERSION)
+    if loaded is not None:
+        return loaded if compact else loaded.to_dict()
+
+    # Stats relevées avant le parsing : un fichier modifié pendant le build
+    # invalide le snapshot au lieu d'y être figé.
+    scan = scan_workspace(root)
+    stats = scan.stat_files()
+    index = _build_index(root, incremental, _resolve_workers(workers), scan)
+    compact_index = CompactIndex.from_index(index, root)
+    try:
+        save_snapshot(path, compact_index, stats, scan.dirs, _CACHE_VERSION)
+    except OSError:
+        pass  # le snapshot est une optimisation : un échec d'écriture n'est pas bloquant
+    return compact_index if compact else index
+
+
+def refresh_metadata(index: dict[str, Any]) -> int:
+    """Rafraîchit id_script et description de chaque flux depuis l'en-tête de son YAML.
+
+    Ne relit que les premières lignes de chaque fichier (`read_yaml_header`) :
+    les jobs et les SQL ne sont pas re-parsés. L'index inverse `tables`
+    suit les renommages d'id_script.
+
+    Returns:
+        Le nombre de flux modifiés.
+    """
+    updated = 0
+    renamed = False
+    for flux in index["flux"]:
+        header = read_yaml_header(Path(flux["yaml_path"]))
+        if header["id_script"] == flux["id_script"] and header["description"] == flux["description"]:
+            continue
+        if header["id_script"] != flux["id_script"]:
+            flux["id_script"] = header["id_script"]
+            renamed = True
+        flux["description"] = header["description"]
+        updated += 1
+    if renamed:
+        index["tables"] = _tables_index(index["flux"])
+    return updated
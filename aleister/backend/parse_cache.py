@@ -0,0 +1,204 @@
+"""Aleister — Cache de parsing adressé par contenu.
+
+Les workspaces sont très templatés : les mêmes YAML et SQL se répètent
+d'un domaine à l'autre, et un changement de branche ramène des fichiers
+déjà vus. Le résultat du parsing d'un fichier (métadonnées d'un YAML,
+références d'un SQL, tables d'un script socle) est donc mis en cache
+sous le hash de son contenu : un contenu déjà parsé, où qu'il se trouve,
+ne l'est plus jamais.
+
+Le hash est l'identifiant d'objet git du contenu (`blob_hash`) : l'index
+d'une révision (`git_revision`) interroge le même cache avec les hash de
+l'arbre, sans lire les blobs déjà connus.
+
+Stockage : une base SQLite (WAL) unique dans INDEX_CACHE_DIR, partagée
+par tous les workspaces et tous les processus de parsing.
+
+  entries(key, value, size, last_used) — key = "<kind>:<hash>[:<qualifiant>]",
+                                          value = résultat picklé
+
+Éviction LRU : chaque lecture rafraîchit `last_used` ; quand le volume
+des valeurs dépasse PARSE_CACHE_MB, les entrées les moins récemment
+utilisées sont supprimées jusqu'à 90 % du plafond. Lectures et écritures
+sont regroupées : `flush()` les écrit en une transaction (à la fin de
+chaque lot de parsing).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from aleister.config import INDEX_CACHE_DIR, PARSE_CACHE_MB
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS entries (
+    key       TEXT PRIMARY KEY,
+    value     BLOB NOT NULL,
+    size      INTEGER NOT NULL,
+    last_used INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_last_used ON entries(last_used);
+"""
+
+# Fraction du plafond conservée après une éviction (évite d'évincer à chaque flush)
+_EVICT_TARGET = 0.9
+
+
+def blob_hash(data: bytes) -> str:
+    """Identifiant d'objet git (SHA-1 de « blob <taille>\\0<contenu> »)."""
+    digest = hashlib.sha1(b"blob %d\0" % len(data))
+    digest.update(data)
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """Cache clé → résultat de parsing, persisté dans SQLite avec éviction LRU.
+
+    Une connexion est ouverte par thread ; les écritures en attente sont
+    partagées et protégées par un verrou.
+    """
+
+    def __init__(self, db_path: Path, max_bytes: int, version: int):
+        self.db_path = Path(db_path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pending: dict[str, bytes] = {}
+        self._touched: set[str] = set()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._conn()
+        with conn:
+            conn.executescript(_SCHEMA)
+            row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+            if row is None or row[0] != str(version):
+                # Format des résultats changé : on repart d'un cache vide
+                conn.execute("DELETE FROM entries")
+                conn.execute(
+                    "INSERT OR REPLACE INTO meta(key, value) VALUES ('version', ?)", (str(version),)
+                )
+
+    # ── Connexion ─────────────────────────────────────────────────────────────
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def close(self) -> None:
+        self.flush()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # ── Accès ─────────────────────────────────────────────────────────────────
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            raw = self._pending.get(key)
+        if raw is None:
+            try:
+                row = self._conn().execute(
+                    "SELECT value FROM entries WHERE key = ?", (key,)
+                ).fetchone()
+            except sqlite3.Error:
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            raw = row[0]
+            with self._lock:
+                self._touched.add(key)
+        self.hits += 1
+        return pickle.loads(raw)
+
+    def put(self, key: str, value: Any) -> None:
+        raw = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._pending[key] = raw
+
+    def flush(self) -> None:
+        """Écrit les entrées nouvelles et les dates d'accès, puis évince si besoin."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            touched, self._touched = self._touched, set()
+        if not pending and not touched:
+            return
+        now = time.time_ns()
+        conn = self._conn()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO entries(key, value, size, last_used) VALUES (?, ?, ?, ?)",
+                    [(key, raw, len(raw), now) for key, raw in pending.items()],
+                )
+                conn.executemany(
+                    "UPDATE entries SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in touched - pending.keys()],
+                )
+                if pending:
+                    self._evict(conn)
+        except sqlite3.Error:
+            pass  # le cache est une optimisation : un échec d'écriture n'est pas bloquant
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - int(self.max_bytes * _EVICT_TARGET)
+        victims: list[tuple[str]] = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY last_used"):
+            victims.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+
+    def info(self) -> dict[str, int]:
+        """{"entries", "bytes", "hits", "misses"} (hits / misses : ce processus)."""
+        self.flush()
+        entries, size = self._conn().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+        return {"entries": entries, "bytes": size, "hits": self.hits, "misses": self.misses}
+
+
+# ── Cache du processus ────────────────────────────────────────────────────────
+_CACHE: ParseCache | None = None
+_CACHE_PID = 0
+_CACHE_LOCK = threading.Lock()
+
+
+def get_parse_cache(version: int) -> ParseCache | None:
+    """Cache partagé par le processus (None si PARSE_CACHE_MB = 0 ou base inaccessible).
+
+    Un processus fils (workers de parsing) ouvre ses propres connexions.
+    """
+    global _CACHE, _CACHE_PID
+    if PARSE_CACHE_MB <= 0:
+        return None
+    with _CACHE_LOCK:
+        if _CACHE is None or _CACHE_PID != os.getpid():
+            try:
+                _CACHE = ParseCache(
+                    INDEX_CACHE_DIR / "parse_cache.sqlite", PARSE_CACHE_MB * 1024 * 1024, version
+                )
+            except (OSError, sqlite3.Error):
+                return None
+            _CACHE_PID = os.getpid()
+        return _CACHE
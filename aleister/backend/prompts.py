@@ -123,6 +123,12 @@ def construire_user_prompt(contexte: dict) -> str:
             nullable = "" if col.get("nullable", True) else " NOT NULL"
             lignes.append(f"  - {col['nom']} ({col['type']}{nullable})")
 
+    for table, colonnes in (contexte.get("schemas_existants") or {}).items():
+        lignes.append(f"\nSchéma existant de {table} ({len(colonnes)} colonnes, à respecter) :")
+        for col in colonnes:
+            nullable = "" if col.get("nullable", True) else " NOT NULL"
+            lignes.append(f"  - {col['nom']} ({col['type']}{nullable})")
+
     if contexte.get("rep_in"):
         lignes.append(f"- Répertoire entrée : {contexte['rep_in']}")
     if contexte.get("rep_work"):
@@ -0,0 +1,427 @@
+"""Aleister — Catalogue des schémas de tables.
+
+Les scripts d'installation `*_installation_creation_table_*.gql|.dql`
+(tables staging, SOCLE, agrégats) déclarent les colonnes de chaque table.
+`SchemaCatalog` les rassemble : table → colonnes → type, avec le type
+logique et l'équivalent sur l'autre plateforme (doc JobMaster §10.4) :
+
+  Texte       STRING      VARCHAR(n)
+  Entier      INT64       INTEGER / BIGINT
+  Décimal     NUMERIC     DECIMAL(p,s)
+  Flottant    FLOAT64     FLOAT
+  Date        DATE        DATE
+  Horodatage  TIMESTAMP   TIMESTAMP
+  Booléen     BOOL        BYTEINT (0/1)
+  Binaire     BYTES       BYTE(n) / VARBYTE(n)
+
+plus Heure (TIME sur les deux plateformes), absente du tableau mais
+utilisée par les tables CDR.
+
+Le catalogue est persisté dans INDEX_CACHE_DIR (`schemas.pkl`) avec
+(taille, mtime) de chaque script : une mise à jour ne relit que les
+scripts modifiés, et leur parsing passe par le cache de parsing (un
+contenu déjà vu n'est pas re-parsé). Chaque écriture de l'`IndexStore`
+(refresh, deltas du watcher) le met à jour avec l'index ;
+`get_schema_catalog()` en donne une instance par processus, interrogée
+en O(1) par les pages et le générateur.
+
+    catalog = get_schema_catalog()
+    catalog.lookup("£BQ_SOCLE.clients")["columns"]
+    catalog.columns("BQ_SOCLE.clients", platform="TD")   # types convertis
+"""
+
+from __future__ import annotations
+
+import os
+import pickle
+import re
+import threading
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any, Iterator
+
+from aleister.config import WORKSPACE_ROOT
+from aleister.backend.knowledge_base import _CACHE_VERSION, _cache_dir, _decode_text, _parse_cached
+from aleister.backend.parse_cache import get_parse_cache
+from aleister.backend.workspace_scan import WorkspaceScan
+
+_SCRIPT_MARKER = "_installation_creation_table_"
+_SQL_SUFFIXES = (".gql", ".dql")
+
+# ── Types (doc §10.4) ─────────────────────────────────────────────────────────
+LOGICAL_TYPES = (
+    "Texte", "Entier", "Décimal", "Flottant", "Date", "Horodatage", "Heure", "Booléen", "Binaire",
+)
+
+# Type de base (sans paramètres) → type logique, par plateforme
+_LOGICAL = {
+    "BQ": {
+        "STRING": "Texte",
+        "INT64": "Entier", "INT": "Entier", "INTEGER": "Entier", "SMALLINT": "Entier",
+        "BIGINT": "Entier", "TINYINT": "Entier", "BYTEINT": "Entier",
+        "NUMERIC": "Décimal", "DECIMAL": "Décimal", "BIGNUMERIC": "Décimal", "BIGDECIMAL": "Décimal",
+        "FLOAT64": "Flottant",
+        "DATE": "Date",
+        "TIMESTAMP": "Horodatage", "DATETIME": "Horodatage", "TIME": "Heure",
+        "BOOL": "Booléen", "BOOLEAN": "Booléen",
+        "BYTES": "Binaire",
+    },
+    "TD": {
+        "VARCHAR": "Texte", "CHAR": "Texte", "CHARACTER": "Texte", "CLOB": "Texte",
+        "CHARACTER VARYING": "Texte", "LONG VARCHAR": "Texte",
+        "INTEGER": "Entier", "INT": "Entier", "BIGINT": "Entier", "SMALLINT": "Entier",
+        "DECIMAL": "Décimal", "NUMERIC": "Décimal", "NUMBER": "Décimal",
+        "FLOAT": "Flottant", "REAL": "Flottant", "DOUBLE PRECISION": "Flottant",
+        "DATE": "Date",
+        "TIMESTAMP": "Horodatage", "TIME": "Heure",
+        "BYTEINT": "Booléen",
+        "BYTE": "Binaire", "VARBYTE": "Binaire", "BLOB": "Binaire",
+    },
+}
+
+# Type logique → type cible ; "{}" reçoit les paramètres du type source s'il en a
+_TARGET = {
+    "BQ": {
+        "Texte": "STRING", "Entier": "INT64", "Décimal": "NUMERIC", "Flottant": "FLOAT64",
+        "Date": "DATE", "Horodatage": "TIMESTAMP", "Heure": "TIME", "Booléen": "BOOL", "Binaire": "BYTES",
+    },
+    "TD": {
+        "Texte": "VARCHAR({})", "Entier": "BIGINT", "Décimal": "DECIMAL({})", "Flottant": "FLOAT",
+        "Date": "DATE", "Horodatage": "TIMESTAMP", "Heure": "TIME", "Booléen": "BYTEINT", "Binaire": "VARBYTE({})",
+    },
+}
+
+# Paramètres par défaut des types TD paramétrés (source sans paramètres)
+_TD_DEFAULT_ARGS = {"Texte": "255", "Décimal": "38,9", "Binaire": "64000"}
+
+_TYPE_RE = re.compile(r"\s*([A-Za-z]\w*(?:\s+(?:PRECISION|VARYING))?)\s*(?:\((.*?)\))?", re.I)
+
+
+def _split_type(sql_type: str) -> tuple[str, str]:
+    """("DECIMAL", "15,2") pour « DECIMAL(15, 2) »."""
+    m = _TYPE_RE.match(sql_type)
+    if m is None:
+        return sql_type.strip().upper(), ""
+    base = " ".join(m.group(1).upper().split())
+    if base == "LONG" and sql_type.upper().split()[1:2] == ["VARCHAR"]:
+        base = "LONG VARCHAR"
+    return base, (m.group(2) or "").replace(" ", "")
+
+
+def logical_type(sql_type: str, platform: str) -> str | None:
+    """Type logique (§10.4) d'un type SQL de la plateforme, ou None s'il est inconnu."""
+    return _LOGICAL.get(platform, {}).get(_split_type(sql_type)[0])
+
+
+def convert_type(sql_type: str, source: str, target: str) -> str:
+    """Équivalent sur `target` d'un type de `source` (§10.4).
+
+    Un type inconnu, ou une conversion vers la même plateforme, est
+    retourné tel quel. Les paramètres (longueur, précision) sont conservés
+    vers TD ; vers BQ, les types de base suffisent.
+    """
+    if source == target:
+        return sql_type
+    logical = logical_type(sql_type, source)
+    if logical is None or target not in _TARGET:
+        return sql_type
+    pattern = _TARGET[target][logical]
+    if "{}" not in pattern:
+        if logical == "Entier" and target == "TD" and _split_type(sql_type)[0] in ("INTEGER", "INT"):
+            return "INTEGER"
+        return pattern
+    args = _split_type(sql_type)[1]
+    if logical == "Décimal" and args.count(",") == 0 and args:
+        args += ",0"
+    return pattern.format(args or _TD_DEFAULT_ARGS[logical])
+
+
+# ── Parsing des scripts ───────────────────────────────────────────────────────
+_COMMENT_RE = re.compile(r"--[^\n]*|/\*.*?(?:\*/|\Z)", re.S)
+_CREATE_RE = re.compile(
+    r"\bCREATE\s+(?:OR\s+REPLACE\s+)?"
+    r"(?:(?:MULTISET|SET|VOLATILE|GLOBAL|TEMPORARY|TEMP|EXTERNAL|FOREIGN)\s+)*"
+    r"TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?"
+    r"£(BQ|TD)_(SOCLE|HISTO|TMP|VUES|SOURCE)\.(\w+)\s*(?:,[^(;]*)?\(",
+    re.I,
+)
+
+# Premier mot d'une ligne qui complète la colonne précédente
+_CONTINUATION = {
+    "NOT", "NULL", "DEFAULT", "COMPRESS", "FORMAT", "TITLE", "OPTIONS", "CHARACTER",
+    "CASESPECIFIC", "UPPERCASE", "COLLATE", "WITH", "GENERATED",
+}
+
+# Premier mot d'une contrainte de table (pas une colonne)
+_CONSTRAINTS = {"PRIMARY", "UNIQUE", "CONSTRAINT", "FOREIGN", "CHECK", "INDEX", "KEY", "PERIOD"}
+
+
+def _body(text: str, start: int) -> str | None:
+    """Contenu des parenthèses ouvertes juste avant `start`, ou None si non fermées."""
+    depth = 1
+    quote = ""
+    for i in range(start, len(text)):
+        char = text[i]
+        if quote:
+            if char == quote:
+                quote = ""
+        elif char in "'\"`":
+            quote = char
+        elif char in "(<":
+            depth += char == "("
+        elif char == ")":
+            depth -= 1
+            if depth == 0:
+                return text[start:i]
+    return None
+
+
+def _definitions(body: str) -> list[str]:
+    """Définitions séparées par les virgules de premier niveau ; une ligne
+    sans virgule finale (script mal formé) est aussi une définition."""
+    parts: list[str] = []
+    current: list[str] = []
+    depth = 0
+    for char in body:
+        if char in "(<":
+            depth += 1
+        elif char in ")>":
+            depth -= 1
+        if depth == 0 and char in ",\n":
+            parts.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    parts.append("".join(current))
+
+    merged: list[str] = []
+    for part in (p.strip() for p in parts):
+        if not part:
+            continue
+        if merged and part.split(None, 1)[0].upper() in _CONTINUATION:
+            merged[-1] += " " + part
+        else:
+            merged.append(part)
+    return merged
+
+
+def _column(definition: str) -> tuple[str, str, bool] | None:
+    """(nom, type, nullable) d'une définition de colonne, None pour une contrainte."""
+    name, _, rest = definition.partition(" ")
+    if not rest or name.upper() in _CONSTRAINTS:
+        return None
+    rest = rest.strip()
+    m = _TYPE_RE.match(rest)
+    if m is None:
+        return None
+    sql_type = m.group(0).strip()
+    if sql_type.upper().split()[0] in _CONTINUATION:
+        return None
+    tail = rest[m.end():]
+    if sql_type.upper().startswith(("ARRAY", "STRUCT")) and tail.startswith("<"):
+        close = tail.find(">")
+        sql_type += tail[:close + 1]
+        tail = tail[close + 1:]
+    constraints = " ".join(tail.upper().split())
+    nullable = "NOT NULL" not in constraints and "PRIMARY KEY" not in constraints
+    return name.strip('"`[]'), " ".join(sql_type.split()), nullable
+
+
+def parse_create_tables(data: Any) -> list[tuple[str, str, str, list[tuple[str, str, bool]]]]:
+    """Tables créées par un script : [(platform, dataset, table, [(colonne, type, nullable)])].
+
+    Une table créée sans liste de colonnes (CREATE TABLE … AS SELECT) est
+    ignorée.
+    """
+    text = _COMMENT_RE.sub(" ", _decode_text(data))
+    tables = []
+    for m in _CREATE_RE.finditer(text):
+        body = _body(text, m.end())
+        if body is None:
+            continue
+        columns = [col for col in map(_column, _definitions(body)) if col is not None]
+        if columns:
+            platform, dataset, table = m.groups()
+            tables.append((platform.upper(), f"{platform.upper()}_{dataset.upper()}", table, columns))
+    return tables
+
+
+# ── Catalogue ─────────────────────────────────────────────────────────────────
+def _is_schema_script(name: str) -> bool:
+    return _SCRIPT_MARKER in name and name.endswith(_SQL_SUFFIXES)
+
+
+def _schema_scripts(root: Path, scan: WorkspaceScan | None = None) -> list[Path]:
+    """Scripts de création de tables, triés (depuis `scan` s'il est fourni)."""
+    if scan is not None:
+        return sorted(p for p in scan.installation if _is_schema_script(p.name))
+    found: list[Path] = []
+    for installation in root.glob("*/*/installation"):
+        for dirpath, _, filenames in os.walk(installation):
+            found += [Path(dirpath) / name for name in filenames if _is_schema_script(name)]
+    return sorted(found)
+
+
+class SchemaCatalog(Mapping):
+    """Catalogue « BQ_SOCLE.clients » → schéma, mis à jour incrémentalement.
+
+    Chaque schéma : {"key", "platform", "dataset", "table", "domaine", "source",
+    "columns": [{"nom", "type", "nullable", "logique"}, ...]}. Une table
+    déclarée par plusieurs scripts garde la première déclaration (ordre des
+    chemins).
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        # Script relatif → (taille, mtime_ns, tables parsées)
+        self._files: dict[str, tuple[int, int, list]] = {}
+        self._tables: dict[str, dict] = {}
+        self._by_name: dict[str, list[str]] = {}
+
+    # ── Protocole Mapping ─────────────────────────────────────────────────────
+    def __getitem__(self, key: str) -> dict:
+        return self._tables[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._tables)
+
+    def __len__(self) -> int:
+        return len(self._tables)
+
+    # ── Mise à jour ───────────────────────────────────────────────────────────
+    def update(self, scan: WorkspaceScan | None = None) -> bool:
+        """Relit les scripts ajoutés ou modifiés depuis la dernière mise à jour.
+
+        Retourne True si le catalogue a changé.
+        """
+        files: dict[str, tuple[int, int, list]] = {}
+        changed = False
+        for path in _schema_scripts(self.root, scan):
+            rel = path.relative_to(self.root).as_posix()
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            known = self._files.get(rel)
+            if known is not None and known[:2] == (st.st_size, st.st_mtime_ns):
+                files[rel] = known
+                continue
+            try:
+                tables = _parse_cached(path, "schema", parse_create_tables)
+            except OSError:
+                continue
+            files[rel] = (st.st_size, st.st_mtime_ns, tables)
+            changed = True
+        if changed:
+            cache = get_parse_cache(_CACHE_VERSION)
+            if cache is not None:
+                cache.flush()
+        changed = changed or files.keys() != self._files.keys()
+        self._files = files
+        if changed or not self._tables:
+            self._reindex()
+        return changed
+
+    def _reindex(self) -> None:
+        tables: dict[str, dict] = {}
+        for rel, (_, _, parsed) in self._files.items():
+            for platform, dataset, table, columns in parsed:
+                key = f"{dataset}.{table}"
+                if key in tables:
+                    continue
+                tables[key] = {
+                    "key":      key,
+                    "platform": platform,
+                    "dataset":  dataset,
+                    "table":    table,
+                    "domaine":  rel.split("/", 1)[0],
+                    "source":   rel,
+                    "columns":  [
+                        {"nom": name, "type": sql_type, "nullable": nullable,
+                         "logique": logical_type(sql_type, platform)}
+                        for name, sql_type, nullable in columns
+                    ],
+                }
+        by_name: dict[str, list[str]] = {}
+        for key, schema in tables.items():
+            by_name.setdefault(schema["table"].lower(), []).append(key)
+        self._tables = tables
+        self._by_name = by_name
+
+    # ── Persistance ───────────────────────────────────────────────────────────
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as fh:
+            pickle.dump(
+                {"version": _CACHE_VERSION, "root": str(self.root), "files": self._files},
+                fh, protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path, root: Path) -> "SchemaCatalog":
+        """Catalogue persisté (vide s'il est absent, illisible ou d'une autre version)."""
+        catalog = cls(root)
+        try:
+            with open(path, "rb") as fh:
+                state = pickle.load(fh)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            return catalog
+        if isinstance(state, dict) and state.get("version") == _CACHE_VERSION \
+                and state.get("root") == str(root):
+            catalog._files = state["files"]
+            catalog._reindex()
+        return catalog
+
+    # ── Requêtes ──────────────────────────────────────────────────────────────
+    def lookup(self, name: str) -> dict | None:
+        """Schéma d'une table : « £BQ_SOCLE.clients », « BQ_SOCLE.clients » ou
+        « clients » (le nom seul doit désigner une table unique)."""
+        key = name.strip().lstrip("£")
+        if "." in key:
+            return self._tables.get(key)
+        keys = self._by_name.get(key.lower(), [])
+        return self._tables[keys[0]] if len(keys) == 1 else None
+
+    def columns(self, name: str, platform: str | None = None) -> list[dict]:
+        """Colonnes d'une table ({"nom", "type", "nullable"}, format du
+        générateur), types convertis vers `platform` si fourni."""
+        schema = self.lookup(name)
+        if schema is None:
+            return []
+        target = platform or schema["platform"]
+        return [
+            {"nom": col["nom"], "type": convert_type(col["type"], schema["platform"], target),
+             "nullable": col["nullable"]}
+            for col in schema["columns"]
+        ]
+
+
+# ── Public API ────────────────────────────────────────────────────────────────
+_CATALOGS: dict[str, SchemaCatalog] = {}
+_CATALOGS_LOCK = threading.Lock()
+
+
+def update_schema_catalog(
+    workspace: Path | None = None,
+    scan: WorkspaceScan | None = None,
+) -> SchemaCatalog:
+    """Met à jour (incrémentalement) et persiste le catalogue d'un workspace."""
+    root = (workspace or WORKSPACE_ROOT).resolve()
+    with _CATALOGS_LOCK:
+        catalog = _CATALOGS.get(str(root))
+        path = _cache_dir(root) / "schemas.pkl"
+        if catalog is None:
+            catalog = _CATALOGS[str(root)] = SchemaCatalog.load(path, root)
+        if catalog.update(scan):
+            try:
+                catalog.save(path)
+            except OSError:
+                pass  # le catalogue reste utilisable en mémoire
+        return catalog
+
+
+def get_schema_catalog(workspace: Path | None = None) -> SchemaCatalog:
+    """Catalogue à jour du workspace (un stat par script de création)."""
+    return update_schema_catalog(workspace)
@@ -0,0 +1,233 @@
+"""Aleister — Index plein texte (SQLite FTS5).
+
+Index inversé des documents du workspace, stocké dans la base du store :
+
+  - un document « flux » par YAML : id_script, description, texte du YAML
+    (paramètres des jobs) et texte des SQL cités par ses Requete ;
+  - un document « cdc » par fichier Markdown sous DOCS_ROOT.
+
+Les résultats sont classés par BM25 (colonnes pondérées : titre >
+description > paramètres > SQL / corps). Chaque terme de la requête est
+cherché en préfixe (`upsert sftp` → `"upsert"* "sftp"*`, tous requis).
+
+Les identifiants sont découpés avant indexation (`Clients_Import_RapatriementSFTP`
+→ « Clients Import Rapatriement SFTP ») : un mot d'un camelCase est
+trouvable seul.
+
+Mise à jour incrémentale : chaque document porte une signature (taille et
+mtime de ses fichiers) ; à chaque écriture du store, seuls les documents
+nouveaux ou modifiés sont relus et réindexés, les disparus supprimés. Un
+delta du watcher ne compare que les documents des flux qu'il touche.
+
+Si SQLite a été compilé sans FTS5, `available()` retourne False et le
+store retombe sur la recherche sous-chaîne.
+"""
+
+from __future__ import annotations
+
+import re
+import sqlite3
+from pathlib import Path
+from typing import Any, Iterable
+
+# Score BM25, colonnes pondérées dans l'ordre du schéma de search_fts
+BM25 = "bm25(search_fts, 10.0, 5.0, 2.0, 1.0, 1.0)"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_docs (
+    id        INTEGER PRIMARY KEY,
+    path      TEXT NOT NULL UNIQUE,
+    kind      TEXT NOT NULL,
+    title     TEXT NOT NULL,
+    signature TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS search_docs_kind ON search_docs(kind);
+CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(
+    title, description, params, sql, body,
+    tokenize = "unicode61 remove_diacritics 2",
+    prefix = '2 3'
+);
+"""
+
+TABLES = ("search_fts", "search_docs")
+
+# Frontières de mots dans un identifiant : aB, a1 → a B ; ABc → A Bc
+_CAMEL_RE = re.compile(r"(?<=[a-z0-9])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])")
+_TERM_RE = re.compile(r"\w+")
+
+
+def available(conn: sqlite3.Connection) -> bool:
+    """True si le module FTS5 est disponible dans ce SQLite."""
+    try:
+        conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS temp._fts5_probe USING fts5(x)")
+        conn.execute("DROP TABLE temp._fts5_probe")
+    except sqlite3.OperationalError:
+        return False
+    return True
+
+
+def split_words(text: str) -> str:
+    """Découpe les identifiants (camelCase, snake_case) pour l'indexation."""
+    return _CAMEL_RE.sub(" ", text).replace("_", " ")
+
+
+def match_query(query: str) -> str | None:
+    """Texte saisi → requête FTS5 (termes en préfixe, tous requis), ou None si vide."""
+    terms = _TERM_RE.findall(split_words(query).lower())
+    if not terms:
+        return None
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+# ── Documents ─────────────────────────────────────────────────────────────────
+def _signature(paths: list[Path]) -> str | None:
+    parts: list[str] = []
+    for path in paths:
+        try:
+            st = path.stat()
+        except OSError:
+            if not parts:
+                return None  # fichier principal disparu
+            continue
+        parts.append(f"{st.st_size}:{st.st_mtime_ns}")
+    return "|".join(parts)
+
+
+def _read(path: Path) -> str:
+    try:
+        return path.read_text(encoding="utf-8", errors="ignore")
+    except OSError:
+        return ""
+
+
+def flux_documents(flux_list: Iterable[dict]) -> dict[str, dict]:
+    """Documents des flux : {yaml_path : {kind, title, signature, …}} (stat uniquement)."""
+    docs: dict[str, dict] = {}
+    for flux in flux_list:
+        yaml_path = Path(flux["yaml_path"])
+        sql_paths = [Path(p) for p in flux["sql_files"]]
+        signature = _signature([yaml_path, *sql_paths])
+        if signature is None:
+            continue
+        docs[str(yaml_path)] = {
+            "kind":        "flux",
+            "title":       flux["id_script"],
+            "description": flux["description"] or "",
+            "signature":   f"{flux['id_script']}|{signature}",
+            "files":       sql_paths,
+        }
+    return docs
+
+
+def collect_documents(index: dict[str, Any], docs_root: Path | None) -> dict[str, dict]:
+    """Documents à indexer : {chemin : {kind, title, signature, …}} (stat uniquement)."""
+    docs = flux_documents(index["flux"])
+    if docs_root is not None and docs_root.exists():
+        for md_path in sorted(docs_root.rglob("*.md")):
+            signature = _signature([md_path])
+            if signature is not None:
+                docs[str(md_path)] = {
+                    "kind":      "cdc",
+                    "title":     md_path.stem,
+                    "signature": signature,
+                }
+    return docs
+
+
+def _fts_row(path: str, doc: dict) -> tuple[str, str, str, str, str]:
+    if doc["kind"] == "flux":
+        yaml_text = _read(Path(path))
+        sql_text = "\n".join(_read(p) for p in doc["files"])
+        return (
+            split_words(doc["title"]), doc["description"],
+            split_words(yaml_text), split_words(sql_text), "",
+        )
+    body = _read(Path(path))
+    return split_words(doc["title"]), "", "", "", split_words(body)
+
+
+def sync_documents(
+    conn: sqlite3.Connection,
+    docs: dict[str, dict],
+    paths: Iterable[str] | None = None,
+) -> tuple[int, int]:
+    """Aligne l'index FTS sur `docs` (dans la transaction courante).
+
+    `paths` restreint l'alignement à ces documents (delta) : les autres
+    documents indexés ne sont ni comparés ni supprimés.
+
+    Returns:
+        (documents réindexés, documents supprimés)
+    """
+    if paths is None:
+        rows = conn.execute("SELECT path, id, signature FROM search_docs").fetchall()
+    else:
+        wanted = list(paths)
+        rows = []
+        for start in range(0, len(wanted), 900):
+            chunk = wanted[start:start + 900]
+            rows += conn.execute(
+                f"SELECT path, id, signature FROM search_docs WHERE path IN ({','.join('?' * len(chunk))})",
+                chunk,
+            ).fetchall()
+    existing = {r[0]: (r[1], r[2]) for r in rows}
+    stale = [
+        doc_id for path, (doc_id, signature) in existing.items()
+        if path not in docs or docs[path]["signature"] != signature
+    ]
+    for start in range(0, len(stale), 900):
+        chunk = stale[start:start + 900]
+        placeholders = ",".join("?" * len(chunk))
+        conn.execute(f"DELETE FROM search_fts WHERE rowid IN ({placeholders})", chunk)
+        conn.execute(f"DELETE FROM search_docs WHERE id IN ({placeholders})", chunk)
+
+    fresh = [
+        path for path, doc in docs.items()
+        if path not in existing or existing[path][1] != doc["signature"]
+    ]
+    for path in fresh:
+        doc = docs[path]
+        cur = conn.execute(
+            "INSERT INTO search_docs(path, kind, title, signature) VALUES (?, ?, ?, ?)",
+            (path, doc["kind"], doc["title"], doc["signature"]),
+        )
+        conn.execute(
+            "INSERT INTO search_fts(rowid, title, description, params, sql, body) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (cur.lastrowid, *_fts_row(path, doc)),
+        )
+    return len(fresh), len(existing.keys() - docs.keys())
+
+
+# ── Recherche ─────────────────────────────────────────────────────────────────
+def search(
+    conn: sqlite3.Connection,
+    query: str,
+    kind: str | None = None,
+    limit: int | None = 50,
+) -> list[dict]:
+    """Documents correspondant à `query`, du plus au moins pertinent.
+
+    Returns:
+        [{"kind", "path", "title", "score", "snippet"}, ...] — score BM25
+        (plus petit = plus pertinent, convention SQLite).
+    """
+    match = match_query(query)
+    if match is None:
+        return []
+    sql = f"""
+        SELECT d.kind, d.path, d.title, {BM25} AS score,
+               snippet(search_fts, -1, '**', '**', '…', 12) AS snippet
+        FROM search_fts JOIN search_docs d ON d.id = search_fts.rowid
+        WHERE search_fts MATCH ?
+    """
+    params: list[Any] = [match]
+    if kind:
+        sql += " AND d.kind = ?"
+        params.append(kind)
+    sql += " ORDER BY score"
+    if limit:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return [dict(r) for r in conn.execute(sql, params)]
+
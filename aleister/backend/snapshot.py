@@ -0,0 +1,285 @@
+"""Aleister — Snapshot binaire de l'index.
+
+Un snapshot est l'image d'un `CompactIndex` dans un seul fichier, chargé
+par projection mémoire (mmap) : les colonnes numériques sont lues en
+place (memoryview, sans copie ni désérialisation) et les colonnes de
+chaînes décodées à la demande. Plusieurs processus qui chargent le même
+snapshot partagent ses pages via le cache du système.
+
+Format (version `FORMAT_VERSION`) :
+
+  en-tête (48 octets) : magic "ALEISNAP", version du format, longueur des
+                        métadonnées, longueur des données, SHA-1 des deux ;
+  métadonnées (JSON)  : version du schéma de l'index, boutisme, racine,
+                        empreinte du workspace et fichiers/répertoires
+                        qu'elle couvre, vocabulaires, catalogue des tables,
+                        position de chaque section ;
+  données             : sections alignées sur 8 octets — colonnes 'B'/'H'/'I'
+                        brutes, chaînes en blob UTF-8 + offsets, index inverse
+                        table → flux en CSR (offsets, positions, masques).
+
+L'empreinte du workspace couvre (taille, mtime) de chaque fichier indexé
+et le mtime de chaque répertoire : un fichier modifié, ajouté, supprimé
+ou renommé l'invalide. Sa vérification ne coûte qu'un stat par entrée.
+
+Tout snapshot illisible, corrompu, d'une autre version ou périmé est
+ignoré (`load_snapshot` retourne None) : l'appelant reconstruit l'index.
+`read_snapshot` charge un snapshot sans le confronter au workspace (pour
+comparer des index archivés, voir `index_diff`).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Any
+
+from aleister.backend.compact import CompactIndex, StringColumn, _Vocab
+
+FORMAT_VERSION = 2
+
+_MAGIC = b"ALEISNAP"
+_HEADER = struct.Struct("<8sHHIQ20s4x")  # magic, version, réservé, méta, données, SHA-1
+_ALIGN = 8
+
+# Colonnes numériques du CompactIndex (typecode du tableau)
+_ARRAYS = {
+    "_domaine_col": "H", "_type_col": "B", "_platform_col": "B",
+    "_sql_offsets": "I", "_ref_tables": "I", "_ref_owners": "H",
+    "_ref_roles": "B", "_ref_offsets": "I", "_transverse": "B",
+    "_job_offsets": "I", "_job_id_col": "H", "_param_offsets": "I", "_param_name_col": "H",
+}
+_STRINGS = (
+    "_id_scripts", "_descriptions", "_yaml_rel", "_sql_names",
+    "_job_paths", "_job_descriptions", "_param_values",
+)
+_VOCABS = ("_domains", "_types", "_platforms", "_job_vocab", "_param_vocab")
+
+
+# ── Empreinte du workspace ────────────────────────────────────────────────────
+def fingerprint(stats: dict[str, tuple[int, int]], dirs: dict[str, int]) -> str:
+    """Empreinte de {fichier : (taille, mtime_ns)} et {répertoire : mtime_ns}."""
+    digest = hashlib.sha1()
+    for rel in sorted(stats):
+        size, mtime_ns = stats[rel]
+        digest.update(f"f\0{rel}\0{size}\0{mtime_ns}\n".encode("utf-8", "surrogateescape"))
+    for rel in sorted(dirs):
+        digest.update(f"d\0{rel}\0{dirs[rel]}\n".encode("utf-8", "surrogateescape"))
+    return digest.hexdigest()
+
+
+def _current_fingerprint(root: Path, files: list[str], dirs: list[str]) -> str | None:
+    """Empreinte actuelle des entrées listées, ou None si l'une a disparu."""
+    base = os.fspath(root)  # chemins en chaînes : pathlib coûterait plus que les stat
+    stats: dict[str, tuple[int, int]] = {}
+    mtimes: dict[str, int] = {}
+    try:
+        for rel in files:
+            st = os.stat(os.path.join(base, rel))
+            stats[rel] = (st.st_size, st.st_mtime_ns)
+        for rel in dirs:
+            mtimes[rel] = os.stat(os.path.join(base, rel)).st_mtime_ns
+    except OSError:
+        return None
+    return fingerprint(stats, mtimes)
+
+
+# ── Écriture ──────────────────────────────────────────────────────────────────
+def _encode_strings(values) -> tuple[bytes, array]:
+    blob = bytearray()
+    offsets = array("I", [0])
+    for value in values:
+        blob += value.encode("utf-8", "surrogateescape")
+        offsets.append(len(blob))
+    return bytes(blob), offsets
+
+
+def save_snapshot(
+    path: Path,
+    index: CompactIndex,
+    stats: dict[str, tuple[int, int]] | None = None,
+    dirs: dict[str, int] | None = None,
+    schema: int = 0,
+) -> None:
+    """Écrit le snapshot de `index` (écriture atomique : fichier temporaire + rename).
+
+    Args:
+        stats:  {fichier relatif : (taille, mtime_ns)} des fichiers indexés,
+                relevés *avant* le parsing (un fichier modifié pendant le
+                build invalide le snapshot au lieu d'y être figé).
+        dirs:   {répertoire relatif : mtime_ns} du même parcours.
+        schema: version du format de l'index (`_CACHE_VERSION`).
+
+    Sans `stats` ni `dirs`, le snapshot est un export (archivage, CI) :
+    `load_snapshot` ne le recharge jamais, `read_snapshot` le lit.
+    """
+    stats = stats or {}
+    dirs = dirs or {}
+    payload = bytearray()
+    sections: dict[str, list] = {}
+
+    def put(name: str, data, typecode: str) -> None:
+        payload.extend(b"\0" * (-len(payload) % _ALIGN))
+        raw = bytes(data)
+        sections[name] = [len(payload), len(raw), typecode]
+        payload.extend(raw)
+
+    for name, typecode in _ARRAYS.items():
+        put(name, array(typecode, getattr(index, name)), typecode)
+    for name in _STRINGS:
+        blob, offsets = _encode_strings(getattr(index, name))
+        put(f"{name}.blob", blob, "B")
+        put(f"{name}.offsets", offsets, "I")
+
+    # Index inverse table → flux, à plat (CSR)
+    table_offsets = array("I", [0])
+    table_flux = array("I")
+    table_masks = array("B")
+    for positions, masks in zip(index._table_flux, index._table_masks):
+        table_flux.extend(positions)
+        table_masks.extend(masks)
+        table_offsets.append(len(table_flux))
+    put("table_offsets", table_offsets, "I")
+    put("table_flux", table_flux, "I")
+    put("table_masks", table_masks, "B")
+
+    meta = {
+        "schema":      schema,
+        "byteorder":   sys.byteorder,
+        "root":        index.root,
+        "fingerprint": fingerprint(stats, dirs),
+        "files":       sorted(stats),
+        "dirs":        sorted(dirs),
+        "vocabs":      {name: getattr(index, name).names for name in _VOCABS},
+        "tables":      [list(parts) for parts in index.table_parts],
+        "sections":    sections,
+    }
+    meta_raw = json.dumps(meta, ensure_ascii=False).encode("utf-8", "surrogateescape")
+    meta_raw += b" " * (-(_HEADER.size + len(meta_raw)) % _ALIGN)
+    checksum = hashlib.sha1(meta_raw)
+    checksum.update(payload)
+    header = _HEADER.pack(_MAGIC, FORMAT_VERSION, 0, len(meta_raw), len(payload), checksum.digest())
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as fh:
+        fh.write(header)
+        fh.write(meta_raw)
+        fh.write(payload)
+    tmp.replace(path)
+
+
+# ── Lecture ───────────────────────────────────────────────────────────────────
+def _read_meta(buf: mmap.mmap) -> tuple[dict, int, bytes] | None:
+    """(métadonnées, longueur des données, SHA-1 attendu), ou None si en-tête invalide."""
+    if len(buf) < _HEADER.size:
+        return None
+    magic, version, _, meta_len, payload_len, checksum = _HEADER.unpack_from(buf)
+    if magic != _MAGIC or version != FORMAT_VERSION:
+        return None
+    if _HEADER.size + meta_len + payload_len != len(buf):
+        return None  # fichier tronqué
+    meta = json.loads(str(buf[_HEADER.size:_HEADER.size + meta_len], "utf-8", "surrogateescape"))
+    return meta, payload_len, checksum
+
+
+def _open(path: Path) -> tuple[mmap.mmap, dict, int, bytes] | None:
+    """(fichier projeté, métadonnées, longueur des données, SHA-1 attendu), ou None."""
+    try:
+        with open(path, "rb") as fh:
+            buf = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None  # absent ou vide
+    try:
+        header = _read_meta(buf)
+    except (ValueError, struct.error):
+        return None
+    if header is None or not isinstance(header[0], dict) or header[0].get("byteorder") != sys.byteorder:
+        return None
+    return (buf, *header)
+
+
+def _verified_index(buf: mmap.mmap, meta: dict, payload_len: int, checksum: bytes, root: Path):
+    view = memoryview(buf)
+    if hashlib.sha1(view[_HEADER.size:]).digest() != checksum:
+        return None
+    return _columns_index(root, meta, view[len(buf) - payload_len:])
+
+
+def load_snapshot(path: Path, root: Path, schema: int) -> CompactIndex | None:
+    """Charge le snapshot de `root` s'il est à jour, sinon None.
+
+    Contrôles, du moins au plus coûteux : en-tête et version du format,
+    version du schéma, boutisme et racine, empreinte du workspace (un stat
+    par fichier et répertoire), puis somme de contrôle des données.
+    """
+    opened = _open(path)
+    if opened is None:
+        return None
+    buf, meta, payload_len, checksum = opened
+    try:
+        if (
+            meta["schema"] != schema
+            or meta["root"] != str(root)  # les chemins des flux en dépendent
+            or not meta["dirs"]           # snapshot exporté : pas d'empreinte
+        ):
+            return None
+        if _current_fingerprint(root, meta["files"], meta["dirs"]) != meta["fingerprint"]:
+            return None
+        return _verified_index(buf, meta, payload_len, checksum, root)
+    except (ValueError, KeyError, TypeError, IndexError):
+        return None
+
+
+def read_snapshot(path: Path) -> CompactIndex:
+    """Charge un snapshot quelconque (archivé, copié d'un autre poste…) sans
+    vérifier qu'il correspond au workspace courant.
+
+    Raises:
+        ValueError: fichier absent, illisible, corrompu ou d'un autre format.
+    """
+    opened = _open(path)
+    if opened is None:
+        raise ValueError(f"Snapshot illisible : {path}")
+    buf, meta, payload_len, checksum = opened
+    try:
+        index = _verified_index(buf, meta, payload_len, checksum, Path(meta["root"]))
+    except (KeyError, TypeError, IndexError) as exc:
+        raise ValueError(f"Snapshot invalide : {path}") from exc
+    if index is None:
+        raise ValueError(f"Snapshot corrompu (somme de contrôle) : {path}")
+    return index
+
+
+def _columns_index(root: Path, meta: dict, payload: memoryview) -> CompactIndex:
+    sections = meta["sections"]
+
+    def section(name: str) -> memoryview:
+        offset, length, typecode = sections[name]
+        return payload[offset:offset + length].cast(typecode)
+
+    columns: dict[str, Any] = {name: section(name) for name in _ARRAYS}
+    for name in _STRINGS:
+        columns[name] = StringColumn(section(f"{name}.blob"), section(f"{name}.offsets"))
+    for name in _VOCABS:
+        columns[name] = _Vocab(meta["vocabs"][name])
+    columns["table_parts"] = [
+        (sys.intern(platform), sys.intern(dataset), sys.intern(table))
+        for platform, dataset, table in meta["tables"]
+    ]
+    columns["table_keys"] = [
+        sys.intern(f"{dataset}.{table}") for _, dataset, table in columns["table_parts"]
+    ]
+    columns["root"] = str(root)
+
+    offsets = section("table_offsets")
+    flux, masks = section("table_flux"), section("table_masks")
+    table_flux = [flux[offsets[t]:offsets[t + 1]] for t in range(len(offsets) - 1)]
+    table_masks = [masks[offsets[t]:offsets[t + 1]] for t in range(len(offsets) - 1)]
+    return CompactIndex.from_columns(root, columns, table_flux, table_masks)
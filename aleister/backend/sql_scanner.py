@@ -0,0 +1,171 @@
+"""Aleister — Analyse légère des SQL JobMaster.
+
+Tokenizer minimal (sans parser SQL) qui repère les références
+£XX_DATASET.table et leur rôle dans l'instruction :
+
+  - write  : cible d'un INSERT [INTO], MERGE [INTO], UPDATE, ALTER TABLE ;
+  - create : cible d'un CREATE [OR REPLACE] TABLE/VIEW, REPLACE VIEW (TD) ;
+  - delete : cible d'un DELETE [FROM], TRUNCATE TABLE, DROP TABLE ;
+  - read   : toute autre position (FROM, JOIN, USING, sous-requêtes…).
+
+Les commentaires (`--`, `/* */`) et les littéraux de chaîne ('…', "…")
+sont ignorés : une table citée uniquement dans un commentaire n'est pas
+une dépendance.
+
+`scan_sql_refs()` relève aussi les autres références £NOM (ou £NOM.table) :
+variables de script qui désignent une table une fois résolues (voir
+`variables`), avec le rôle de leur position.
+
+Le scan travaille sur des octets : `scan_file()` projette le fichier en
+mémoire (mmap) et seul le nom des tables trouvées est décodé. Un script
+TD de plusieurs dizaines de Mo est analysé sans être chargé ni décodé.
+L'expression principale ne reconnaît que commentaires, littéraux et
+tables (recherche rapide sur leur premier octet) ; le verbe est retrouvé
+en relisant à rebours les quelques octets qui précèdent chaque table.
+
+Les rôles d'une référence sont encodés en masque de bits (`ROLE_BITS`)
+pour un stockage compact ; `roles_of()` / `mask_of()` convertissent.
+"""
+
+from __future__ import annotations
+
+import mmap
+import re
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Iterator
+
+ROLES = ("read", "write", "create", "delete")
+ROLE_BITS = {role: 1 << i for i, role in enumerate(ROLES)}
+ROLE_LABELS = {"read": "lecture", "write": "écriture", "create": "création", "delete": "suppression"}
+
+# Capture £BQ_SOCLE.clients, £TD_HISTO.cdr_voix, etc. Un nom suivi
+# directement d'une £variable (£BQ_TMP.x_£DATE) est complété à l'exécution :
+# ce n'est pas une table de l'index.
+TABLE_PATTERN = r"£(BQ|TD)_(SOCLE|HISTO|TMP|VUES|SOURCE)\.(\w+)(?!\w|£)"
+
+# Même motif sur les octets : « £ » en UTF-8 (C2 A3) ou en Latin-1 (A3)
+TABLE_PATTERN_BYTES = (
+    rb"(?:\xc2)?\xa3(BQ|TD)_(SOCLE|HISTO|TMP|VUES|SOURCE)\.(\w+)(?!\w|(?:\xc2)?\xa3)"
+)
+
+# Verbe → rôle de la table qui le suit
+VERBS = {
+    "write":  ("INSERT", "INS", "MERGE", "UPDATE", "UPD", "ALTER"),
+    "create": ("CREATE",),
+    "delete": ("DELETE", "DEL", "TRUNCATE", "DROP"),
+}
+
+# Mots-clés qui peuvent séparer le verbe de sa table cible
+CARRY_KEYWORDS = (
+    "INTO", "FROM", "TABLE", "VIEW", "MATERIALIZED", "RECURSIVE", "IF", "NOT",
+    "EXISTS", "OR", "REPLACE", "TEMP", "TEMPORARY", "VOLATILE", "MULTISET",
+    "SET", "GLOBAL", "EXTERNAL", "ONLY",
+)
+
+# Octets relus avant une table pour retrouver son verbe
+_LOOKBEHIND = 128
+
+_TOKEN_RE = re.compile(
+    rb"--[^\n]*|/\*.*?(?:\*/|\Z)"                                # commentaires
+    rb"|'(?:[^'\\]|\\.)*(?:'|\Z)|\"(?:[^\"\\]|\\.)*(?:\"|\Z)"       # littéraux
+    rb"|(?:\xc2)?\xa3\w+(?:\.\w+)?(?=(?:\xc2)?\xa3)"             # nom complété à l'exécution
+    + rb"|" + TABLE_PATTERN_BYTES
+    + rb"|(?:\xc2)?\xa3(\w+)(?:\.(\w+))?",                       # autres £variables
+    re.DOTALL,
+)
+
+
+def _reversed_words(words: Iterable[str]) -> bytes:
+    return b"|".join(word[::-1].encode() for word in words)
+
+
+# « VERBE [mots-clés…] » lu à rebours depuis la table :
+# « INSERT INTO £x » → «  OTNI TRESNI »
+_VERB_RE = re.compile(
+    rb"(?i)\s+(?:(?:" + _reversed_words(CARRY_KEYWORDS) + rb")\s+)*(?:"
+    + rb"(?P<write>" + _reversed_words(VERBS["write"]) + rb")"
+    + rb"|(?P<create>" + _reversed_words(VERBS["create"])
+    + rb"|WEIV\s+(?:EVISRUCER\s+)?ECALPER)"                     # REPLACE VIEW (TD)
+    + rb"|(?P<delete>" + _reversed_words(VERBS["delete"]) + rb")"
+    + rb")\b"
+)
+
+
+def mask_of(roles: Iterable[str]) -> int:
+    mask = 0
+    for role in roles:
+        mask |= ROLE_BITS[role]
+    return mask
+
+
+def roles_label(roles: Iterable[str]) -> str:
+    """Rôles → libellé français pour l'affichage (« lecture, écriture »)."""
+    return ", ".join(ROLE_LABELS[role] for role in roles) or "?"
+
+
+def roles_of(mask: int) -> list[str]:
+    """Masque → liste de rôles, dans l'ordre canonique de `ROLES`."""
+    return [role for role in ROLES if mask & ROLE_BITS[role]]
+
+
+def _role_at(sql: bytes | mmap.mmap, start: int) -> int:
+    verb = _VERB_RE.match(sql[max(0, start - _LOOKBEHIND):start][::-1])
+    return ROLE_BITS[verb.lastgroup if verb else "read"]
+
+
+def scan_sql_refs(
+    sql: str | bytes | mmap.mmap,
+) -> tuple[list[tuple[str, str, str, int]], list[tuple[str, int]]]:
+    """(tables, variables) d'un texte SQL, en une passe.
+
+    tables :    [(platform, dataset, table, masque de rôles), ...] — comme `scan_table_roles` ;
+    variables : [("TBL_SOCLE" ou "DS_SOCLE.clients", masque de rôles), ...] — références
+                £NOM[.table] qui ne sont pas une table £XX_DATASET.table littérale.
+    Chaque référence n'apparaît qu'une fois (ordre de première occurrence),
+    avec l'union de ses rôles.
+    """
+    if isinstance(sql, str):
+        sql = sql.encode("utf-8")
+    tables: dict[tuple[bytes, bytes, bytes], int] = {}
+    variables: dict[bytes, int] = {}
+    for m in _TOKEN_RE.finditer(sql):
+        if m.group(3) is not None:
+            ref = m.group(1, 2, 3)
+            tables[ref] = tables.get(ref, 0) | _role_at(sql, m.start())
+        elif m.group(4) is not None:
+            ref = m.group(4) if m.group(5) is None else m.group(4) + b"." + m.group(5)
+            variables[ref] = variables.get(ref, 0) | _role_at(sql, m.start())
+    return (
+        [
+            (platform.decode(), f"{platform.decode()}_{dataset.decode()}", table.decode(), mask)
+            for (platform, dataset, table), mask in tables.items()
+        ],
+        [(ref.decode(), mask) for ref, mask in variables.items()],
+    )
+
+
+def scan_table_roles(sql: str | bytes | mmap.mmap) -> list[tuple[str, str, str, int]]:
+    """Références (platform, dataset, table, masque de rôles) d'un texte SQL.
+
+    Une table citée plusieurs fois n'apparaît qu'une fois (ordre de première
+    occurrence), avec l'union de ses rôles.
+    """
+    return scan_sql_refs(sql)[0]
+
+
+@contextmanager
+def map_file(path: Path) -> Iterator[bytes | mmap.mmap]:
+    """Projette un fichier en mémoire, en lecture seule (b"" s'il est vide)."""
+    with open(path, "rb") as fh:
+        if not fh.seek(0, 2):
+            yield b""  # mmap refuse les fichiers vides
+            return
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            yield buf
+
+
+def scan_file(path: Path) -> list[tuple[str, str, str, int]]:
+    """`scan_table_roles` sur un fichier projeté en mémoire (sans lecture ni décodage)."""
+    with map_file(path) as buf:
+        return scan_table_roles(buf)
@@ -0,0 +1,179 @@
+"""Aleister — Recherche de tables par clé exacte, préfixe ou sous-chaîne.
+
+`analyze_impact` et le filtre de la page d'impact cherchaient une table
+en testant `needle in key.lower()` sur chaque référence de chaque flux.
+`TableLookup` indexe une fois le catalogue des tables (« BQ_SOCLE.clients ») :
+
+  - clé exacte : table de hachage (insensible à la casse) ;
+  - préfixe : tableaux triés des clés et des noms de table, bissection ;
+  - sous-chaîne : index de trigrammes (identifiants de tables par
+    trigramme) ; les candidats de l'intersection sont vérifiés.
+
+`TableLookup.from_index()` ajoute l'index inverse table → références
+(position du flux, rang de la référence dans le flux, masque de rôles,
+domaine propriétaire précalculé) : une requête d'impact ne parcourt plus
+que les références des tables trouvées.
+"""
+
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left
+from typing import Iterable, Iterator, Mapping, Sequence
+
+from aleister.backend.index_memo import IndexMemo
+from aleister.backend.sql_scanner import mask_of
+
+_GRAM = 3
+
+
+def _grams(text: str) -> set[str]:
+    return {text[i:i + _GRAM] for i in range(len(text) - _GRAM + 1)}
+
+
+def _prefixed(entries: list[tuple[str, int]], prefix: str) -> list[int]:
+    """Identifiants des entrées triées (texte, id) dont le texte commence par `prefix`."""
+    start = bisect_left(entries, (prefix, -1))
+    end = bisect_left(entries, (prefix + "\U0010ffff", -1))
+    return [table_id for _, table_id in entries[start:end]]
+
+
+class TableLookup:
+    """Catalogue de tables indexé ; une table est désignée par sa position
+    dans `keys`."""
+
+    def __init__(self, keys: Sequence[str]):
+        self.keys = list(keys)
+        lowered = [key.lower() for key in self.keys]
+        self._lower = lowered
+        self._exact: dict[str, list[int]] = {}
+        grams: dict[str, array] = {}
+        for table_id, key in enumerate(lowered):
+            self._exact.setdefault(key, []).append(table_id)
+            for gram in _grams(key):
+                grams.setdefault(gram, array("I")).append(table_id)
+        self._grams = grams
+        self._by_key = sorted((key, i) for i, key in enumerate(lowered))
+        self._by_name = sorted((key.rpartition(".")[2], i) for i, key in enumerate(lowered))
+        # Références par table (voir `from_index`)
+        self.domains: list[str] = []
+        self._ref_offsets = array("I", [0] * (len(self.keys) + 1))
+        self._ref_flux = array("I")
+        self._ref_rank = array("H")
+        self._ref_masks = array("B")
+        self._ref_owners = array("H")
+
+    @classmethod
+    def from_index(cls, index: Mapping) -> "TableLookup":
+        """Catalogue et index inverse des références d'un index `build_index()`."""
+        table_ids: dict[str, int] = {}
+        domain_ids: dict[str, int] = {}
+        refs: list[tuple[int, int, int, int, int]] = []
+        for pos, flux in enumerate(index["flux"]):
+            for rank, ref in enumerate(flux["tables_referenced"]):
+                key = f"{ref['dataset']}.{ref['table']}"
+                table_id = table_ids.setdefault(key, len(table_ids))
+                owner = ref.get("domaine_owner", flux["domaine"])
+                refs.append((
+                    table_id, pos, rank, mask_of(ref.get("roles", ())),
+                    domain_ids.setdefault(owner, len(domain_ids)),
+                ))
+        lookup = cls(list(table_ids))
+        lookup.domains = list(domain_ids)
+        refs.sort(key=lambda ref: ref[0])  # stable : ordre de l'index par table
+        offsets = lookup._ref_offsets
+        for table_id, *_ in refs:
+            offsets[table_id + 1] += 1
+        for i in range(len(lookup.keys)):
+            offsets[i + 1] += offsets[i]
+        lookup._ref_flux = array("I", (ref[1] for ref in refs))
+        lookup._ref_rank = array("H", (ref[2] for ref in refs))
+        lookup._ref_masks = array("B", (ref[3] for ref in refs))
+        lookup._ref_owners = array("H", (ref[4] for ref in refs))
+        return lookup
+
+    # ── Recherche de tables ───────────────────────────────────────────────────
+    def exact(self, key: str) -> list[int]:
+        return list(self._exact.get(key.strip().lower(), ()))
+
+    def prefix(self, text: str) -> list[int]:
+        """Tables dont la clé ou le nom (sans dataset) commence par `text`."""
+        needle = text.strip().lower()
+        return sorted(set(_prefixed(self._by_key, needle)) | set(_prefixed(self._by_name, needle)))
+
+    def substring(self, text: str) -> list[int]:
+        """Tables dont la clé contient `text` (insensible à la casse)."""
+        needle = text.strip().lower()
+        if len(needle) < _GRAM:
+            return [i for i, key in enumerate(self._lower) if needle in key]
+        postings = []
+        for gram in _grams(needle):
+            posting = self._grams.get(gram)
+            if posting is None:
+                return []
+            postings.append(posting)
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                return []
+        return sorted(i for i in candidates if needle in self._lower[i])
+
+    def find(self, search_key: str) -> list[int]:
+        """Tables visées par une analyse d'impact : la clé exacte si elle
+        existe (« BQ_TMP.x_enrichi » n'inclut pas « BQ_TMP.x_enrichi_sync »),
+        sinon toutes celles qui contiennent `search_key`."""
+        return self.exact(search_key) or self.substring(search_key)
+
+    def search(self, text: str) -> list[str]:
+        """Filtre de saisie : clés triées contenant `text` ; une ou deux
+        lettres filtrent par préfixe (dataset ou nom de table)."""
+        needle = text.strip()
+        if not needle:
+            ids: Iterable[int] = range(len(self.keys))
+        elif len(needle) < _GRAM:
+            ids = self.prefix(needle)
+        else:
+            ids = self.substring(needle)
+        return sorted(self.keys[i] for i in ids)
+
+    # ── Références ────────────────────────────────────────────────────────────
+    def postings(
+        self,
+        table_ids: Iterable[int],
+        roles: Iterable[str] | None = None,
+    ) -> Iterator[tuple[int, int, int, str, int]]:
+        """Toutes les références aux tables : (position du flux, rang de la
+        référence, table, domaine propriétaire, masque), table par table.
+        `roles` : au moins un de ces rôles."""
+        wanted = mask_of(roles) if roles else 0
+        domains, owners, masks = self.domains, self._ref_owners, self._ref_masks
+        for table_id in table_ids:
+            for i in range(self._ref_offsets[table_id], self._ref_offsets[table_id + 1]):
+                if wanted and not masks[i] & wanted:
+                    continue
+                yield self._ref_flux[i], self._ref_rank[i], table_id, domains[owners[i]], masks[i]
+
+    def references(
+        self,
+        table_ids: Iterable[int],
+        roles: Iterable[str] | None = None,
+    ) -> list[tuple[int, int, str, int]]:
+        """[(position du flux, table, domaine propriétaire, masque), ...] : une
+        référence par flux (la première du flux parmi `table_ids`), dans
+        l'ordre de l'index. `roles` : au moins un de ces rôles."""
+        first: dict[int, tuple[int, int, str, int]] = {}
+        for pos, rank, table_id, owner, mask in self.postings(table_ids, roles):
+            if pos not in first or rank < first[pos][0]:
+                first[pos] = (rank, table_id, owner, mask)
+        return [(pos, table_id, owner, mask) for pos, (_, table_id, owner, mask) in sorted(first.items())]
+
+
+# ── Public API ────────────────────────────────────────────────────────────────
+_MEMO = IndexMemo()
+
+
+def get_table_lookup(index: Mapping) -> TableLookup:
+    """`TableLookup.from_index(index)`, mémoïsé tant que le même objet est passé."""
+    return _MEMO.get_or_compute(index, lambda: TableLookup.from_index(index))
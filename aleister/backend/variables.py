@@ -0,0 +1,189 @@
+"""Aleister — Résolution des £variables JobMaster (doc §4).
+
+Les tables ne sont pas toujours citées en clair (£BQ_SOCLE.clients) :
+un script les nomme souvent par une variable de `parametres_env`
+(`TBL_SOCLE: £BQ_SOCLE.clients`), reprise dans les paramètres des jobs
+(`Table: £TBL_SOCLE`) ou dans les SQL (`FROM £TBL_SOCLE`). Ce module
+développe ces variables selon les règles du §4 :
+
+  - variables globales (§4.2) : datasets et dates, laissés tels quels —
+    l'index désigne les tables par leur dataset symbolique (BQ_SOCLE) ;
+  - variables contextuelles (§4.3) : £FILE_NAME et £ITERATION_INDEX,
+    visibles seulement sous un job.process.cyclique ;
+  - variables de script (§4.4) : `parametres_env`, visibles dans tous les
+    jobs et tous les SQL du script, composables entre elles
+    (`TBL: £DS.clients`, `DS: £BQ_SOCLE`) ;
+  - variables dynamiques (§4.5) : déclarées par le paramètre `Variable`
+    d'un job, visibles du job suivant jusqu'à la fin du script. Leur valeur
+    n'est connue qu'à l'exécution : elles restent symboliques.
+
+Chaque variable de script est résolue une seule fois par script
+(`ScriptVariables`, mémoïsé) ; le résultat est mis en cache avec le
+parsing du YAML. Une référence à une variable inconnue, hors de portée ou
+cyclique est laissée telle quelle et relevée dans `unresolved`.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Iterable, Mapping
+
+from aleister.backend.sql_scanner import ROLE_BITS, TABLE_PATTERN
+
+# Variables injectées par l'orchestrateur (§4.2)
+GLOBALS = frozenset({
+    "BQ_SOURCE", "BQ_SOCLE", "BQ_TMP", "BQ_HISTO", "BQ_VUES",
+    "TD_SOURCE", "TD_SOCLE", "TD_TMP", "TD_HISTO", "TD_VUES",
+    "DATE", "DATETIME", "YEAR", "MONTH", "DAY", "YESTERDAY",
+})
+
+# Variables des blocs enfants de job.process.cyclique (§4.3)
+CONTEXTUAL = frozenset({"FILE_NAME", "ITERATION_INDEX"})
+CYCLIC_JOB = "job.process.cyclique"
+
+# Paramètre déclarant une variable dynamique, et job qui la teste (§4.5, §6)
+VARIABLE_PARAM = "Variable"
+CONDITION_JOB = "job.conditionnelle.si"
+
+# Paramètres de type table et rôle de la table pour le job (§6) ; toute
+# autre table citée par un paramètre est lue.
+TABLE_PARAMS = {
+    ("job.run.transfert", "TableSource"):    "read",
+    ("job.run.transfert", "TableCible"):     "write",
+    ("job.table.extraction", "TableSource"): "read",
+    ("job.run.create_view", "Table"):        "read",
+}
+CREATE_VIEW_JOB = "job.run.create_view"
+
+_REF_RE = re.compile(r"£(\w+)")
+_TABLE_RE = re.compile(TABLE_PATTERN)
+
+
+class ScriptVariables:
+    """Variables de script (`parametres_env`) d'un YAML, résolues à la demande.
+
+    `unresolved` : [(emplacement, nom), ...] des références qui n'ont pu
+    être développées (« parametres_env.TBL », « 2.1.TableSource »…).
+    """
+
+    def __init__(self, env: Mapping[str, str]):
+        self._env = dict(env)
+        self._resolved: dict[str, str] = {}
+        self._resolving: set[str] = set()
+        self.unresolved: list[tuple[str, str]] = []
+
+    def value(self, name: str) -> str | None:
+        """Valeur développée de la variable de script `name` (None si non déclarée)."""
+        if name not in self._env:
+            return None
+        if name not in self._resolved:
+            if name in self._resolving:
+                return None  # cycle : A: £B, B: £A
+            self._resolving.add(name)
+            self._resolved[name] = self.expand(self._env[name], f"parametres_env.{name}")
+            self._resolving.discard(name)
+        return self._resolved[name]
+
+    def expand(self, text: str, where: str, visible: Iterable[str] = ()) -> str:
+        """Développe les variables de script de `text`.
+
+        Globales et variables `visible` (dynamiques déclarées plus haut,
+        contextuelles) restent symboliques.
+        """
+        if "£" not in text:
+            return text
+        visible = set(visible)
+
+        def substitute(m: re.Match) -> str:
+            name, rest = self._split(m.group(1), visible)
+            if name in GLOBALS or name in visible:
+                return m.group(0)
+            value = self.value(name)
+            if value is None:
+                self.unresolved.append((where, name))
+                return m.group(0)
+            return value + rest
+
+        return _REF_RE.sub(substitute, text)
+
+    def _split(self, word: str, visible: set[str]) -> tuple[str, str]:
+        """(nom, suite) : plus long préfixe de `word` qui est une variable connue
+        (« £DATE_£NB » → DATE puis « _ »), sinon `word` entier."""
+        for end in range(len(word), 0, -1):
+            name = word[:end]
+            if name in self._env or name in GLOBALS or name in visible:
+                return name, word[end:]
+        return word, ""
+
+    def resolved(self) -> dict[str, str]:
+        """{nom : valeur développée} de toutes les variables de script."""
+        resolved: dict[str, str] = {}
+        for name, raw in self._env.items():
+            value = self.value(name)
+            resolved[name] = raw if value is None else value
+        return resolved
+
+
+def table_of(text: str) -> tuple[str, str, str] | None:
+    """(platform, dataset, table) si `text` désigne exactement une table £XX_DATASET.table."""
+    m = _TABLE_RE.fullmatch(text.strip())
+    if m is None:
+        return None
+    platform, dataset, table = m.groups()
+    return platform, f"{platform}_{dataset}", table
+
+
+def job_table_refs(
+    variables: ScriptVariables,
+    jobs: list[dict],
+) -> list[tuple[str, str, str, int]]:
+    """Tables (platform, dataset, table, masque de rôles) citées par les
+    paramètres des jobs, variables développées.
+
+    `jobs` : arbre à plat dans l'ordre du YAML (voir `knowledge_base`) ;
+    l'ordre donne la portée des variables dynamiques. job.run.create_view
+    crée en plus la vue homonyme dans le dataset des vues (§7.4).
+    """
+    declared: set[str] = set()
+    cyclic: set[str] = set()
+    refs: list[tuple[str, str, str, int]] = []
+    for job in jobs:
+        path, job_id, params = job["path"], job["job_id"], job["parametres"]
+        visible = set(declared)
+        parents = path.split(".")[:-1]
+        if any(".".join(parents[:i]) in cyclic for i in range(1, len(parents) + 1)):
+            visible |= CONTEXTUAL
+        for name, value in params.items():
+            text = variables.expand(value, f"{path}.{name}", visible)
+            for m in _TABLE_RE.finditer(text):
+                platform, dataset, table = m.groups()
+                role = TABLE_PARAMS.get((job_id, name), "read")
+                refs.append((platform, f"{platform}_{dataset}", table, ROLE_BITS[role]))
+                if job_id == CREATE_VIEW_JOB and name == "Table":
+                    refs.append((platform, f"{platform}_VUES", table, ROLE_BITS["create"]))
+        if job_id == CYCLIC_JOB:
+            cyclic.add(path)
+        if job_id != CONDITION_JOB and params.get(VARIABLE_PARAM):
+            declared.add(params[VARIABLE_PARAM])
+    return refs
+
+
+def sql_table_refs(
+    variables: Mapping[str, str],
+    references: Iterable[tuple[str, int]],
+) -> list[tuple[str, str, str, int]]:
+    """Tables désignées par les £variables d'un SQL (`sql_scanner.scan_sql_refs`).
+
+    `variables` : variables de script développées (`ScriptVariables.resolved`).
+    Les références « NOM.table » composent la valeur de NOM avec la table.
+    """
+    refs: list[tuple[str, str, str, int]] = []
+    for reference, mask in references:
+        name, _, table = reference.partition(".")
+        value = variables.get(name)
+        if value is None:
+            continue
+        found = table_of(f"{value}.{table}" if table else value)
+        if found is not None:
+            refs.append((*found, mask))
+    return refs
@@ -0,0 +1,458 @@
+"""Aleister — Surveillance du workspace et mise à jour continue de l'index.
+
+Un `IndexWatcher` garde en mémoire l'index de `build_index()` et lui
+applique des deltas fichier par fichier dès qu'un YAML ou un SQL change
+sous WORKSPACE_ROOT :
+
+  - Linux : notifications inotify (via ctypes, sans dépendance) ;
+  - ailleurs, ou si inotify est indisponible : polling des stats (taille,
+    mtime) sans lecture du contenu.
+
+Chaque delta produit un nouvel index (copie superficielle de `flux`,
+`tables` reconstruit) publié atomiquement : un lecteur ne voit jamais un index à moitié
+patché. `version` est incrémenté à chaque publication. Les listeners
+reçoivent aussi le delta (flux modifiés ou ajoutés, yaml_path supprimés) :
+le store n'écrit que ces flux (`IndexStore.write_changes`).
+
+Un seul processus écrit dans une base donnée : celui qui tient le verrou
+`<base>.writer.lock`. Les autres processus (workers Streamlit) lisent la
+base et attendent le verrou, pour prendre le relais si l'écrivain s'arrête.
+
+Usage côté pages :
+    store = open_store()
+    watch_store(store)   # le store SQLite suit chaque delta
+"""
+
+from __future__ import annotations
+
+import copy
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from aleister.config import WORKSPACE_ROOT
+from aleister.backend.index_store import IndexStore
+from aleister.backend.knowledge_base import (
+    _diff_manifest,
+    _is_indexed,
+    _load_cache,
+    _resolve_workers,
+    _save_cache,
+    _stat_files,
+    _update_index,
+    build_index,
+)
+
+# Délai de regroupement des événements : un `git checkout` produit des
+# centaines d'événements en rafale, appliqués en un seul delta.
+_DEBOUNCE = 0.1
+_POLL_INTERVAL = 1.0
+
+# Intervalle (secondes) entre deux tentatives de prise du verrou d'écriture
+_WRITER_RETRY = 5.0
+
+# Delta publié : (flux modifiés ou ajoutés, yaml_path des flux supprimés) ;
+# None pour un index publié en entier.
+Delta = tuple[list[dict], list[str]]
+
+# ── inotify ───────────────────────────────────────────────────────────────────
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM  = 0x00000040
+_IN_MOVED_TO    = 0x00000080
+_IN_CREATE      = 0x00000100
+_IN_DELETE      = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_Q_OVERFLOW  = 0x00004000
+_IN_IGNORED     = 0x00008000
+_IN_ISDIR       = 0x40000000
+_IN_NONBLOCK    = 0o4000
+_IN_CLOEXEC     = 0o2000000
+
+_WATCH_MASK = (
+    _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO
+    | _IN_CREATE | _IN_DELETE | _IN_DELETE_SELF
+)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class _InotifyBackend:
+    """Surveillance récursive d'un répertoire via inotify.
+
+    `wait()` retourne les chemins touchés (fichiers ou répertoires) ;
+    None signale un débordement de la file noyau (rescan nécessaire).
+    """
+
+    def __init__(self, root: Path):
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._fd = self._libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        self._dirs: dict[int, Path] = {}
+        self._add_tree(root)
+
+    def _add_watch(self, directory: Path) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), _WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                raise OSError(err, "fs.inotify.max_user_watches atteint")
+            return  # répertoire disparu entre-temps
+        self._dirs[wd] = directory
+
+    def _add_tree(self, root: Path) -> None:
+        self._add_watch(root)
+        for dirpath, dirnames, _ in os.walk(root):
+            for name in dirnames:
+                self._add_watch(Path(dirpath) / name)
+
+    def wait(self, timeout: float) -> set[Path] | None:
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+        paths: set[Path] = set()
+        while True:
+            try:
+                buf = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(buf):
+                wd, mask, _, length = _EVENT_HEADER.unpack_from(buf, offset)
+                offset += _EVENT_HEADER.size
+                name = buf[offset:offset + length].rstrip(b"\0")
+                offset += length
+                if mask & _IN_Q_OVERFLOW:
+                    return None
+                if mask & _IN_IGNORED:
+                    self._dirs.pop(wd, None)
+                    continue
+                parent = self._dirs.get(wd)
+                if parent is None:
+                    continue
+                path = parent / os.fsdecode(name) if name else parent
+                paths.add(path)
+                if mask & _IN_ISDIR and mask & (_IN_CREATE | _IN_MOVED_TO):
+                    self._add_tree(path)
+        return paths
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class _PollingBackend:
+    """Repli portable : compare périodiquement taille et mtime des fichiers indexés."""
+
+    def __init__(self, root: Path, interval: float = _POLL_INTERVAL):
+        self._root = root
+        self._interval = interval
+        self._stats = self._snapshot()
+
+    def _snapshot(self) -> dict[str, tuple[int, int]]:
+        return _stat_files(self._root) if self._root.exists() else {}
+
+    def wait(self, timeout: float) -> set[Path] | None:
+        time.sleep(min(timeout, self._interval))
+        stats = self._snapshot()
+        touched = {
+            rel for rel in stats.keys() | self._stats.keys()
+            if stats.get(rel) != self._stats.get(rel)
+        }
+        self._stats = stats
+        return {self._root / rel for rel in touched}
+
+    def close(self) -> None:
+        pass
+
+
+def _make_backend(root: Path, poll_interval: float):
+    if sys.platform.startswith("linux"):
+        try:
+            return _InotifyBackend(root)
+        except (OSError, AttributeError):
+            pass  # libc sans inotify, limite de watches atteinte…
+    return _PollingBackend(root, poll_interval)
+
+
+# ── Watcher ───────────────────────────────────────────────────────────────────
+class IndexWatcher:
+    """Index en mémoire maintenu à jour par les changements du workspace."""
+
+    def __init__(
+        self,
+        workspace: Path | None = None,
+        workers: int | None = None,
+        poll_interval: float = _POLL_INTERVAL,
+    ):
+        self.workspace = (workspace or WORKSPACE_ROOT).resolve()
+        self.version = 0
+        self._workers = _resolve_workers(workers)
+        self._poll_interval = poll_interval
+        self._index: dict[str, Any] = {"domaines": [], "flux": [], "tables": {}}
+        self._files: dict[str, dict] = {}
+        self._socle_map: dict[str, str] = {}
+        self._listeners: dict[str, Callable[[dict[str, Any], Delta | None], None]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def index(self) -> dict[str, Any]:
+        """Dernier index publié (ne jamais le modifier : il peut être partagé)."""
+        return self._index
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def add_listener(
+        self,
+        key: str,
+        callback: Callable[[dict[str, Any], Delta | None], None],
+    ) -> None:
+        """Enregistre `callback(index, delta)`, appelé après chaque publication
+        (`delta` None : index complet, sinon voir `Delta`).
+
+        `key` rend l'enregistrement idempotent (une page rechargée ne
+        duplique pas son listener) ; un nouveau listener reçoit l'index
+        courant en entier.
+        """
+        with self._lock:
+            known = key in self._listeners
+            self._listeners[key] = callback
+        if not known:
+            callback(self._index, None)
+
+    def start(self) -> "IndexWatcher":
+        if self.running:
+            return self
+        # Surveillance armée avant le chargement : aucun changement ne passe entre les deux
+        backend = _make_backend(self.workspace, self._poll_interval)
+        self._load()
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(backend,), name="aleister-watcher", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    # ── Internes ──────────────────────────────────────────────────────────────
+    def _load(self) -> None:
+        """Index initial : build incrémental, puis reprise du manifest associé.
+
+        Sans snapshot : les deltas sont calculés contre le manifest du cache
+        incrémental, qui doit décrire exactement l'index publié.
+        """
+        root = self.workspace
+        index = build_index(root, incremental=True, workers=self._workers, snapshot=False)
+        cached = _load_cache(root) if root.exists() else None
+        if cached is not None:
+            _, self._files, self._socle_map = cached
+        self._publish(index)
+
+    def _publish(self, index: dict[str, Any], delta: Delta | None = None) -> None:
+        with self._lock:
+            self._index = index
+            self.version += 1
+            listeners = list(self._listeners.values())
+        for callback in listeners:
+            try:
+                callback(index, delta)
+            except Exception:
+                pass  # un listener défaillant ne doit pas arrêter la surveillance
+
+    def _run(self, backend) -> None:
+        try:
+            while not self._stop.is_set():
+                touched = backend.wait(0.5)
+                if touched is None:
+                    self._load()  # file d'événements saturée : resynchronisation
+                    continue
+                if not touched:
+                    continue
+                # Regroupe la rafale en cours avant d'appliquer le delta
+                deadline = time.monotonic() + _DEBOUNCE
+                while time.monotonic() < deadline:
+                    more = backend.wait(_DEBOUNCE)
+                    if more is None:
+                        touched = None
+                        break
+                    touched |= more
+                if touched is None:
+                    self._load()
+                    continue
+                self.apply_changes(touched)
+        finally:
+            backend.close()
+
+    def _expand(self, paths: set[Path]) -> set[str]:
+        """Chemins touchés → fichiers indexés (relatifs), répertoires dépliés."""
+        root = self.workspace
+        rels: set[str] = set()
+        for path in paths:
+            try:
+                rel = path.relative_to(root).as_posix()
+            except ValueError:
+                continue
+            if path.is_dir():
+                for dirpath, _, filenames in os.walk(path):
+                    for name in filenames:
+                        rels.add((Path(dirpath) / name).relative_to(root).as_posix())
+            # Fichiers connus sous ce chemin (répertoire supprimé ou déplacé)
+            prefix = rel + "/"
+            rels.update(r for r in self._files if r.startswith(prefix))
+            rels.add(rel)
+        return {rel for rel in rels if _is_indexed(rel)}
+
+    def apply_changes(self, paths: set[Path]) -> bool:
+        """Applique les changements des `paths` à l'index. Retourne True si publié."""
+        root = self.workspace
+        rels = self._expand(paths)
+        if not rels:
+            return False
+
+        stats: dict[str, tuple[int, int]] = {}
+        for rel in rels:
+            try:
+                st = (root / rel).stat()
+            except OSError:
+                continue
+            stats[rel] = (st.st_size, st.st_mtime_ns)
+        old = {rel: self._files[rel] for rel in rels if rel in self._files}
+        files, changed, deleted = _diff_manifest(root, old, stats)
+        if not changed and not deleted:
+            self._files.update(files)
+            return False
+
+        current = self._index
+        index = {
+            "domaines": list(current["domaines"]),
+            "flux":     list(current["flux"]),
+            "tables":   current["tables"],  # reconstruit par _update_index
+        }
+        socle_changed = any("_creation_table_socle." in rel for rel in changed | deleted)
+        if socle_changed:
+            # La propriété des tables sera réappliquée à tous les flux, en place :
+            # on ne touche pas aux dicts de l'index déjà publié.
+            index["flux"] = copy.deepcopy(index["flux"])
+        added = changed - set(self._files)
+        self._socle_map = _update_index(
+            root, index, self._socle_map, changed, deleted, added, self._workers
+        )
+        for rel in deleted:
+            self._files.pop(rel, None)
+        self._files.update(files)
+        _save_cache(root, index, self._files, self._socle_map)
+        delta: Delta | None = None
+        if not socle_changed:
+            # Flux re-parsés : nouveaux dicts ; les autres sont partagés avec l'index précédent
+            before = {flux["yaml_path"]: flux for flux in current["flux"]}
+            after = {flux["yaml_path"] for flux in index["flux"]}
+            delta = (
+                [flux for flux in index["flux"] if before.get(flux["yaml_path"]) is not flux],
+                [path for path in before if path not in after],
+            )
+        self._publish(index, delta)
+        return True
+
+
+# ── Écrivain du store ─────────────────────────────────────────────────────────
+def _try_lock(fh) -> bool:
+    """Verrou exclusif non bloquant sur un fichier ouvert (tenu jusqu'à sa fermeture)."""
+    try:
+        if fcntl is not None:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            fh.seek(0)
+            msvcrt.locking(fh.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+def _store_writer(store: IndexStore) -> Callable[[dict[str, Any], Delta | None], None]:
+    def write(index: dict[str, Any], delta: Delta | None) -> None:
+        if delta is None:
+            store.write_index(index)
+        else:
+            store.write_changes(*delta)
+    return write
+
+
+def _start_writer(store: IndexStore) -> IndexWatcher:
+    watcher = get_watcher(store.workspace)
+    watcher.add_listener(str(store.db_path), _store_writer(store))
+    return watcher
+
+
+def _await_writer_lock(fh, acquired: threading.Event, store: IndexStore) -> None:
+    while not _try_lock(fh):
+        time.sleep(_WRITER_RETRY)
+    acquired.set()
+    _start_writer(store)
+
+
+# ── Public API ────────────────────────────────────────────────────────────────
+_WATCHERS: dict[Path, IndexWatcher] = {}
+_WATCHERS_LOCK = threading.Lock()
+
+# Par base : (fichier de verrou ouvert, événement « verrou obtenu »)
+_WRITERS: dict[str, tuple[Any, threading.Event]] = {}
+_WRITERS_LOCK = threading.Lock()
+
+
+def get_watcher(workspace: Path | None = None) -> IndexWatcher:
+    """Watcher partagé par tout le processus pour un workspace (démarré au besoin)."""
+    root = (workspace or WORKSPACE_ROOT).resolve()
+    with _WATCHERS_LOCK:
+        watcher = _WATCHERS.get(root)
+        if watcher is None:
+            watcher = _WATCHERS[root] = IndexWatcher(root)
+        watcher.start()
+    return watcher
+
+
+def watch_store(store: IndexStore) -> IndexWatcher | None:
+    """Maintient `store` à jour depuis le workspace, un seul écrivain par base.
+
+    Le processus qui obtient le verrou `<base>.writer.lock` démarre le
+    watcher et applique chaque delta au store ; les autres attendent le
+    verrou en tâche de fond. Retourne le watcher si ce processus est
+    l'écrivain, sinon None (la base est tenue à jour par un autre).
+    """
+    key = str(store.db_path.resolve())
+    with _WRITERS_LOCK:
+        entry = _WRITERS.get(key)
+        if entry is None:
+            fh = open(store.db_path.with_name(store.db_path.name + ".writer.lock"), "a+b")
+            entry = _WRITERS[key] = (fh, threading.Event())
+            if _try_lock(fh):
+                entry[1].set()
+            else:
+                threading.Thread(
+                    target=_await_writer_lock, args=(fh, entry[1], store),
+                    name="aleister-store-writer", daemon=True,
+                ).start()
+    if not entry[1].is_set():
+        return None
+    return _start_writer(store)
@@ -0,0 +1,128 @@
+"""Aleister — Parcours unique du workspace.
+
+`scan_workspace()` descend une seule fois l'arborescence (os.scandir) et
+classe chaque entrée au passage :
+
+  - YAML de configuration des flux : <Domaine>/<Type>/config/*.yml ;
+  - SQL des flux :                   <Domaine>/<Type>/sql/*.gql|*.dql ;
+  - scripts d'installation :         tout fichier sous un répertoire installation/ ;
+  - scripts de création socle :      *_creation_table_socle.* (à toute profondeur) ;
+  - CDCs :                           *.md sous DOCS_ROOT (si demandé).
+
+Le même `WorkspaceScan` alimente la propriété des tables socle, l'indexation
+des flux, le manifest du mode incrémental, l'empreinte des snapshots et
+les compteurs de la page d'accueil. Sur un workspace monté en réseau, chaque parcours évité
+économise plusieurs secondes.
+"""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Iterator
+
+from aleister.config import FLOW_TYPES
+
+_SQL_SUFFIXES = (".gql", ".dql")
+_SOCLE_MARKER = "_creation_table_socle."
+
+
+class WorkspaceScan:
+    """Résultat classé d'un parcours du workspace (chemins triés)."""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.domains: list[str] = []                              # répertoires de 1er niveau
+        self.configs: dict[tuple[str, str], list[Path]] = {}      # (domaine, type) → YAML
+        self.sql: dict[tuple[str, str], list[Path]] = {}          # (domaine, type) → SQL
+        self.installation: list[Path] = []
+        self.socle_scripts: list[Path] = []
+        self.cdcs: list[Path] = []
+        self.dirs: dict[str, int] = {}                            # répertoire relatif → mtime_ns
+        self.yaml_count = 0                                       # tous les .yml
+        self.sql_count = 0                                        # tous les .gql / .dql
+        # Entrées des fichiers suivis par le manifest (stat paresseux et mis en cache)
+        self._entries: dict[str, os.DirEntry] = {}
+
+    def indexed_files(self) -> Iterator[Path]:
+        """Fichiers dont dépend l'index : YAML et SQL des flux, puis scripts socle."""
+        for key in sorted(self.configs.keys() | self.sql.keys()):
+            yield from self.configs.get(key, [])
+            yield from self.sql.get(key, [])
+        yield from self.socle_scripts
+
+    def stat_files(self) -> dict[str, tuple[int, int]]:
+        """{chemin relatif : (taille, mtime_ns)} des fichiers indexés, sans lecture."""
+        stats: dict[str, tuple[int, int]] = {}
+        for path in self.indexed_files():
+            rel = path.relative_to(self.root).as_posix()
+            entry = self._entries.get(rel)
+            try:
+                st = entry.stat() if entry is not None else path.stat()
+            except OSError:
+                continue
+            stats[rel] = (st.st_size, st.st_mtime_ns)
+        return stats
+
+
+def _walk(
+    directory: str,
+    parts: tuple[str, ...],
+    dirs: dict[str, int] | None = None,
+) -> Iterator[tuple[os.DirEntry, tuple[str, ...]]]:
+    """(entrée fichier, parties du chemin relatif) de tout le sous-arbre.
+
+    Si `dirs` est fourni, y enregistre le mtime de chaque sous-répertoire.
+    """
+    try:
+        with os.scandir(directory) as it:
+            entries = sorted(it, key=lambda e: e.name)
+    except OSError:
+        return
+    for entry in entries:
+        try:
+            is_dir = entry.is_dir()
+            if is_dir and dirs is not None:
+                dirs["/".join((*parts, entry.name))] = entry.stat().st_mtime_ns
+        except OSError:
+            continue
+        if is_dir:
+            yield from _walk(entry.path, (*parts, entry.name), dirs)
+        else:
+            yield entry, (*parts, entry.name)
+
+
+def scan_workspace(root: Path, docs_root: Path | None = None) -> WorkspaceScan:
+    """Parcourt `root` (et `docs_root` pour les CDCs) une seule fois."""
+    scan = WorkspaceScan(root)
+    if not root.exists():
+        return scan
+    with os.scandir(root) as it:
+        scan.domains = sorted(e.name for e in it if e.is_dir())
+
+    scan.dirs[""] = root.stat().st_mtime_ns
+    for entry, parts in _walk(str(root), (), scan.dirs):
+        name = entry.name
+        if name.endswith(".yml"):
+            scan.yaml_count += 1
+        elif name.endswith(_SQL_SUFFIXES):
+            scan.sql_count += 1
+        if "installation" in parts[:-1]:
+            scan.installation.append(Path(entry.path))
+        if _SOCLE_MARKER in name:
+            scan.socle_scripts.append(Path(entry.path))
+            scan._entries["/".join(parts)] = entry
+        if len(parts) != 4 or parts[1] not in FLOW_TYPES:
+            continue
+        key, folder = (parts[0], parts[1]), parts[2]
+        if folder == "config" and name.endswith(".yml"):
+            scan.configs.setdefault(key, []).append(Path(entry.path))
+        elif folder == "sql" and name.endswith(_SQL_SUFFIXES):
+            scan.sql.setdefault(key, []).append(Path(entry.path))
+        else:
+            continue
+        scan._entries["/".join(parts)] = entry
+
+    if docs_root is not None and docs_root.exists():
+        scan.cdcs = [Path(e.path) for e, _ in _walk(str(docs_root), ()) if e.name.endswith(".md")]
+    return scan
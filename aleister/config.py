@@ -12,6 +12,13 @@ ROOT_DIR       = Path(__file__).parent.parent
 WORKSPACE_ROOT = Path(os.getenv("WORKSPACE_ROOT", str(ROOT_DIR / "workspaces")))
 DOCS_ROOT      = Path(os.getenv("DOCS_ROOT",      str(ROOT_DIR / "docs")))
 DOC_PATH       = ROOT_DIR / "jobmaster" / "doc.txt"
+INDEX_CACHE_DIR = Path(os.getenv("INDEX_CACHE_DIR", str(ROOT_DIR / ".aleister_cache")))
+
+# ── Indexation ────────────────────────────────────────────────────────────────
+INDEX_WORKERS = int(os.getenv("INDEX_WORKERS", "1"))   # 0 = un processus par cœur
+INDEX_SNAPSHOT = os.getenv("INDEX_SNAPSHOT", "1") != "0"  # snapshot binaire dans INDEX_CACHE_DIR
+PARSE_CACHE_MB = int(os.getenv("PARSE_CACHE_MB", "256"))  # cache de parsing LRU, 0 = désactivé
+IMPACT_CACHE_SIZE = int(os.getenv("IMPACT_CACHE_SIZE", "256"))  # résultats d'impact LRU, 0 = désactivé
 
 # ── LLM ───────────────────────────────────────────────────────────────────────
 GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
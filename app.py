@@ -4,12 +4,11 @@ Hub de navigation vers les 4 modules opérationnels.
 """
 
 import os
-from pathlib import Path
 
 import streamlit as st
-from dotenv import load_dotenv
 
-load_dotenv()
+from aleister.config import DOCS_ROOT, WORKSPACE_ROOT
+from aleister.backend.workspace_scan import scan_workspace
 
 st.set_page_config(
     page_title="Aleister — Intelligence JobMaster",
@@ -20,15 +19,10 @@ st.set_page_config(
 
 @st.cache_data(ttl=60)
 def _quick_stats() -> tuple[int, int, int, int]:
-    root = Path(os.getenv("WORKSPACE_ROOT", "workspaces"))
-    docs = Path(os.getenv("DOCS_ROOT", "docs"))
-    if not root.exists():
+    if not WORKSPACE_ROOT.exists():
         return 0, 0, 0, 0
-    domains = sum(1 for d in root.iterdir() if d.is_dir())
-    yamls   = sum(1 for _ in root.rglob("*.yml"))
-    sqls    = sum(1 for _ in root.rglob("*.gql")) + sum(1 for _ in root.rglob("*.dql"))
-    cdcs    = sum(1 for _ in docs.rglob("*.md")) if docs.exists() else 0
-    return domains, yamls, sqls, cdcs
+    scan = scan_workspace(WORKSPACE_ROOT, DOCS_ROOT)  # un seul parcours pour les 4 compteurs
+    return len(scan.domains), scan.yaml_count, scan.sql_count, len(scan.cdcs)
 
 
 # ── Header ────────────────────────────────────────────────────────────────────
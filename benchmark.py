@@ -0,0 +1,353 @@
+"""
+benchmark.py
+Benchmarks des chemins critiques d'Aleister sur des workspaces générés
+(generate_workspace.py, mode paramétrique) de plusieurs tailles.
+
+Cas mesurés : build_index (à froid, incrémental, snapshot), analyze_impact
+(store SQLite), flux_dag (ordonnancement, sans les exports),
+export_domain_docs, parser_fichiers et creer_zip. Chaque cas tourne dans
+son propre processus (WORKSPACE_ROOT, DOCS_ROOT et INDEX_CACHE_DIR
+pointent sur le workspace de la taille mesurée) ; on
+relève le temps mural (min et médiane sur --repeat exécutions), le pic de
+RSS du processus et le pic d'allocations Python (tracemalloc, exécution
+séparée pour ne pas fausser les temps).
+
+Les workspaces sont générés une fois dans --work-dir et réutilisés tant
+que leurs paramètres ne changent pas. La pente log-log temps / nombre de
+fichiers de chaque cas est reportée : < 1 = sous-linéaire.
+
+Usage :
+  python benchmark.py --sizes small,medium --save bench/baseline.json
+  python benchmark.py --sizes small,medium --compare bench/baseline.json --threshold 0.2
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent
+
+# Paramètres de generate_workspace.generate_scaled par taille
+SIZES = {
+    "small":  {"domains": 20,   "flux_per_type": None, "cross_density": None, "sql_kb": None},
+    "medium": {"domains": 200,  "flux_per_type": 10,   "cross_density": 2.0,  "sql_kb": 2.0},
+    "large":  {"domains": 1000, "flux_per_type": 25,   "cross_density": 2.0,  "sql_kb": 2.0},
+    "xlarge": {"domains": 4000, "flux_per_type": 40,   "cross_density": 2.0,  "sql_kb": 2.0},
+}
+
+CASES = (
+    "build_index_cold",
+    "build_index_incremental",
+    "build_index_snapshot",
+    "analyze_impact",
+    "flux_dag",
+    "export_domain_docs",
+    "parser_fichiers",
+    "creer_zip",
+)
+
+IMPACT_QUERIES = 50        # tables interrogées par exécution d'analyze_impact
+GENERATED_FILES = 200      # fichiers de la réponse simulée (parser_fichiers, creer_zip)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# WORKSPACES
+# ─────────────────────────────────────────────────────────────────────────────
+
+def ensure_workspace(work_dir, size, seed, workers):
+    """Répertoire du workspace `size`, (re)généré si ses paramètres ont changé."""
+    params = {**SIZES[size], "seed": seed}
+    base = work_dir / size
+    marker = base / "params.json"
+    if marker.exists() and json.loads(marker.read_text(encoding="utf-8")) == params:
+        return base
+
+    import generate_workspace
+
+    print(f"[{size}] génération du workspace...", flush=True)
+    if base.exists():
+        shutil.rmtree(base)
+    generate_workspace.generate_scaled(
+        base / "workspaces", base / "docs", params["domains"], params["flux_per_type"],
+        params["cross_density"], params["sql_kb"], seed=seed, workers=workers, verbose=False,
+    )
+    marker.write_text(json.dumps(params), encoding="utf-8")
+    return base
+
+
+def count_files(workspace):
+    return sum(len(files) for _, _, files in os.walk(workspace))
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# CAS (exécutés dans le processus fils)
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _fresh_cache():
+    """Vide INDEX_CACHE_DIR (index sérialisé, snapshot, store, cache de parsing)."""
+    cache = Path(os.environ["INDEX_CACHE_DIR"])
+    if cache.exists():
+        shutil.rmtree(cache)
+
+
+def _generated_response(workspace):
+    """Réponse au format --- FICHIER: ... --- construite avec des fichiers du workspace."""
+    paths = (sorted(workspace.rglob("*.yml"))[:GENERATED_FILES // 2]
+             + sorted(workspace.rglob("*.?ql"))[:GENERATED_FILES // 2])
+    return "\n".join(
+        f"--- FICHIER: {path.relative_to(workspace).as_posix()} ---\n"
+        f"{path.read_text(encoding='utf-8')}\n"
+        f"--- FIN FICHIER ---"
+        for path in paths
+    )
+
+
+def setup_case(case):
+    """Prépare le cas ; retourne la fonction mesurée (sans argument)."""
+    from aleister.config import WORKSPACE_ROOT
+    from aleister.backend.knowledge_base import build_index
+
+    if case == "build_index_cold":
+        def run():
+            _fresh_cache()
+            build_index(snapshot=False)
+        return run
+
+    if case == "build_index_incremental":
+        _fresh_cache()
+        build_index(incremental=True, snapshot=False)
+        return lambda: build_index(incremental=True, snapshot=False)
+
+    if case == "build_index_snapshot":
+        _fresh_cache()
+        build_index(snapshot=True)
+        return lambda: build_index(snapshot=True)
+
+    if case == "analyze_impact":
+        from aleister.backend.analyzer import analyze_impact, list_tables
+        from aleister.backend.index_store import open_store
+
+        store = open_store()
+        tables = list_tables(store=store)
+        step = max(1, len(tables) // IMPACT_QUERIES)
+        sample = tables[::step][:IMPACT_QUERIES]
+
+        def run():
+            for table in sample:
+                analyze_impact(table, store=store)
+        return run
+
+    if case == "flux_dag":
+        from aleister.backend.flux_dag import FluxDag
+        from aleister.backend.index_store import open_store
+
+        store = open_store()
+        graph = store.dependency_graph()
+        labels = store.flux_labels()
+        id_scripts, types = [name for name, _ in labels], [kind for _, kind in labels]
+        return lambda: FluxDag(graph, id_scripts, types)
+
+    if case == "export_domain_docs":
+        from aleister.backend.doc_builder import export_domain_docs
+
+        domaine = build_index()["domaines"][0]
+        out = Path(tempfile.mkdtemp(prefix="aleister-bench-docs-"))
+        return lambda: export_domain_docs(domaine, out)
+
+    if case in ("parser_fichiers", "creer_zip"):
+        from aleister.backend.generator import creer_zip, parser_fichiers
+
+        response = _generated_response(WORKSPACE_ROOT)
+        if case == "parser_fichiers":
+            return lambda: parser_fichiers(response)
+        fichiers = parser_fichiers(response)
+        return lambda: creer_zip(fichiers)
+
+    raise ValueError(f"cas inconnu : {case}")
+
+
+def run_case(case, repeat):
+    """Mesures d'un cas dans le processus courant."""
+    try:
+        run = setup_case(case)
+    except ImportError as exc:
+        return {"error": f"dépendance manquante : {exc.name}"}
+
+    walls = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        walls.append(time.perf_counter() - start)
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # Ko sous Linux, octets sous macOS
+
+    tracemalloc.start()
+    run()
+    _, alloc_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "wall_min":      min(walls),
+        "wall_median":   statistics.median(walls),
+        "rss_peak_mb":   rss / 1024 ** (2 if sys.platform == "darwin" else 1),
+        "alloc_peak_mb": alloc_peak / 1024 ** 2,
+        "repeat":        repeat,
+    }
+
+
+def measure(case, base, repeat):
+    """Lance `case` dans un processus neuf sur le workspace `base`."""
+    env = {
+        **os.environ,
+        "WORKSPACE_ROOT":  str(base / "workspaces"),
+        "DOCS_ROOT":       str(base / "docs"),
+        "INDEX_CACHE_DIR": str(base / "cache"),
+        "PYTHONPATH":      os.pathsep.join(filter(None, [str(ROOT_DIR), os.environ.get("PYTHONPATH")])),
+    }
+    proc = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve()), "--run-case", case, "--repeat", str(repeat)],
+        env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        lines = proc.stderr.strip().splitlines()
+        return {"error": lines[-1] if lines else f"code retour {proc.returncode}"}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# RAPPORT / COMPARAISON
+# ─────────────────────────────────────────────────────────────────────────────
+
+def scaling(results):
+    """{cas : pente log-log du temps médian en fonction du nombre de fichiers}."""
+    slopes = {}
+    for case in CASES:
+        points = [
+            (math.log(r["files"]), math.log(r["cases"][case]["wall_median"]))
+            for r in results.values()
+            if r["cases"].get(case, {}).get("wall_median")
+        ]
+        if len(points) < 2:
+            continue
+        mx = sum(x for x, _ in points) / len(points)
+        my = sum(y for _, y in points) / len(points)
+        var = sum((x - mx) ** 2 for x, _ in points)
+        if var:
+            slopes[case] = sum((x - mx) * (y - my) for x, y in points) / var
+    return slopes
+
+
+def compare(current, baseline, threshold):
+    """[(taille, cas, métrique, base, actuel, ratio)] des régressions > threshold."""
+    regressions = []
+    for size, result in current["results"].items():
+        base_result = baseline.get("results", {}).get(size)
+        if base_result is None:
+            continue
+        for case, metrics in result["cases"].items():
+            base_metrics = base_result["cases"].get(case, {})
+            for metric in ("wall_median", "rss_peak_mb", "alloc_peak_mb"):
+                old, new = base_metrics.get(metric), metrics.get(metric)
+                if not old or new is None:
+                    continue
+                ratio = new / old
+                if ratio > 1 + threshold:
+                    regressions.append((size, case, metric, old, new, ratio))
+    return regressions
+
+
+def print_results(report):
+    print(f"\n{'taille':<8} {'cas':<24} {'médiane':>10} {'min':>10} {'RSS Mo':>8} {'alloc Mo':>9}")
+    for size, result in report["results"].items():
+        for case, m in result["cases"].items():
+            if "error" in m:
+                print(f"{size:<8} {case:<24} {'— ' + m['error']}")
+                continue
+            print(f"{size:<8} {case:<24} {m['wall_median']:>9.3f}s {m['wall_min']:>9.3f}s "
+                  f"{m['rss_peak_mb']:>8.0f} {m['alloc_peak_mb']:>9.1f}")
+    if report["scaling"]:
+        print("\nPente log-log temps / fichiers (< 1 : sous-linéaire)")
+        for case, slope in report["scaling"].items():
+            print(f"  {case:<24} {slope:.2f}")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# POINT D'ENTRÉE
+# ─────────────────────────────────────────────────────────────────────────────
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks des chemins critiques d'Aleister.")
+    parser.add_argument("--sizes", default="small,medium",
+                        help=f"tailles séparées par des virgules ({', '.join(SIZES)})")
+    parser.add_argument("--cases", default=",".join(CASES), help="cas séparés par des virgules")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=0, help="processus de génération (0 = un par cœur)")
+    parser.add_argument("--work-dir", type=Path, default=ROOT_DIR / ".aleister_cache" / "bench")
+    parser.add_argument("--save", type=Path, help="écrit les résultats (baseline JSON)")
+    parser.add_argument("--compare", type=Path, help="baseline JSON de référence")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="régression signalée au-delà de ce ratio (0.2 = +20 %%)")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_case:
+        print(json.dumps(run_case(args.run_case, args.repeat)))
+        return 0
+
+    sizes = [s for s in args.sizes.split(",") if s]
+    cases = [c for c in args.cases.split(",") if c]
+    unknown = [s for s in sizes if s not in SIZES] + [c for c in cases if c not in CASES]
+    if unknown:
+        parser.error(f"taille ou cas inconnu : {', '.join(unknown)}")
+
+    report = {
+        "created":  datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python":   platform.python_version(),
+        "platform": platform.platform(),
+        "results":  {},
+    }
+    for size in sizes:
+        base = ensure_workspace(args.work_dir, size, args.seed, args.workers)
+        result = {
+            "params": SIZES[size],
+            "files": count_files(base / "workspaces") + count_files(base / "docs"),
+            "cases": {},
+        }
+        for case in cases:
+            print(f"[{size}] {case}...", flush=True)
+            result["cases"][case] = measure(case, base, args.repeat)
+        report["results"][size] = result
+    report["scaling"] = scaling(report["results"])
+    print_results(report)
+
+    if args.save:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        args.save.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\nBaseline écrite : {args.save}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} régression(s) au-delà de +{args.threshold:.0%} :")
+            for size, case, metric, old, new, ratio in regressions:
+                print(f"  {size:<8} {case:<24} {metric:<14} {old:.3f} → {new:.3f} (x{ratio:.2f})")
+            return 1
+        print(f"\nAucune régression au-delà de +{args.threshold:.0%} par rapport à {args.compare}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,10 +5,26 @@ Génère un environnement de production fictif pour Aleister — domaine téléc
 Produit ~400 flux JobMaster (YAML + SQL) et ~400 CDCs (Markdown) dans docs/.
 
 Usage : python generate_workspace.py
+
+Mode paramétrique (benchmarks) : N domaines dérivés des 20 domaines de
+référence, M flux par type et par domaine, densité de références
+cross-domaine et taille des SQL configurables, génération reproductible
+(seed) et écriture parallèle. Les répertoires ne sont nettoyés qu'avec
+--clean.
+
+  python generate_workspace.py --domains 2000 --flux-per-type 60 \\
+      --cross-density 1.5 --sql-kb 4 --sql-sigma 1.0 --seed 42 --workers 8 \\
+      --output /data/bench/workspaces --docs /data/bench/docs --clean
 """
 
+import argparse
+import math
 import os
+import random
+import re
 import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 WORKSPACE_ROOT = Path("workspaces")
@@ -592,12 +608,21 @@ def col_defs_sql(d):
     else:
         return "\n".join(f"  {c[0]:<35} {c[1]}," for c in d.get("cols_td", []))[:-1]
 
+def masque_csv(d):
+    return d["file_mask"].replace(r"\.gz", "")
+
+def cross_refs(d):
+    """Tables empruntées par le domaine : CROSS_REFS, ou d["cross"] (mode paramétrique)."""
+    if "cross" in d:
+        return d["cross"]
+    return CROSS_REFS.get(dn(d), [])
+
 def cross_sql_snippet(d):
     name = dn(d)
-    if name not in CROSS_REFS:
+    if not cross_refs(d):
         return ""
     lines = []
-    for (plat, tbl, owner) in CROSS_REFS[name]:
+    for (plat, tbl, owner) in cross_refs(d):
         prefix = "£BQ" if plat == "BQ" else "£TD"
         lines.append(f"-- Référence cross-domaine : {prefix}_SOCLE.{tbl} (domaine {owner})")
         lines.append(f"LEFT JOIN {prefix}_SOCLE.{tbl} ext_{tbl} ON t.{key(d)} = ext_{tbl}.{key(d)}")
@@ -689,7 +714,7 @@ def yaml_import_controle(d):
   parametres_env:
     REP_WORK: {d["rep_work"]}
     REP_ERR: {d["rep_err"]}
-    MASQUE_{n.upper()}: "{d["file_mask"].replace(r'\.gz', '')}"
+    MASQUE_{n.upper()}: "{masque_csv(d)}"
 
   jobs:
     - job_id: job.fichier.controle
@@ -715,7 +740,7 @@ def yaml_import_batch(d):
   parametres_env:
     REP_WORK: {d["rep_work"]}
     REP_ARCH: {d["rep_arch"]}
-    MASQUE_{n.upper()}: "{d["file_mask"].replace(r'\.gz', '')}"
+    MASQUE_{n.upper()}: "{masque_csv(d)}"
     TBL_STAGING: {pfx(d)}_TMP.{staging(d)}
 
   jobs:
@@ -1440,7 +1465,7 @@ def cdc(d, flow_type, flow_name, description, sources, cibles, regles, frequence
     p = pf(d)
     transverse_note = ""
     if is_transverse:
-        refs = CROSS_REFS.get(n, [])
+        refs = cross_refs(d)
         ref_list = "\n".join(f"- `{r[0]}_SOCLE.{r[1]}` (domaine **{r[2]}**)" for r in refs)
         transverse_note = f"""
 ## Dépendances transverses
@@ -1509,22 +1534,24 @@ Toute évolution de ces tables peut impacter ce flux.
 # GÉNÉRATION PAR DOMAINE
 # ─────────────────────────────────────────────────────────────────────────────
 
-def generate_domain(d):
+def generate_domain(d, emit=w, workspace_root=WORKSPACE_ROOT, docs_root=DOCS_ROOT, verbose=True):
+    """Écrit (via `emit(chemin, contenu)`) les flux, SQL et CDCs d'un domaine."""
     n  = dn(d)
     p  = pf(d)
     e  = ext(d)
-    wp = WORKSPACE_ROOT / n
-    dp = DOCS_ROOT / n
+    wp = workspace_root / n
+    dp = docs_root / n
     is_compressed = d.get("compressed", False)
     has_api = d.get("api_out") is not None
-    has_cross = n in CROSS_REFS
+    has_cross = bool(cross_refs(d))
 
-    print(f"  [{p}] {n}")
+    if verbose:
+        print(f"  [{p}] {n}")
 
     # ── IMPORT ────────────────────────────────────────────────────────────────
-    w(wp / "Import/config" / f"{n}_import_RapatriementSFTP.yml",
+    emit(wp / "Import/config" / f"{n}_import_RapatriementSFTP.yml",
       yaml_import_rapatriement(d))
-    w(dp / f"{n}_import_RapatriementSFTP_CDC.md",
+    emit(dp / f"{n}_import_RapatriementSFTP_CDC.md",
       cdc(d, "Import", "RapatriementSFTP",
           f"Rapatriement quotidien des fichiers {n.lower()} depuis le serveur SFTP du partenaire vers la zone d'entrée locale.",
           f"- SFTP source : `{d['sftp_in']}`\n- Format : CSV (séparateur `{d['sep']}`, encodage {d['encoding']})\n- Masque fichier : `{d['file_mask']}`",
@@ -1533,9 +1560,9 @@ def generate_domain(d):
           "Quotidien — déclenchement à 06h00.",
           f"- Connexion SFTP sécurisée (clé SSH).\n- Timeout de connexion : 30 secondes.\n- Le répertoire `{d['rep_in']}` doit exister avant exécution."))
 
-    w(wp / "Import/config" / f"{n}_import_DeplacementTravail.yml",
+    emit(wp / "Import/config" / f"{n}_import_DeplacementTravail.yml",
       yaml_import_deplacement(d))
-    w(dp / f"{n}_import_DeplacementTravail_CDC.md",
+    emit(dp / f"{n}_import_DeplacementTravail_CDC.md",
       cdc(d, "Import", "DeplacementTravail",
           f"Déplacement des fichiers {n.lower()} validés de la zone d'entrée vers la zone de travail pour traitement.",
           f"- Répertoire source : `{d['rep_in']}`\n- Masque : `{d['file_mask']}`",
@@ -1545,9 +1572,9 @@ def generate_domain(d):
           f"- Répertoire `{d['rep_work']}` doit exister.\n- Aucun fichier en doublon accepté en zone de travail."))
 
     if is_compressed:
-        w(wp / "Import/config" / f"{n}_import_Decompression.yml",
+        emit(wp / "Import/config" / f"{n}_import_Decompression.yml",
           yaml_import_decompression(d))
-        w(dp / f"{n}_import_Decompression_CDC.md",
+        emit(dp / f"{n}_import_Decompression_CDC.md",
           cdc(d, "Import", "Decompression",
               f"Décompression des archives {n.lower()} (.gz) reçues depuis la plateforme de médiation avant validation.",
               f"- Répertoire source : `{d['rep_in']}`\n- Format : gzip (.csv.gz)",
@@ -1556,9 +1583,9 @@ def generate_domain(d):
               "Quotidien — immédiatement après rapatriement.",
               "- Format gzip uniquement. Les autres formats doivent être rejetés."))
 
-    w(wp / "Import/config" / f"{n}_import_ControleCSV.yml",
+    emit(wp / "Import/config" / f"{n}_import_ControleCSV.yml",
       yaml_import_controle(d))
-    w(dp / f"{n}_import_ControleCSV_CDC.md",
+    emit(dp / f"{n}_import_ControleCSV_CDC.md",
       cdc(d, "Import", "ControleCSV",
           f"Validation structurelle des fichiers {n.lower()} avant chargement en staging : colonnes, encodage et non-vide.",
           f"- Répertoire : `{d['rep_work']}`\n- Masque : `{d['file_mask']}`",
@@ -1567,11 +1594,11 @@ def generate_domain(d):
           "Quotidien — après déplacement en zone de travail.",
           f"- Le répertoire d'erreur `{d['rep_err']}` doit exister.\n- Le flux doit échouer si au moins un fichier est invalide."))
 
-    w(wp / "Import/config" / f"{n}_import_TraitementBatch.yml",
+    emit(wp / "Import/config" / f"{n}_import_TraitementBatch.yml",
       yaml_import_batch(d))
-    w(wp / "Import/sql" / f"{n}_import_chargement_staging.{e}",
+    emit(wp / "Import/sql" / f"{n}_import_chargement_staging.{e}",
       sql_load_staging(d))
-    w(dp / f"{n}_import_TraitementBatch_CDC.md",
+    emit(dp / f"{n}_import_TraitementBatch_CDC.md",
       cdc(d, "Import", "TraitementBatch",
           f"Chargement en masse de tous les fichiers {n.lower()} validés dans la table staging puis archivage.",
           f"- Zone de travail : `{d['rep_work']}`\n- Table staging : `{pfx(d)}_TMP.{staging(d)}`",
@@ -1581,21 +1608,21 @@ def generate_domain(d):
           "- La table staging doit exister (voir installation).\n- En cas d'échec partiel, toute la passe doit être rejouée."))
 
     # Import installation
-    w(wp / "Import/installation/config" / f"{n}_installation_CreationTableStaging.yml",
+    emit(wp / "Import/installation/config" / f"{n}_installation_CreationTableStaging.yml",
       yaml_install_staging(d))
-    w(wp / "Import/installation/sql" / f"{n}_installation_creation_table_staging.{e}",
+    emit(wp / "Import/installation/sql" / f"{n}_installation_creation_table_staging.{e}",
       sql_create_table_staging(d))
 
     # ── ALIMENTATION ──────────────────────────────────────────────────────────
-    w(wp / "Alimentation/config" / f"{n}_alimentation_UpsertSocle.yml",
+    emit(wp / "Alimentation/config" / f"{n}_alimentation_UpsertSocle.yml",
       yaml_alim_upsert(d))
-    w(wp / "Alimentation/sql" / f"{n}_alimentation_check_staging.{e}",
+    emit(wp / "Alimentation/sql" / f"{n}_alimentation_check_staging.{e}",
       sql_check_staging(d))
-    w(wp / "Alimentation/sql" / f"{n}_alimentation_upsert_socle.{e}",
+    emit(wp / "Alimentation/sql" / f"{n}_alimentation_upsert_socle.{e}",
       sql_upsert_socle(d))
-    w(wp / "Alimentation/sql" / f"{n}_alimentation_insert_histo.{e}",
+    emit(wp / "Alimentation/sql" / f"{n}_alimentation_insert_histo.{e}",
       sql_insert_histo(d))
-    w(dp / f"{n}_alimentation_UpsertSocle_CDC.md",
+    emit(dp / f"{n}_alimentation_UpsertSocle_CDC.md",
       cdc(d, "Alimentation", "UpsertSocle",
           f"Alimentation du SOCLE {socle(d)} depuis la staging par opération MERGE (UPSERT). Mise à jour des existants et insertion des nouveaux.",
           f"- Table staging : `{pfx(d)}_TMP.{staging(d)}`",
@@ -1604,9 +1631,9 @@ def generate_domain(d):
           "Quotidien — après chargement staging.",
           "- La staging doit être peuplée (contrôle via FLAG avant merge).\n- La vue ne doit jamais pointer sur une table vide."))
 
-    w(wp / "Alimentation/config" / f"{n}_alimentation_ChargementsParalleles.yml",
+    emit(wp / "Alimentation/config" / f"{n}_alimentation_ChargementsParalleles.yml",
       yaml_alim_parallele(d))
-    w(dp / f"{n}_alimentation_ChargementsParalleles_CDC.md",
+    emit(dp / f"{n}_alimentation_ChargementsParalleles_CDC.md",
       cdc(d, "Alimentation", "ChargementsParalleles",
           f"Chargement simultané du SOCLE et de la table historique {n.lower()} pour optimiser les temps de traitement.",
           f"- Table staging : `{pfx(d)}_TMP.{staging(d)}`",
@@ -1616,15 +1643,15 @@ def generate_domain(d):
           "- Aucune dépendance entre SOCLE et HISTO pour ce flux.\n- Rollback manuel si l'une des deux opérations échoue à mi-course."))
 
     if has_cross:
-        w(wp / "Alimentation/config" / f"{n}_alimentation_EnrichissementTransverse.yml",
+        emit(wp / "Alimentation/config" / f"{n}_alimentation_EnrichissementTransverse.yml",
           yaml_alim_transfert(d))
-        w(wp / "Alimentation/sql" / f"{n}_alimentation_enrichissement_transverse.{e}",
+        emit(wp / "Alimentation/sql" / f"{n}_alimentation_enrichissement_transverse.{e}",
           sql_enrichissement_transverse(d))
-        w(dp / f"{n}_alimentation_EnrichissementTransverse_CDC.md",
+        emit(dp / f"{n}_alimentation_EnrichissementTransverse_CDC.md",
           cdc(d, "Alimentation", "EnrichissementTransverse",
               f"Enrichissement du SOCLE {socle(d)} avec des données provenant d'autres domaines via jointures SQL transverses.",
               f"- Table SOCLE locale : `{pfx(d)}_SOCLE.{socle(d)}`\n"
-              + "\n".join(f"- Table transverse : `{'£BQ' if r[0]=='BQ' else '£TD'}_SOCLE.{r[1]}` (domaine {r[2]})" for r in CROSS_REFS[n]),
+              + "\n".join(f"- Table transverse : `{'£BQ' if r[0]=='BQ' else '£TD'}_SOCLE.{r[1]}` (domaine {r[2]})" for r in cross_refs(d)),
               f"- Table enrichie : `{pfx(d)}_TMP.{socle(d)}_enrichi`",
               "- Joindre les tables des domaines référencés.\n- Ne pas modifier les données SOCLE originales.\n- Stocker le résultat en table temporaire pour les agrégats.",
               "Hebdomadaire — chaque dimanche.",
@@ -1632,15 +1659,15 @@ def generate_domain(d):
               is_transverse=True))
 
     # Alimentation installation
-    w(wp / "Alimentation/installation/config" / f"{n}_installation_CreationTableSocle.yml",
+    emit(wp / "Alimentation/installation/config" / f"{n}_installation_CreationTableSocle.yml",
       yaml_install_socle(d))
-    w(wp / "Alimentation/installation/sql" / f"{n}_installation_creation_table_socle.{e}",
+    emit(wp / "Alimentation/installation/sql" / f"{n}_installation_creation_table_socle.{e}",
       sql_create_table_socle(d))
 
     # ── EXPORT ────────────────────────────────────────────────────────────────
-    w(wp / "Export/config" / f"{n}_export_ExtractionCSV.yml",
+    emit(wp / "Export/config" / f"{n}_export_ExtractionCSV.yml",
       yaml_export_extraction(d))
-    w(dp / f"{n}_export_ExtractionCSV_CDC.md",
+    emit(dp / f"{n}_export_ExtractionCSV_CDC.md",
       cdc(d, "Export", "ExtractionCSV",
           f"Extraction quotidienne du SOCLE {socle(d)} vers un fichier CSV daté pour distribution aux partenaires.",
           f"- Table SOCLE : `{pfx(d)}_SOCLE.{socle(d)}`",
@@ -1649,9 +1676,9 @@ def generate_domain(d):
           "Quotidien — après alimentation SOCLE.",
           f"- Le répertoire `{d['rep_export']}` doit exister.\n- Purge des exports de plus de 1 mois."))
 
-    w(wp / "Export/config" / f"{n}_export_EnvoiSFTP.yml",
+    emit(wp / "Export/config" / f"{n}_export_EnvoiSFTP.yml",
       yaml_export_sftp(d))
-    w(dp / f"{n}_export_EnvoiSFTP_CDC.md",
+    emit(dp / f"{n}_export_EnvoiSFTP_CDC.md",
       cdc(d, "Export", "EnvoiSFTP",
           f"Envoi des fichiers CSV {n.lower()} extraits vers le SFTP de distribution partenaire.",
           f"- Répertoire source : `{d['rep_export']}`",
@@ -1661,9 +1688,9 @@ def generate_domain(d):
           "- Connexion SFTP sécurisée requise.\n- En cas d'échec d'envoi, conserver le fichier local."))
 
     if has_api:
-        w(wp / "Export/config" / f"{n}_export_ExportAPI.yml",
+        emit(wp / "Export/config" / f"{n}_export_ExportAPI.yml",
           yaml_export_api(d))
-        w(dp / f"{n}_export_ExportAPI_CDC.md",
+        emit(dp / f"{n}_export_ExportAPI_CDC.md",
           cdc(d, "Export", "ExportAPI",
               f"Export du SOCLE {socle(d)} vers l'API partenaire en format JSON pour synchronisation temps réel.",
               f"- Table SOCLE : `{pfx(d)}_SOCLE.{socle(d)}`",
@@ -1673,13 +1700,13 @@ def generate_domain(d):
               "- Token API valide requis (configuré en variable d'environnement).\n- Timeout API : 60 secondes par appel."))
 
     # ── AGGREGAT ──────────────────────────────────────────────────────────────
-    w(wp / "Aggregat/config" / f"{n}_aggregat_JournalierSocle.yml",
+    emit(wp / "Aggregat/config" / f"{n}_aggregat_JournalierSocle.yml",
       yaml_aggr_journalier(d))
-    w(wp / "Aggregat/sql" / f"{n}_aggregat_check_socle_jour.{e}",
+    emit(wp / "Aggregat/sql" / f"{n}_aggregat_check_socle_jour.{e}",
       sql_aggr_journalier(d))
-    w(wp / "Aggregat/sql" / f"{n}_aggregat_insert_journalier.{e}",
+    emit(wp / "Aggregat/sql" / f"{n}_aggregat_insert_journalier.{e}",
       sql_aggr_insert_journalier(d))
-    w(dp / f"{n}_aggregat_JournalierSocle_CDC.md",
+    emit(dp / f"{n}_aggregat_JournalierSocle_CDC.md",
       cdc(d, "Aggregat", "JournalierSocle",
           f"Historisation quotidienne des comptages du SOCLE {socle(d)} pour suivi de volumétrie.",
           f"- Table SOCLE : `{pfx(d)}_SOCLE.{socle(d)}`",
@@ -1688,13 +1715,13 @@ def generate_domain(d):
           "Quotidien — après alimentation SOCLE.",
           "- La table historique doit exister (voir installation).\n- Un seul enregistrement par jour autorisé."))
 
-    w(wp / "Aggregat/config" / f"{n}_aggregat_MensuelParSegment.yml",
+    emit(wp / "Aggregat/config" / f"{n}_aggregat_MensuelParSegment.yml",
       yaml_aggr_mensuel(d))
-    w(wp / "Aggregat/sql" / f"{n}_aggregat_delete_mensuel.{e}",
+    emit(wp / "Aggregat/sql" / f"{n}_aggregat_delete_mensuel.{e}",
       sql_aggr_delete_mensuel(d))
-    w(wp / "Aggregat/sql" / f"{n}_aggregat_insert_mensuel_segment.{e}",
+    emit(wp / "Aggregat/sql" / f"{n}_aggregat_insert_mensuel_segment.{e}",
       sql_aggr_insert_mensuel(d))
-    w(dp / f"{n}_aggregat_MensuelParSegment_CDC.md",
+    emit(dp / f"{n}_aggregat_MensuelParSegment_CDC.md",
       cdc(d, "Aggregat", "MensuelParSegment",
           f"Calcul des agrégats mensuels du SOCLE {socle(d)} par dimension métier pour le reporting mensuel.",
           f"- Table SOCLE : `{pfx(d)}_SOCLE.{socle(d)}`",
@@ -1704,11 +1731,11 @@ def generate_domain(d):
           "- Flux idempotent : peut être rejoué sans doublon.\n- Le mois en cours ne doit jamais être partiel dans la table agrégat.",
           is_transverse=has_cross))
 
-    w(wp / "Aggregat/config" / f"{n}_aggregat_CumulGlissant.yml",
+    emit(wp / "Aggregat/config" / f"{n}_aggregat_CumulGlissant.yml",
       yaml_aggr_cumul(d))
-    w(wp / "Aggregat/sql" / f"{n}_aggregat_cumul_glissant_12m.{e}",
+    emit(wp / "Aggregat/sql" / f"{n}_aggregat_cumul_glissant_12m.{e}",
       sql_aggr_cumul(d))
-    w(dp / f"{n}_aggregat_CumulGlissant_CDC.md",
+    emit(dp / f"{n}_aggregat_CumulGlissant_CDC.md",
       cdc(d, "Aggregat", "CumulGlissant",
           f"Calcul du cumul glissant sur 12 mois pour les indicateurs {n.lower()} — utilisé pour les analyses de tendance.",
           f"- Table historique : `{pfx(d)}_HISTO.{histo(d)}`",
@@ -1718,16 +1745,203 @@ def generate_domain(d):
           "- Au moins 12 mois d'historique requis pour un résultat complet.\n- Les mois manquants dans l'historique produisent un cumul partiel."))
 
     # Aggregat installation
-    w(wp / "Aggregat/installation/config" / f"{n}_installation_CreationTableAggregat.yml",
+    emit(wp / "Aggregat/installation/config" / f"{n}_installation_CreationTableAggregat.yml",
       yaml_install_aggr(d))
-    w(wp / "Aggregat/installation/sql" / f"{n}_installation_creation_table_aggregat.{e}",
+    emit(wp / "Aggregat/installation/sql" / f"{n}_installation_creation_table_aggregat.{e}",
       sql_create_table_aggr(d))
 
+# ─────────────────────────────────────────────────────────────────────────────
+# GÉNÉRATION PARAMÉTRIQUE
+# ─────────────────────────────────────────────────────────────────────────────
+
+FLOW_TYPES = ("Import", "Alimentation", "Export", "Aggregat")
+
+_REQUETE_RE = re.compile(r"Requete: (\S+)")
+_ID_SCRIPT_RE = re.compile(r"id_script: (\S+)")
+_TABLE_RE = re.compile(r"£(?:BQ|TD)_(?:SOCLE|HISTO|TMP|VUES|SOURCE)\.\w+")
+
+
+def make_domains(count, cross_density=None, seed=0):
+    """`count` domaines dérivés de DOMAINS (Clients, Contrats… puis Clients2, Contrats2…).
+
+    Chaque copie a ses propres tables (clients_2…) et répertoires.
+    `cross_density` : nombre moyen de tables SOCLE empruntées à d'autres
+    domaines ; None conserve CROSS_REFS (copies comprises).
+    """
+    rng = random.Random(f"{seed}/domains")
+    domains = []
+    for i in range(count):
+        base = DOMAINS[i % len(DOMAINS)]
+        copy = i // len(DOMAINS)
+        if copy == 0:
+            d = dict(base)
+        else:
+            suffix = str(copy + 1)
+            d = {
+                key: (value.replace(base["name"].lower(), base["name"].lower() + suffix)
+                      if isinstance(value, str) and key.startswith(("rep_", "sftp_", "api_")) else value)
+                for key, value in base.items()
+            }
+            d["name"] = base["name"] + suffix
+            for key in ("staging", "socle", "histo", "aggr"):
+                d[key] = f"{base[key]}_{suffix}"
+            if cross_density is None:
+                d["cross"] = [
+                    (plat, tbl if copy == 0 else f"{tbl}_{suffix}", owner + suffix)
+                    for plat, tbl, owner in CROSS_REFS.get(base["name"], [])
+                ]
+        domains.append(d)
+
+    if cross_density is not None:
+        for d in domains:
+            n_refs = int(cross_density) + (rng.random() < cross_density - int(cross_density))
+            others = [o for o in domains if o is not d]
+            d["cross"] = [
+                (o["platform"], o["socle"], o["name"])
+                for o in rng.sample(others, min(n_refs, len(others)))
+            ]
+    return domains
+
+
+def _filler_sql(table, key_col, index):
+    return (
+        f"\n-- Contrôle de cohérence {index}\n"
+        f"SELECT COUNT(*) AS nb_lignes_{index}, COUNT(DISTINCT {key_col}) AS nb_cles_{index}\n"
+        f"FROM {table}\n"
+        f"WHERE {key_col} IS NOT NULL;\n"
+    )
+
+
+def _pad_sql(content, d, target_bytes):
+    """Complète un SQL par des requêtes de contrôle jusqu'à ~`target_bytes`."""
+    if len(content) >= target_bytes:
+        return content
+    m = _TABLE_RE.search(content)
+    table = m.group(0) if m else f"{pfx(d)}_SOCLE.{socle(d)}"
+    parts = [content]
+    size, index = len(content), 1
+    while size < target_bytes:
+        chunk = _filler_sql(table, key(d), index)
+        parts.append(chunk)
+        size += len(chunk)
+        index += 1
+    return "".join(parts)
+
+
+def _variant_name(name, variant):
+    """Clients_import_X.yml → Clients_import_X_v2.yml (variante 0 : inchangé)."""
+    if variant == 0:
+        return name
+    stem, dot, suffix = name.rpartition(".")
+    return f"{stem}_v{variant + 1}.{suffix}" if dot else f"{name}_v{variant + 1}"
+
+
+def scaled_domain_files(d, flux_per_type=None, sql_kb=None, sql_sigma=1.0, seed=0,
+                        workspace_root=WORKSPACE_ROOT, docs_root=DOCS_ROOT):
+    """{chemin : contenu} d'un domaine avec `flux_per_type` flux par type.
+
+    Les flux de référence d'un type sont repris en boucle ; la k-ième
+    reprise renomme YAML, id_script, SQL et CDC (suffixe _vk). Chaque SQL
+    (hors installation) vise une taille tirée d'une loi log-normale de
+    médiane `sql_kb` Ko.
+    """
+    files = {}
+    generate_domain(d, emit=files.__setitem__, workspace_root=workspace_root,
+                    docs_root=docs_root, verbose=False)
+    if flux_per_type is None and sql_kb is None:
+        return files
+
+    rng = random.Random(f"{seed}/{dn(d)}")
+    wp, dp = workspace_root / dn(d), docs_root / dn(d)
+    out = {path: content for path, content in files.items() if "installation" in path.parts}
+    for flow_type in FLOW_TYPES:
+        templates = [path for path in files if path.parent == wp / flow_type / "config"]
+        count = len(templates) if flux_per_type is None else flux_per_type
+        for j in range(count if templates else 0):
+            yaml_path = templates[j % len(templates)]
+            variant = j // len(templates)
+            content = files[yaml_path]
+            sql_names = _REQUETE_RE.findall(content)
+            if variant:
+                content = _ID_SCRIPT_RE.sub(lambda m: f"id_script: {m.group(1)}_v{variant + 1}", content, 1)
+                content = _REQUETE_RE.sub(lambda m: f"Requete: {_variant_name(m.group(1), variant)}", content)
+            out[yaml_path.with_name(_variant_name(yaml_path.name, variant))] = content
+
+            for name in sql_names:
+                sql_path = wp / flow_type / "sql" / name
+                if sql_path not in files:
+                    continue
+                sql = files[sql_path]
+                if variant:
+                    sql = f"-- Variante {variant + 1}\n{sql}"
+                if sql_kb:
+                    target = rng.lognormvariate(math.log(sql_kb * 1024), sql_sigma)
+                    sql = _pad_sql(sql, d, int(target))
+                out[sql_path.with_name(_variant_name(name, variant))] = sql
+
+            cdc_path = dp / f"{yaml_path.stem}_CDC.md"
+            if cdc_path in files:
+                out[dp / f"{_variant_name(yaml_path.name, variant).rpartition('.')[0]}_CDC.md"] = files[cdc_path]
+    return out
+
+
+def _write_domain(task):
+    """Génère et écrit un domaine (exécuté dans un processus du pool)."""
+    d, flux_per_type, sql_kb, sql_sigma, seed, workspace_root, docs_root = task
+    files = scaled_domain_files(d, flux_per_type, sql_kb, sql_sigma, seed, workspace_root, docs_root)
+    counts = {"yaml": 0, "sql": 0, "docs": 0, "bytes": 0}
+    made = set()
+    for path, content in files.items():
+        if path.parent not in made:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            made.add(path.parent)
+        data = content.encode("utf-8")
+        with open(path, "wb") as fh:
+            fh.write(data)
+        counts["bytes"] += len(data)
+        kind = {".yml": "yaml", ".gql": "sql", ".dql": "sql", ".md": "docs"}.get(path.suffix)
+        if kind:
+            counts[kind] += 1
+    return counts
+
+
+def generate_scaled(workspace_root, docs_root, domains=len(DOMAINS), flux_per_type=None,
+                    cross_density=None, sql_kb=None, sql_sigma=1.0, seed=0, workers=1,
+                    clean=False, verbose=True):
+    """Génère un workspace paramétrique ; retourne les comptes de fichiers écrits."""
+    workspace_root, docs_root = Path(workspace_root), Path(docs_root)
+    if clean:
+        for root in (workspace_root, docs_root):
+            if root.exists():
+                shutil.rmtree(root)
+    tasks = [
+        (d, flux_per_type, sql_kb, sql_sigma, seed, workspace_root, docs_root)
+        for d in make_domains(domains, cross_density, seed)
+    ]
+    totals = {"yaml": 0, "sql": 0, "docs": 0, "bytes": 0}
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1:
+        results = map(_write_domain, tasks)
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        results = pool.map(_write_domain, tasks, chunksize=max(1, len(tasks) // (workers * 8)))
+    try:
+        for done, counts in enumerate(results, 1):
+            for k in totals:
+                totals[k] += counts[k]
+            if verbose and (done % 100 == 0 or done == len(tasks)):
+                print(f"  {done}/{len(tasks)} domaines — {totals['yaml'] + totals['sql'] + totals['docs']} fichiers")
+    finally:
+        if workers > 1:
+            pool.shutdown()
+    return totals
+
 # ─────────────────────────────────────────────────────────────────────────────
 # POINT D'ENTRÉE
 # ─────────────────────────────────────────────────────────────────────────────
 
-def main():
+def generate_reference():
+    """Les 20 domaines de référence dans workspaces/ et docs/ (comportement historique)."""
     print("Nettoyage des répertoires existants...")
     if WORKSPACE_ROOT.exists():
         shutil.rmtree(WORKSPACE_ROOT)
@@ -1760,5 +1974,42 @@ def main():
     print(f"\n  Workspace : {WORKSPACE_ROOT.resolve()}")
     print(f"  Docs      : {DOCS_ROOT.resolve()}")
 
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Génère un workspace JobMaster fictif.")
+    parser.add_argument("--domains", type=int, help="nombre de domaines (mode paramétrique)")
+    parser.add_argument("--flux-per-type", type=int, help="flux par type et par domaine")
+    parser.add_argument("--cross-density", type=float,
+                        help="nombre moyen de tables SOCLE empruntées par domaine")
+    parser.add_argument("--sql-kb", type=float, help="taille médiane des SQL (Ko, loi log-normale)")
+    parser.add_argument("--sql-sigma", type=float, default=1.0, help="écart-type log des tailles SQL")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=1, help="processus d'écriture (0 = un par cœur)")
+    parser.add_argument("--output", type=Path, default=WORKSPACE_ROOT)
+    parser.add_argument("--docs", type=Path, default=DOCS_ROOT)
+    parser.add_argument("--clean", action="store_true", help="vide les répertoires avant génération")
+    args = parser.parse_args(argv)
+
+    if argv is None and len(sys.argv) == 1:
+        generate_reference()
+        return
+
+    domains = args.domains or len(DOMAINS)
+    print(f"Génération de {domains} domaines "
+          f"({args.flux_per_type or 'tous les'} flux par type, seed {args.seed})...")
+    totals = generate_scaled(
+        args.output, args.docs, domains, args.flux_per_type, args.cross_density,
+        args.sql_kb, args.sql_sigma, args.seed, args.workers, args.clean,
+    )
+    print("\nGeneration terminee.")
+    print(f"  YAML   : {totals['yaml']}")
+    print(f"  SQL    : {totals['sql']}")
+    print(f"  CDCs   : {totals['docs']}")
+    print(f"  TOTAL  : {totals['yaml'] + totals['sql'] + totals['docs']} fichiers "
+          f"({totals['bytes'] / 1e6:.1f} Mo)")
+    print(f"\n  Workspace : {args.output.resolve()}")
+    print(f"  Docs      : {args.docs.resolve()}")
+
+
 if __name__ == "__main__":
     main()
@@ -8,7 +8,8 @@ from pathlib import Path
 
 import streamlit as st
 
-from aleister.backend.knowledge_base import build_index
+from aleister.backend.index_store import IndexStore, open_store
+from aleister.backend.watcher import watch_store
 
 st.set_page_config(
     page_title="Aleister — Base de connaissances",
@@ -20,22 +21,24 @@ st.title("📚 Base de connaissances")
 st.caption("Exploration des flux JobMaster indexés dans le workspace.")
 
 # ── Build / cache index ───────────────────────────────────────────────────────
-@st.cache_data(ttl=120, show_spinner="Indexation du workspace…")
-def _load_index() -> dict:
-    return build_index()
+@st.cache_resource(show_spinner="Ouverture de l'index…")
+def _load_store() -> IndexStore:
+    store = open_store()
+    watch_store(store)  # mises à jour en continu, sans rescan périodique
+    return store
 
 
-with st.spinner("Chargement de l'index…"):
-    idx = _load_index()
+store = _load_store()
+domaines = store.domaines()
 
-if not idx["flux"]:
+if not domaines:
     st.warning("Aucun flux trouvé dans le workspace. Vérifiez WORKSPACE_ROOT dans votre .env.")
     st.stop()
 
 # ── Sidebar filters ───────────────────────────────────────────────────────────
 st.sidebar.header("Filtres")
 
-domaines_dispo = ["(tous)"] + idx["domaines"]
+domaines_dispo = ["(tous)"] + domaines
 sel_domaine    = st.sidebar.selectbox("Domaine", domaines_dispo)
 
 types_dispo = ["(tous)", "Import", "Alimentation", "Export", "Aggregat"]
@@ -46,25 +49,21 @@ sel_plateforme    = st.sidebar.selectbox("Plateforme", plateformes_dispo)
 
 transverse_only = st.sidebar.checkbox("Flux transverses uniquement")
 
-search = st.sidebar.text_input("Recherche (id_script, description)", placeholder="clients…")
+search = st.sidebar.text_input(
+    "Recherche",
+    placeholder="upsert sftp…",
+    help="Plein texte : id_script, description, paramètres YAML et SQL. "
+         "Chaque mot est cherché en préfixe ; résultats classés par pertinence.",
+)
 
 # ── Apply filters ─────────────────────────────────────────────────────────────
-flux_list = idx["flux"]
-
-if sel_domaine != "(tous)":
-    flux_list = [f for f in flux_list if f["domaine"] == sel_domaine]
-if sel_type != "(tous)":
-    flux_list = [f for f in flux_list if f["type"] == sel_type]
-if sel_plateforme != "(tous)":
-    flux_list = [f for f in flux_list if f["plateforme"] == sel_plateforme]
-if transverse_only:
-    flux_list = [f for f in flux_list if f["is_transverse"]]
-if search:
-    kw = search.lower()
-    flux_list = [
-        f for f in flux_list
-        if kw in f["id_script"].lower() or kw in f["description"].lower()
-    ]
+flux_list = store.query_flux(
+    domaine=None if sel_domaine == "(tous)" else sel_domaine,
+    flow_type=None if sel_type == "(tous)" else sel_type,
+    plateforme=None if sel_plateforme == "(tous)" else sel_plateforme,
+    transverse_only=transverse_only,
+    search=search or None,
+)
 
 # ── Summary ───────────────────────────────────────────────────────────────────
 c1, c2, c3 = st.columns(3)
@@ -6,8 +6,19 @@ Met en évidence les dépendances transverses (flux d'autres domaines).
 
 import streamlit as st
 
-from aleister.backend.knowledge_base import build_index
-from aleister.backend.analyzer import analyze_impact, list_tables
+from aleister.backend.index_store import IndexStore, open_store
+from aleister.backend.watcher import watch_store
+from aleister.backend.analyzer import (
+    analyze_column_impact,
+    analyze_downstream,
+    analyze_impact,
+    analyze_impact_batch,
+    list_tables,
+    parse_table_list,
+)
+from aleister.backend.impact_cache import cached_impact, get_impact_cache
+from aleister.backend.schema_catalog import convert_type, get_schema_catalog
+from aleister.backend.sql_scanner import ROLE_LABELS, ROLES, roles_label
 
 st.set_page_config(
     page_title="Aleister — Analyse d'impact",
@@ -23,19 +34,157 @@ st.caption(
 
 
 # ── Build / cache index ───────────────────────────────────────────────────────
-@st.cache_data(ttl=120, show_spinner="Indexation du workspace…")
-def _load_index() -> dict:
-    return build_index()
+@st.cache_resource(show_spinner="Ouverture de l'index…")
+def _load_store() -> IndexStore:
+    store = open_store()
+    watch_store(store)  # mises à jour en continu, sans rescan périodique
+    return store
+
+
+store = _load_store()
+
+# ── Impact cache ──────────────────────────────────────────────────────────────
+st.sidebar.header("Cache d'analyse")
+cache_panel = st.sidebar.empty()
+
+
+def _show_cache_stats() -> None:
+    """Compteurs du cache d'impact (processus), mis à jour après chaque analyse."""
+    info = get_impact_cache().info()
+    if not info["max_entries"]:
+        cache_panel.caption("Désactivé (IMPACT_CACHE_SIZE = 0).")
+        return
+    lookups = info["hits"] + info["misses"]
+    rate = f"{info['hits'] / lookups:.0%}" if lookups else "—"
+    cache_panel.markdown(
+        f"**Hits** : {info['hits']} — **misses** : {info['misses']} ({rate} de hits)  \n"
+        f"**Entrées** : {info['entries']} / {info['max_entries']} — "
+        f"**évictions** : {info['evictions']}"
+    )
 
 
-idx = _load_index()
+_show_cache_stats()
 
-if not idx["flux"]:
+if not store.domaines():
     st.warning("Aucun flux trouvé. Vérifiez WORKSPACE_ROOT dans votre .env.")
     st.stop()
 
+mode = st.radio(
+    "Mode",
+    ["Table unique", "Liste de tables (migration)"],
+    horizontal=True,
+    help="Liste : impact cumulé de toutes les tables d'une migration de schéma.",
+)
+
+BADGES = {"Import": "🔵", "Alimentation": "🟢", "Export": "🟠", "Aggregat": "🟣"}
+
+# ── Batch mode ────────────────────────────────────────────────────────────────
+if mode != "Table unique":
+    col_paste, col_upload = st.columns([3, 2])
+    with col_paste:
+        pasted = st.text_area(
+            "Tables de la migration",
+            height=180,
+            placeholder="BQ_SOCLE.clients\nBQ_SOCLE.contrats, TD_SOCLE.cdr_voix\n# commentaire",
+            help="Une table par ligne, ou séparées par des virgules / points-virgules. "
+                 "« £BQ_SOCLE.clients », « BQ_SOCLE.clients » ou « clients ».",
+        )
+    with col_upload:
+        uploaded = st.file_uploader("… ou fichier (txt, csv)", type=["txt", "csv", "sql", "lst"])
+    batch_roles = st.multiselect(
+        "Rôle des flux vis-à-vis des tables",
+        options=list(ROLES),
+        format_func=ROLE_LABELS.get,
+        help="Vide = tous.",
+    )
+
+    text = pasted + "\n" + (uploaded.getvalue().decode("utf-8", "replace") if uploaded else "")
+    requested = parse_table_list(text)
+    if not requested:
+        st.info("Colle ou charge la liste des tables modifiées par la migration.")
+        st.stop()
+
+    batch = cached_impact(analyze_impact_batch, requested, store=store, roles=batch_roles or None)
+    _show_cache_stats()
+    n_transverses = sum(1 for item in batch["flux"] if item["is_transverse"])
+
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Tables demandées", len(requested))
+    c2.metric("Tables sans flux", len(batch["unknown"]))
+    c3.metric("Flux impactés (uniques)", batch["total"])
+    c4.metric("Dont transverses", n_transverses)
+
+    if batch["unknown"]:
+        st.warning("Aucune table trouvée pour : " + ", ".join(f"`{t}`" for t in batch["unknown"]))
+
+    st.subheader("Par table")
+    st.dataframe(
+        [
+            {
+                "Table":            t["table"],
+                "Correspondances":  ", ".join(t["matched"]) or "—",
+                "Domaine":          t["domaine_owner"] or "?",
+                "Flux directs":     len(t["flux_directs"]),
+                "Flux transverses": len(t["flux_transverses"]),
+            }
+            for t in batch["tables"]
+        ],
+        use_container_width=True,
+        hide_index=True,
+    )
+
+    st.subheader("Par domaine")
+    for domaine, group in batch["by_domain"].items():
+        label = f"{domaine} — {len(group['directs'])} direct(s), {len(group['transverses'])} transverse(s)"
+        with st.expander(label):
+            for kind, items in (("Directs", group["directs"]), ("Transverses", group["transverses"])):
+                if not items:
+                    continue
+                st.markdown(f"**{kind}**")
+                for item in items:
+                    f = item["flux"]
+                    st.markdown(
+                        f"{BADGES.get(f['type'], '⚪')} **{f['id_script']}** — {f['type']} — "
+                        f"{f['plateforme']} — tables : {', '.join(f'`{t}`' for t in item['tables'])} "
+                        f"({roles_label(item['roles'])})"
+                    )
+
+    # ── Batch report ──────────────────────────────────────────────────────────
+    lines = [
+        "# Rapport d'impact — migration\n",
+        f"**Tables** : {len(requested)}  ",
+        f"**Flux impactés (uniques)** : {batch['total']}  ",
+        f"**Dont transverses** : {n_transverses}\n",
+    ]
+    if batch["unknown"]:
+        lines.append(f"**Tables sans flux** : {', '.join(batch['unknown'])}\n")
+    lines += ["---\n", "## Par table\n", "| Table | Domaine | Directs | Transverses |", "|---|---|---|---|"]
+    for t in batch["tables"]:
+        lines.append(
+            f"| {t['table']} | {t['domaine_owner'] or '?'} | {len(t['flux_directs'])} | "
+            f"{len(t['flux_transverses'])} |"
+        )
+    lines.append("\n## Par domaine\n")
+    for domaine, group in batch["by_domain"].items():
+        lines.append(f"### {domaine}\n")
+        for kind, items in (("directs", group["directs"]), ("transverses", group["transverses"])):
+            for item in items:
+                f = item["flux"]
+                lines.append(
+                    f"- **{f['id_script']}** ({kind} / {f['type']} / {f['plateforme']}) — "
+                    f"tables : {', '.join(item['tables'])} ({roles_label(item['roles'])})"
+                )
+        lines.append("")
+    st.download_button(
+        label="Télécharger le rapport combiné (Markdown)",
+        data="\n".join(lines).encode("utf-8"),
+        file_name="impact_migration.md",
+        mime="text/markdown",
+    )
+    st.stop()
+
 # ── Table selector ────────────────────────────────────────────────────────────
-all_tables = list_tables(idx)
+all_tables = list_tables(store=store)
 
 col_search, col_select = st.columns([2, 3])
 
@@ -43,14 +192,11 @@ with col_search:
     filter_text = st.text_input(
         "Filtrer les tables",
         placeholder="clients, cdr_voix…",
-        help="Tape quelques lettres pour réduire la liste.",
+        help="Tape quelques lettres pour réduire la liste (une ou deux lettres : début "
+             "du dataset ou du nom de table).",
     )
 
-filtered_tables = (
-    [t for t in all_tables if filter_text.lower() in t.lower()]
-    if filter_text
-    else all_tables
-)
+filtered_tables = store.search_tables(filter_text) if filter_text else all_tables
 
 with col_select:
     if not filtered_tables:
@@ -58,24 +204,84 @@ with col_select:
         st.stop()
     selected_table = st.selectbox("Table à analyser", filtered_tables)
 
+selected_roles = st.multiselect(
+    "Rôle des flux vis-à-vis de la table",
+    options=list(ROLES),
+    format_func=ROLE_LABELS.get,
+    help="Vide = tous. Écriture/création : producteurs ; lecture : consommateurs.",
+)
+
+# ── Column selector ───────────────────────────────────────────────────────────
+schema = get_schema_catalog(store.workspace).lookup(selected_table) if selected_table else None
+column_options: list[str] = []
+if selected_table:
+    column_options = sorted(
+        {col["nom"].lower() for col in (schema["columns"] if schema else [])}
+        | set(store.column_index().columns(selected_table))
+    )
+selected_column = st.selectbox(
+    "Colonne (optionnel)",
+    options=[""] + column_options,
+    format_func=lambda c: c or "Toute la table",
+    help="Ne retient que les flux qui utilisent cette colonne (SELECT, MERGE, JOIN…) "
+         "ou la table entière (SELECT *, transfert).",
+)
+
 st.divider()
 
+
+def _via(item: dict) -> str:
+    """« Via : `table` (rôles) », avec l'usage de la colonne analysée."""
+    label = f"Via : `{item['via']}` ({roles_label(item['roles'])})"
+    if "column_roles" in item:
+        usage = "table entière" if item["whole_table"] else roles_label(item["column_roles"])
+        label += f" — colonne `{selected_column}` : {usage}"
+    return label
+
+
 # ── Run analysis ──────────────────────────────────────────────────────────────
 if selected_table:
-    result = analyze_impact(selected_table, index=idx)
+    if selected_column:
+        result = cached_impact(
+            analyze_column_impact, selected_table, selected_column,
+            store=store, roles=selected_roles or None,
+        )
+    else:
+        result = cached_impact(analyze_impact, selected_table, store=store, roles=selected_roles or None)
+    _show_cache_stats()
+    analysed = selected_table + (f".{selected_column}" if selected_column else "")
 
     c1, c2, c3, c4 = st.columns(4)
-    c1.metric("Table analysée", selected_table.split(".")[-1])
+    c1.metric("Table analysée", analysed.split(".", 1)[-1])
     c2.metric("Domaine propriétaire", result["domaine_owner"] or "?")
     c3.metric("Flux directs",     len(result["flux_directs"]))
     c4.metric("Flux transverses", len(result["flux_transverses"]),
               delta=f"{len(result['flux_transverses'])} cross-domaine" if result["flux_transverses"] else None,
               delta_color="inverse" if result["flux_transverses"] else "off")
 
+    # ── Schema ────────────────────────────────────────────────────────────────
+    if schema is not None:
+        other = "TD" if schema["platform"] == "BQ" else "BQ"
+        with st.expander(f"Schéma — {len(schema['columns'])} colonnes ({schema['source']})"):
+            st.dataframe(
+                [
+                    {
+                        "Colonne":  col["nom"],
+                        "Type":     col["type"],
+                        "Logique":  col["logique"] or "?",
+                        f"Équivalent {other}": convert_type(col["type"], schema["platform"], other),
+                        "Nullable": col["nullable"],
+                    }
+                    for col in schema["columns"]
+                ],
+                use_container_width=True,
+                hide_index=True,
+            )
+
     st.divider()
 
     if result["total"] == 0:
-        st.success(f"Aucun flux ne référence `{selected_table}`. Évolution sans impact.")
+        st.success(f"Aucun flux ne référence `{analysed}`. Évolution sans impact.")
         st.stop()
 
     # ── Direct flux ───────────────────────────────────────────────────────────
@@ -85,11 +291,11 @@ if selected_table:
 
         for item in result["flux_directs"]:
             f = item["flux"]
-            badge = {"Import": "🔵", "Alimentation": "🟢", "Export": "🟠", "Aggregat": "🟣"}.get(f["type"], "⚪")
+            badge = BADGES.get(f["type"], "⚪")
             st.markdown(
                 f"{badge} **{f['id_script']}** — {f['type']} — {f['plateforme']}  \n"
                 f"_{f['description']}_  \n"
-                f"Via : `{item['via']}`"
+                + _via(item)
             )
             st.divider()
 
@@ -104,18 +310,40 @@ if selected_table:
 
         for item in result["flux_transverses"]:
             f = item["flux"]
-            badge = {"Import": "🔵", "Alimentation": "🟢", "Export": "🟠", "Aggregat": "🟣"}.get(f["type"], "⚪")
+            badge = BADGES.get(f["type"], "⚪")
             st.markdown(
                 f"{badge} **{f['id_script']}** — domaine **{f['domaine']}** — {f['type']} — {f['plateforme']}  \n"
                 f"_{f['description']}_  \n"
-                f"Via : `{item['via']}`"
+                + _via(item)
             )
             st.divider()
 
+    # ── Downstream impact ─────────────────────────────────────────────────────
+    st.subheader("Impact transitif — en aval")
+    st.caption(
+        "Flux qui lisent les tables écrites par les flux impactés, de proche en proche "
+        "(staging → SOCLE → agrégats, enrichissements transverses…). Analyse à la table."
+    )
+    max_depth = st.slider("Profondeur maximale (sauts)", min_value=1, max_value=10, value=3)
+    downstream = cached_impact(analyze_downstream, selected_table, max_depth=max_depth, store=store)
+    _show_cache_stats()
+    indirect = [item for item in downstream["flux"] if item["depth"] > 1]
+    if not indirect:
+        st.info("Aucun flux impacté au-delà des références directes.")
+    for depth in range(2, downstream["max_depth"] + 1):
+        level = [item for item in indirect if item["depth"] == depth]
+        with st.expander(f"Profondeur {depth} — {len(level)} flux", expanded=depth == 2):
+            for item in level:
+                f = item["flux"]
+                st.markdown(
+                    f"**{f['id_script']}** — domaine **{f['domaine']}** — {f['type']}  \n"
+                    f"Lit `{item['via']}`, écrite par **{item['source']}**"
+                )
+
     # ── Export report ─────────────────────────────────────────────────────────
     st.subheader("Exporter le rapport")
     lines = [
-        f"# Rapport d'impact — `{selected_table}`\n",
+        f"# Rapport d'impact — `{analysed}`\n",
         f"**Domaine propriétaire** : {result['domaine_owner'] or '?'}  ",
         f"**Flux directs** : {len(result['flux_directs'])}  ",
         f"**Flux transverses** : {len(result['flux_transverses'])}  ",
@@ -125,18 +353,26 @@ if selected_table:
     ]
     for item in result["flux_directs"]:
         f = item["flux"]
-        lines.append(f"- **{f['id_script']}** ({f['type']}/{f['plateforme']}) — via `{item['via']}`")
+        lines.append(f"- **{f['id_script']}** ({f['type']}/{f['plateforme']}) — {_via(item)}")
     lines += ["\n## Flux transverses\n"]
     for item in result["flux_transverses"]:
         f = item["flux"]
         lines.append(
-            f"- **{f['id_script']}** (domaine {f['domaine']} / {f['type']} / {f['plateforme']}) — via `{item['via']}`"
+            f"- **{f['id_script']}** (domaine {f['domaine']} / {f['type']} / {f['plateforme']}) — {_via(item)}"
         )
+    if indirect:
+        lines += [f"\n## Impact transitif (jusqu'à {max_depth} sauts)\n"]
+        for item in indirect:
+            f = item["flux"]
+            lines.append(
+                f"- profondeur {item['depth']} — **{f['id_script']}** (domaine {f['domaine']} / {f['type']}) "
+                f"— lit `{item['via']}`, écrite par {item['source']}"
+            )
 
     report_md = "\n".join(lines)
     st.download_button(
         label="Télécharger le rapport (Markdown)",
         data=report_md.encode("utf-8"),
-        file_name=f"impact_{selected_table.replace('.', '_')}.md",
+        file_name=f"impact_{analysed.replace('.', '_')}.md",
         mime="text/markdown",
     )
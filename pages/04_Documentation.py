@@ -1,6 +1,7 @@
 """Aleister — Documentation.
 
-Consulte les CDCs existants et génère des fiches de flux / index de domaine.
+Consulte les CDCs existants, génère des fiches de flux / index de domaine
+et l'ordonnancement des flux du workspace.
 """
 
 from pathlib import Path
@@ -8,8 +9,10 @@ from pathlib import Path
 import streamlit as st
 
 from aleister.config import DOCS_ROOT
-from aleister.backend.knowledge_base import build_index
+from aleister.backend.index_store import IndexStore, open_store
+from aleister.backend.watcher import watch_store
 from aleister.backend.doc_builder import flux_to_markdown, domain_index_markdown
+from aleister.backend.flux_dag import TYPE_ORDER, flux_dag
 
 st.set_page_config(
     page_title="Aleister — Documentation",
@@ -22,14 +25,31 @@ st.caption("Consulte les CDCs et génère des fiches de flux en Markdown.")
 
 
 # ── Build / cache index ───────────────────────────────────────────────────────
-@st.cache_data(ttl=120, show_spinner="Indexation du workspace…")
-def _load_index() -> dict:
-    return build_index()
+@st.cache_resource(show_spinner="Ouverture de l'index…")
+def _load_store() -> IndexStore:
+    store = open_store()
+    watch_store(store)  # mises à jour en continu, sans rescan périodique
+    return store
 
 
-idx = _load_index()
+store = _load_store()
+domaines = store.domaines()
 
-tab_cdc, tab_fiches, tab_index = st.tabs(["CDCs existants", "Fiches de flux", "Index domaine"])
+
+@st.cache_data(show_spinner="Export de l'ordonnancement…", max_entries=1)
+def _dag_exports(version: str) -> dict[str, bytes]:
+    """Exports du DAG des flux, recalculés à chaque nouvelle version de l'index."""
+    dag = flux_dag(store=store)
+    return {
+        "json": dag.to_json().encode("utf-8"),
+        "dot": dag.to_dot().encode("utf-8"),
+        "graphml": dag.to_graphml().encode("utf-8"),
+    }
+
+
+tab_cdc, tab_fiches, tab_index, tab_dag = st.tabs(
+    ["CDCs existants", "Fiches de flux", "Index domaine", "Ordonnancement"]
+)
 
 # ─────────────────────────────────────────────────────────────────────────────
 # TAB 1 — CDCs existants
@@ -55,8 +75,10 @@ with tab_cdc:
             cdc_files = sorted((DOCS_ROOT / sel_dom).glob("*_CDC.md"))
 
         if cdc_search:
-            kw = cdc_search.lower()
-            cdc_files = [p for p in cdc_files if kw in p.stem.lower()]
+            # Recherche plein texte dans le contenu des CDCs, classée par pertinence
+            hits = store.search(cdc_search, kind="cdc", limit=None)
+            allowed = set(cdc_files)
+            cdc_files = [p for p in (Path(h["path"]) for h in hits) if p in allowed]
 
         st.caption(f"{len(cdc_files)} CDC(s) trouvé(s).")
 
@@ -86,15 +108,15 @@ with tab_fiches:
     st.subheader("Fiche d'un flux")
     st.caption("Génère une fiche Markdown complète pour un flux indexé.")
 
-    if not idx["flux"]:
+    if not domaines:
         st.warning("Aucun flux indexé.")
     else:
-        domaines_flux = ["(tous)"] + idx["domaines"]
+        domaines_flux = ["(tous)"] + domaines
         sel_dom_fiche = st.selectbox("Domaine", domaines_flux, key="fiche_dom")
 
-        flux_filtre = idx["flux"] if sel_dom_fiche == "(tous)" else [
-            f for f in idx["flux"] if f["domaine"] == sel_dom_fiche
-        ]
+        flux_filtre = store.query_flux(
+            domaine=None if sel_dom_fiche == "(tous)" else sel_dom_fiche
+        )
 
         sel_flux = st.selectbox(
             "Flux",
@@ -120,13 +142,13 @@ with tab_index:
     st.subheader("Index d'un domaine")
     st.caption("Génère l'index complet de tous les flux d'un domaine.")
 
-    if not idx["domaines"]:
+    if not domaines:
         st.warning("Aucun domaine indexé.")
     else:
-        sel_dom_idx = st.selectbox("Domaine", idx["domaines"], key="idx_dom")
+        sel_dom_idx = st.selectbox("Domaine", domaines, key="idx_dom")
 
         if sel_dom_idx:
-            index_md = domain_index_markdown(sel_dom_idx, idx)
+            index_md = domain_index_markdown(sel_dom_idx, store=store)
             st.markdown(index_md)
             st.download_button(
                 "Télécharger l'index",
@@ -134,3 +156,67 @@ with tab_index:
                 file_name=f"{sel_dom_idx}_index.md",
                 mime="text/markdown",
             )
+
+# ─────────────────────────────────────────────────────────────────────────────
+# TAB 4 — Ordonnancement
+# ─────────────────────────────────────────────────────────────────────────────
+with tab_dag:
+    st.subheader("Ordonnancement des flux")
+    st.caption(
+        "Un flux dépend de ceux qui écrivent les tables qu'il lit. Les flux d'un même "
+        "niveau peuvent tourner en parallèle ; un cycle est un groupe de flux qui "
+        "s'écrivent et se lisent mutuellement."
+    )
+
+    dag = flux_dag(store=store)
+    summary = dag.summary()
+
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Flux", summary["flux"])
+    c2.metric("Niveaux", summary["depth"])
+    c3.metric("Parallélisme max", summary["max_width"])
+    c4.metric("Cycles", summary["cycles"],
+              delta=f"{summary['flux_in_cycles']} flux" if summary["cycles"] else None,
+              delta_color="inverse" if summary["cycles"] else "off")
+
+    st.dataframe(
+        [
+            {"Niveau": level["level"], "Flux": level["width"],
+             **{kind: level["types"].get(kind, 0) for kind in TYPE_ORDER}}
+            for level in summary["levels"]
+        ],
+        use_container_width=True,
+        hide_index=True,
+    )
+
+    if dag.cycles:
+        with st.expander(f"⚠️ {len(dag.cycles)} cycle(s) — ordre à arbitrer"):
+            for cycle in dag.cycles:
+                st.markdown(" ⇄ ".join(f"**{dag.id_scripts[v]}** ({dag.domains[v]})" for v in cycle))
+
+    sel_level = st.selectbox(
+        "Flux du niveau",
+        range(summary["depth"]),
+        format_func=lambda n: f"Niveau {n} — {len(dag.levels[n])} flux",
+        key="dag_level",
+    )
+    if sel_level is not None:
+        st.dataframe(
+            [
+                {"Flux": dag.id_scripts[v], "Domaine": dag.domains[v], "Type": dag.types[v]}
+                for v in dag.levels[sel_level]
+            ],
+            use_container_width=True,
+            hide_index=True,
+        )
+
+    exports = _dag_exports(store.version())
+    for col, (label, ext, mime) in zip(st.columns(3), (
+        ("JSON", "json", "application/json"),
+        ("DOT", "dot", "text/vnd.graphviz"),
+        ("GraphML", "graphml", "application/xml"),
+    )):
+        col.download_button(
+            f"Télécharger ({label})", data=exports[ext],
+            file_name=f"ordonnancement.{ext}", mime=mime,
+        )